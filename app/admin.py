@@ -1,3 +1,34 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import GenerationBatch, GenerationJob, Itinerary, Place
+
+
+@admin.register(Itinerary)
+class ItineraryAdmin(admin.ModelAdmin):
+    list_display = ('city', 'start_date', 'end_date', 'created_at')
+    list_filter = ('created_at',)
+    search_fields = ('city', 'request_hash')
+    readonly_fields = ('public_id', 'request_hash', 'created_at', 'updated_at')
+
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('public_id', 'status', 'batch', 'attempts', 'worker', 'created_at', 'finished_at')
+    list_filter = ('status', 'priority', 'created_at')
+    search_fields = ('public_id', 'request_hash')
+    readonly_fields = ('public_id', 'request_hash', 'created_at', 'started_at', 'finished_at')
+
+
+@admin.register(Place)
+class PlaceAdmin(admin.ModelAdmin):
+    list_display = ('name', 'city_key', 'latitude', 'longitude', 'confirmations', 'source', 'updated_at')
+    list_filter = ('source',)
+    search_fields = ('name', 'city_key')
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(GenerationBatch)
+class GenerationBatchAdmin(admin.ModelAdmin):
+    list_display = ('public_id', 'name', 'created_at')
+    search_fields = ('public_id', 'name', 'spec_hash')
+    readonly_fields = ('public_id', 'spec_hash', 'created_at')
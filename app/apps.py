@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        from .conf import check_gemini_config
+        from .singleflight import check_singleflight_config
+        checks.register(check_gemini_config)
+        checks.register(check_singleflight_config)
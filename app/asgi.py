@@ -0,0 +1,59 @@
+# taramgo/app/asgi.py
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_startup_hooks = []
+_shutdown_hooks = []
+
+
+def on_startup(func):
+    """
+    Register an async callable to run on ASGI lifespan startup.
+    """
+    _startup_hooks.append(func)
+    return func
+
+
+def on_shutdown(func):
+    """
+    Register an async callable to run on ASGI lifespan shutdown.
+    """
+    _shutdown_hooks.append(func)
+    return func
+
+
+class LifespanMiddleware:
+    """
+    Handles the ASGI 'lifespan' scope, which Django's ASGIHandler rejects,
+    and runs the registered startup/shutdown hooks. Everything else is passed
+    through to the wrapped Django application.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'lifespan':
+            return await self.app(scope, receive, send)
+
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    for hook in _startup_hooks:
+                        await hook()
+                except Exception as e:
+                    logger.error(f"ASGI startup hook failed: {e}", exc_info=True)
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for hook in reversed(_shutdown_hooks):
+                    try:
+                        await hook()
+                    except Exception as e:
+                        logger.error(f"ASGI shutdown hook failed: {e}", exc_info=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
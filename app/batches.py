@@ -0,0 +1,182 @@
+# taramgo/app/batches.py
+
+import csv
+import hashlib
+import io
+import json
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .cache import canonical_form_data
+from .jobs import wake_runner
+from .models import GenerationBatch, GenerationJob
+from .pipeline import clean_request_data, itinerary_request_key
+
+logger = logging.getLogger(__name__)
+
+# Form fields that take several values; in CSV they are separated by ';'.
+LIST_FIELDS = ('interests', 'food_preferences')
+
+
+class BatchError(ValueError):
+    """
+    The batch itself (not one of its items) is unusable.
+    """
+
+
+def _batch_setting(name, default):
+    return getattr(settings, 'ITINERARY_BATCH', {}).get(name, default)
+
+
+def _normalise_spec(spec):
+    """
+    Turn a CSV row or JSON object into ItineraryForm data.
+    """
+    data = {}
+    for key, value in spec.items():
+        if key is None or value in (None, ''):
+            continue
+        key = key.strip()
+        if key in LIST_FIELDS:
+            values = value.split(';') if isinstance(value, str) else list(value)
+            data[key] = [str(item).strip() for item in values if str(item).strip()]
+        else:
+            data[key] = str(value).strip()
+    return data
+
+
+def parse_specs(text, fmt=None):
+    """
+    Parse a CSV (header row of form field names) or JSONL document into a
+    list of request specs. The format is guessed from the first character
+    when not given.
+    """
+    text = text.lstrip('\ufeff')
+    fmt = fmt or ('jsonl' if text.lstrip().startswith('{') else 'csv')
+    if fmt == 'csv':
+        return [_normalise_spec(row) for row in csv.DictReader(io.StringIO(text))]
+    if fmt != 'jsonl':
+        raise BatchError(f"Unknown batch format {fmt!r}; use 'csv' or 'jsonl'.")
+    specs = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            spec = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise BatchError(f"Line {line_number} is not valid JSON: {e}")
+        if not isinstance(spec, dict):
+            raise BatchError(f"Line {line_number} is not a JSON object.")
+        specs.append(_normalise_spec(spec))
+    return specs
+
+
+def spec_hash(specs):
+    encoded = json.dumps(specs, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def create_batch(specs, name=''):
+    """
+    Queue one job per spec and return (batch, created). Submitting the same
+    specs again while an earlier batch of them is unfinished (items queued,
+    running, or failed with a valid request) returns that batch instead, so
+    an interrupted run picks up where it stopped; once it has finished, the
+    same specs make a new batch. Invalid specs are recorded as failed items.
+    """
+    if not specs:
+        raise BatchError("The batch has no request specs.")
+    max_items = _batch_setting('MAX_ITEMS', 1000)
+    if max_items and len(specs) > max_items:
+        raise BatchError(f"The batch has {len(specs)} specs; the limit is {max_items}.")
+
+    digest = spec_hash(specs)
+    unfinished = GenerationJob.objects.filter(
+        Q(status__in=(GenerationJob.Status.QUEUED, GenerationJob.Status.RUNNING))
+        | Q(status=GenerationJob.Status.FAILED) & ~Q(request_hash=''),
+    )
+    existing = GenerationBatch.objects.filter(spec_hash=digest, jobs__in=unfinished).order_by('-created_at').first()
+    if existing is not None:
+        return existing, False
+
+    jobs = []
+    for index, spec in enumerate(specs):
+        job = GenerationJob(batch_index=index, priority=_batch_setting('PRIORITY', 10), request_data=spec)
+        try:
+            cleaned_data = clean_request_data(spec)
+        except ValueError as e:
+            job.status = GenerationJob.Status.FAILED
+            job.error = str(e)
+            job.finished_at = timezone.now()
+        else:
+            job.request_hash = itinerary_request_key(cleaned_data)
+            job.request_data = canonical_form_data(cleaned_data)
+        jobs.append(job)
+
+    with transaction.atomic():
+        batch = GenerationBatch.objects.create(name=name[:200], spec_hash=digest)
+        for job in jobs:
+            job.batch = batch
+        GenerationJob.objects.bulk_create(jobs, batch_size=500)
+    logger.info(f"Queued itinerary batch {batch.public_id} with {len(jobs)} items.")
+    wake_runner()
+    return batch, True
+
+
+def retry_failed(batch):
+    """
+    Requeue the batch's failed items that have a valid request.
+    """
+    requeued = batch.jobs.filter(status=GenerationJob.Status.FAILED).exclude(request_hash='').update(
+        status=GenerationJob.Status.QUEUED, error='', worker='', started_at=None, finished_at=None,
+    )
+    if requeued:
+        wake_runner()
+    return requeued
+
+
+def reclaim_running(batch):
+    """
+    Requeue the batch's running items straight away, for when the process
+    that ran them is known to be gone (otherwise JOB_TIMEOUT does this).
+    """
+    return batch.jobs.filter(status=GenerationJob.Status.RUNNING).update(status=GenerationJob.Status.QUEUED, worker='')
+
+
+def batch_progress(batch):
+    counts = dict(batch.jobs.order_by().values('status').annotate(count=Count('id')).values_list('status', 'count'))
+    total = sum(counts.values())
+    active = counts.get(GenerationJob.Status.QUEUED, 0) + counts.get(GenerationJob.Status.RUNNING, 0)
+    return {
+        'total': total,
+        'queued': counts.get(GenerationJob.Status.QUEUED, 0),
+        'running': counts.get(GenerationJob.Status.RUNNING, 0),
+        'succeeded': counts.get(GenerationJob.Status.SUCCEEDED, 0),
+        'failed': counts.get(GenerationJob.Status.FAILED, 0),
+        'finished': total > 0 and active == 0,
+    }
+
+
+def batch_payload(batch, include_items=False):
+    payload = {
+        'id': str(batch.public_id),
+        'name': batch.name,
+        'status_url': batch.get_absolute_url(),
+        'created_at': batch.created_at.isoformat(),
+        'progress': batch_progress(batch),
+    }
+    if include_items:
+        payload['items'] = [
+            {
+                'index': job.batch_index,
+                'status': job.status,
+                'error': job.error or None,
+                'result_url': job.itinerary.get_absolute_url() if job.itinerary is not None else None,
+            }
+            for job in batch.jobs.select_related('itinerary').order_by('batch_index')
+        ]
+    return payload
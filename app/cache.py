@@ -0,0 +1,321 @@
+# taramgo/app/cache.py
+
+import datetime
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .prompts import compiled_schema
+
+logger = logging.getLogger(__name__)
+
+# Bump this whenever the shape of the cached itinerary changes so that stale
+# entries written by older code are never served.
+CACHE_KEY_VERSION = 1
+
+
+def _canonical(value):
+    """
+    Convert cleaned form values into a JSON-stable representation.
+    """
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sorted(_canonical(v) for v in value)
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def canonical_form_data(cleaned_data):
+    """
+    JSON-safe, order-independent copy of cleaned ItineraryForm data.
+    """
+    return _canonical(cleaned_data)
+
+
+def request_cache_key(cleaned_data, model_name, response_schema):
+    """
+    Content-addressed key for an itinerary request: a SHA-256 over the
+    canonicalised form data, the Gemini model name and the response schema.
+    """
+    # The same bytes as json.dumps({'v', 'form', 'model', 'schema'}) with
+    # sorted keys, with the schema part encoded once rather than per request.
+    form = json.dumps(_canonical(cleaned_data), sort_keys=True, separators=(',', ':'), default=str)
+    encoded = (f'{{"form":{form},"model":{json.dumps(model_name)},'
+               f'"schema":{compiled_schema(response_schema).canonical_json},"v":{CACHE_KEY_VERSION}}}')
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class BaseItineraryCache:
+    """
+    Common interface for itinerary cache backends.
+
+    Backends store JSON-serialisable itinerary data and keep hit/miss/eviction
+    counters. The sync get/set methods are the ones to override; the async
+    variants run them in a thread so blocking backends are safe to call from
+    the async view.
+    """
+
+    def __init__(self, timeout=None, max_entries=None, max_bytes=None, **options):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.options = options
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+
+    def _record(self, counter, amount=1):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    async def aget(self, key):
+        return await sync_to_async(self.get)(key)
+
+    async def aset(self, key, value):
+        return await sync_to_async(self.set)(key, value)
+
+    async def adelete(self, key):
+        return await sync_to_async(self.delete)(key)
+
+    def stats(self):
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': type(self).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'sets': self.sets,
+                'evictions': self.evictions,
+                'hit_ratio': (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+class LocMemBackend(BaseItineraryCache):
+    """
+    In-process LRU cache with per-entry TTL and entry/byte-size limits.
+    Values are stored as encoded JSON so callers always get a fresh copy.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._data = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _evict_one(self):
+        _, (_, size, _) = self._data.popitem(last=False)
+        self._size -= size
+        self._record('evictions')
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= time.monotonic():
+                self._size -= entry[1]
+                del self._data[key]
+                entry = None
+            if entry is None:
+                self._record('misses')
+                return None
+            self._data.move_to_end(key)
+        self._record('hits')
+        return json.loads(entry[2])
+
+    def set(self, key, value):
+        encoded = json.dumps(value, separators=(',', ':'))
+        size = len(encoded)
+        if self.max_bytes and size > self.max_bytes:
+            logger.debug(f"Not caching {key[:12]}: {size} bytes exceeds the cache size limit.")
+            return
+        expires_at = time.monotonic() + self.timeout if self.timeout else None
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._data[key] = (expires_at, size, encoded)
+            self._size += size
+            while (self.max_entries and len(self._data) > self.max_entries) or \
+                    (self.max_bytes and self._size > self.max_bytes):
+                self._evict_one()
+        self._record('sets')
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self._size -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aset(self, key, value):
+        return self.set(key, value)
+
+    async def adelete(self, key):
+        return self.delete(key)
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats.update(entries=len(self._data), bytes=self._size)
+        return stats
+
+
+class DjangoCacheBackend(BaseItineraryCache):
+    """
+    Stores itineraries in one of the caches from settings.CACHES. Size-based
+    eviction is delegated to that cache's own MAX_ENTRIES/culling options.
+    """
+
+    def __init__(self, alias='default', key_prefix='itinerary', **kwargs):
+        super().__init__(**kwargs)
+        self.alias = alias
+        self.key_prefix = key_prefix
+
+    @property
+    def _cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def _make_key(self, key):
+        return f"{self.key_prefix}:{key}"
+
+    def get(self, key):
+        value = self._cache.get(self._make_key(key))
+        self._record('hits' if value is not None else 'misses')
+        return value
+
+    def set(self, key, value):
+        if self.max_bytes and len(json.dumps(value, separators=(',', ':'))) > self.max_bytes:
+            return
+        self._cache.set(self._make_key(key), value, self.timeout)
+        self._record('sets')
+
+    def delete(self, key):
+        self._cache.delete(self._make_key(key))
+
+    def clear(self):
+        self._cache.clear()
+
+
+class DatabaseBackend(BaseItineraryCache):
+    """
+    Stores itineraries in the ItineraryCacheEntry table (SQLite or Postgres),
+    so cached plans survive restarts and are shared between workers. The
+    least recently used rows are evicted once the entry or byte limit is hit.
+    """
+
+    def _model(self):
+        from .models import ItineraryCacheEntry
+        return ItineraryCacheEntry
+
+    def get(self, key):
+        model = self._model()
+        now = timezone.now()
+        entry = model.objects.filter(key=key).only('value', 'expires_at').first()
+        if entry is None or (entry.expires_at is not None and entry.expires_at <= now):
+            if entry is not None:
+                entry.delete()
+            self._record('misses')
+            return None
+        model.objects.filter(key=key).update(last_accessed=now)
+        self._record('hits')
+        return entry.value
+
+    def set(self, key, value):
+        model = self._model()
+        size = len(json.dumps(value, separators=(',', ':')))
+        if self.max_bytes and size > self.max_bytes:
+            return
+        now = timezone.now()
+        expires_at = now + datetime.timedelta(seconds=self.timeout) if self.timeout else None
+        model.objects.update_or_create(
+            key=key,
+            defaults={'value': value, 'size_bytes': size, 'expires_at': expires_at, 'last_accessed': now},
+        )
+        self._record('sets')
+        self._evict()
+
+    def _evict(self):
+        from django.db.models import Sum
+
+        model = self._model()
+        model.objects.filter(expires_at__lte=timezone.now()).delete()
+        if self.max_entries:
+            stale = model.objects.order_by('-last_accessed').values_list('key', flat=True)[self.max_entries:]
+            stale_keys = list(stale)
+            if stale_keys:
+                model.objects.filter(key__in=stale_keys).delete()
+                self._record('evictions', len(stale_keys))
+        if self.max_bytes:
+            total = model.objects.aggregate(total=Sum('size_bytes'))['total'] or 0
+            for key, size in model.objects.order_by('last_accessed').values_list('key', 'size_bytes').iterator():
+                if total <= self.max_bytes:
+                    break
+                model.objects.filter(key=key).delete()
+                total -= size
+                self._record('evictions')
+
+    def delete(self, key):
+        self._model().objects.filter(key=key).delete()
+
+    def clear(self):
+        self._model().objects.all().delete()
+
+
+BACKEND_ALIASES = {
+    'locmem': 'app.cache.LocMemBackend',
+    'django': 'app.cache.DjangoCacheBackend',
+    'database': 'app.cache.DatabaseBackend',
+}
+
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+
+def get_itinerary_cache():
+    """
+    Return the process-wide itinerary cache configured by settings.ITINERARY_CACHE.
+    """
+    global _cache_instance
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                config = dict(getattr(settings, 'ITINERARY_CACHE', {}))
+                backend = config.pop('BACKEND', 'locmem')
+                backend_class = import_string(BACKEND_ALIASES.get(backend, backend))
+                options = {key.lower(): value for key, value in config.items()}
+                _cache_instance = backend_class(**options)
+                logger.info(f"Itinerary cache initialised with {backend_class.__name__}.")
+    return _cache_instance
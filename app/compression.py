@@ -0,0 +1,125 @@
+# taramgo/app/compression.py
+
+import gzip
+import logging
+import re
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+_CODING = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*')
+
+
+def _compression_setting(name, default):
+    return getattr(settings, 'RESPONSE_COMPRESSION', {}).get(name, default)
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(request):
+    """
+    The best content coding the client accepts: 'br' (when the brotli
+    package is installed), 'gzip', or None for an uncompressed response.
+    """
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if not header:
+        return None
+    accepted = {}
+    for item in header.split(','):
+        match = _CODING.fullmatch(item)
+        if match:
+            accepted[match.group(1).lower()] = float(match.group(2) or 1)
+    for encoding in available_encodings():
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding, precompressed=False):
+    """
+    Encode data for one response. Precompressed bodies are stored and served
+    many times, so they get the slow, maximum-ratio settings.
+    """
+    if encoding == 'br':
+        quality = 11 if precompressed else _compression_setting('BROTLI_QUALITY', 5)
+        return brotli.compress(data, quality=quality)
+    if precompressed:
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    # Random padding in the gzip header (BREACH mitigation) for pages that
+    # may carry a CSRF token.
+    return compress_string(data, max_random_bytes=100)
+
+
+def _precompressed_cache():
+    return caches[_compression_setting('CACHE_ALIAS', 'default')]
+
+
+async def precompressed(cache_key, encoding, build):
+    """
+    The body for cache_key in this encoding. `await build()` -> bytes runs
+    once; the plain body and each encoding are kept in the CACHE_ALIAS
+    cache, so later requests for a stored itinerary skip rendering and
+    compression.
+    """
+    cache = _precompressed_cache()
+    timeout = _compression_setting('PRECOMPRESSED_TIMEOUT', 60 * 60 * 24)
+    encoded_key = f"precompressed:{cache_key}:{encoding or 'identity'}"
+    body = await cache.aget(encoded_key)
+    if body is not None:
+        return body
+    plain_key = f"precompressed:{cache_key}:identity"
+    plain = None if encoding is None else await cache.aget(plain_key)
+    if plain is None:
+        plain = await build()
+        await cache.aset(plain_key, plain, timeout)
+    if encoding is None:
+        return plain
+    body = compress(plain, encoding, precompressed=True)
+    await cache.aset(encoded_key, body, timeout)
+    logger.debug(f"Precompressed {cache_key} with {encoding}: {len(plain)} -> {len(body)} bytes.")
+    return body
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Like django.middleware.gzip.GZipMiddleware, with brotli when it is
+    installed. Streaming responses (the SSE itinerary stream) are left alone
+    so each event still reaches the browser as soon as it is sent, and so are
+    responses that are already encoded (precompressed itinerary pages).
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < _compression_setting('MIN_SIZE', 500):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request)
+        if encoding is None:
+            return response
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
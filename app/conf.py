@@ -0,0 +1,100 @@
+# taramgo/app/conf.py
+
+import threading
+
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+DEFAULT_MODEL = 'gemini-1.5-flash'
+DEFAULT_API_BASE = 'https://generativelanguage.googleapis.com/v1beta'
+
+
+class GeminiConfig:
+    """
+    Validated Gemini connection settings from settings.GEMINI. Built on first
+    use (see get_gemini_config), so importing the app, running migrations or
+    collecting tests never needs an API key.
+    """
+    __slots__ = ('api_key', 'model', 'api_base')
+
+    def __init__(self, api_key, model=DEFAULT_MODEL, api_base=DEFAULT_API_BASE):
+        self.api_key = api_key
+        self.model = model
+        self.api_base = api_base
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, 'GEMINI', {})
+        errors = config_errors(config)
+        if errors:
+            raise ImproperlyConfigured(' '.join(errors))
+        return cls(
+            config['API_KEY'],
+            model=gemini_model(),
+            api_base=(config.get('API_BASE') or DEFAULT_API_BASE).rstrip('/'),
+        )
+
+    def model_url(self, model_name=None, method='generateContent'):
+        return f"{self.api_base}/models/{model_name or self.model}:{method}"
+
+
+def gemini_model():
+    """
+    The configured model name, which is part of every itinerary cache key.
+    Needs no API key, so cached itineraries are served even when generation
+    is not configured.
+    """
+    return getattr(settings, 'GEMINI', {}).get('MODEL') or DEFAULT_MODEL
+
+
+def config_errors(config):
+    """
+    What is wrong with a settings.GEMINI dict, as a list of messages.
+    """
+    errors = []
+    if not config.get('API_KEY'):
+        errors.append("GEMINI_API_KEY is not set in the environment or the project's .env file.")
+    api_base = config.get('API_BASE') or DEFAULT_API_BASE
+    if not api_base.startswith(('http://', 'https://')):
+        errors.append(f"GEMINI_API_BASE must be an http(s) URL, not {api_base!r}.")
+    return errors
+
+
+_gemini_config = None
+_gemini_config_lock = threading.Lock()
+
+
+def get_gemini_config():
+    """
+    Return the process-wide GeminiConfig, building and validating it on the
+    first call. Raises ImproperlyConfigured when settings.GEMINI is unusable.
+    """
+    global _gemini_config
+    if _gemini_config is None:
+        with _gemini_config_lock:
+            if _gemini_config is None:
+                _gemini_config = GeminiConfig.from_settings()
+    return _gemini_config
+
+
+@receiver(setting_changed)
+def _reset_gemini_config(setting, **kwargs):
+    # Tests that override settings.GEMINI get a config built from the new value.
+    global _gemini_config
+    if setting == 'GEMINI':
+        _gemini_config = None
+
+
+def check_gemini_config(app_configs, **kwargs):
+    """
+    System check (registered in AppConfig.ready) for settings.GEMINI. Only a
+    warning: migrate, collectstatic and the other commands that run checks
+    never call Gemini.
+    """
+    return [
+        checks.Warning(message, hint="Itinerary generation fails until this is fixed.", id='app.W001')
+        for message in config_errors(getattr(settings, 'GEMINI', {}))
+    ]
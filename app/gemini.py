@@ -0,0 +1,170 @@
+# taramgo/app/gemini.py
+
+import asyncio
+import contextlib
+import json
+import logging
+import time
+import weakref
+
+import httpx
+from django.conf import settings
+
+from .conf import get_gemini_config
+from .governor import get_governor
+from .hedging import get_hedger, remaining
+from .metrics import record_gemini_call, record_gemini_usage
+from .prompts import encode_payload
+
+logger = logging.getLogger(__name__)
+
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# One pooled client per event loop. httpx clients are bound to the loop they
+# first connect on, so a single global would break under runserver, where
+# every async request gets its own loop.
+_clients = weakref.WeakKeyDictionary()
+
+
+def _build_client():
+    config = getattr(settings, 'GEMINI_HTTP_CLIENT', {})
+    limits = httpx.Limits(
+        max_connections=config.get('MAX_CONNECTIONS', 100),
+        max_keepalive_connections=config.get('MAX_KEEPALIVE_CONNECTIONS', 20),
+        keepalive_expiry=config.get('KEEPALIVE_EXPIRY', 30.0),
+    )
+    return httpx.AsyncClient(
+        timeout=config.get('TIMEOUT', 90.0),
+        limits=limits,
+        http2=config.get('HTTP2', True),
+    )
+
+
+def get_client():
+    """
+    Return the shared AsyncClient for the running event loop, creating it on
+    first use. Callers must not close it; see aclose_clients().
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _build_client()
+        _clients[loop] = client
+        logger.debug(f"Created pooled Gemini HTTP client for loop {id(loop):#x}.")
+    return client
+
+
+async def aclose_clients():
+    """
+    Close the client owned by the running loop. Called on ASGI lifespan
+    shutdown; clients on other (already finished) loops are dropped with them.
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+        logger.debug("Closed pooled Gemini HTTP client.")
+
+
+def model_url(model_name=None, method='generateContent'):
+    return get_gemini_config().model_url(model_name, method)
+
+
+def _request_timeout():
+    # Never wait on the socket for longer than the request's remaining budget.
+    left = remaining()
+    if left is None:
+        return httpx.USE_CLIENT_DEFAULT
+    return max(0.1, left)
+
+
+async def _post(payload, model_name):
+    config = get_gemini_config()
+    started = time.perf_counter()
+    try:
+        response = await get_client().post(
+            config.model_url(model_name),
+            params={'key': config.api_key},
+            content=encode_payload(payload),
+            headers=JSON_HEADERS,
+            timeout=_request_timeout(),
+        )
+    except httpx.TransportError as e:
+        record_gemini_call(model_name, 'generateContent', type(e).__name__, time.perf_counter() - started)
+        raise
+    record_gemini_call(model_name, 'generateContent', response.status_code, time.perf_counter() - started)
+    response.raise_for_status()
+    response_data = response.json()
+    record_gemini_usage(model_name, response_data)
+    return response_data
+
+
+async def _governed_post(payload, model_name):
+    governor = get_governor()
+    if governor is None:
+        return await _post(payload, model_name)
+    return await governor.call(lambda: _post(payload, model_name))
+
+
+async def generate_content(payload, model_name=None):
+    """
+    POST a generateContent request (to the configured model unless
+    model_name is given) and return the decoded JSON body.
+    Goes through the upstream governor, which retries throttled and
+    transient failures, and the hedger, which races a second request against
+    slow ones within the current deadline. Raises httpx.HTTPStatusError for
+    non-2xx responses, governor.UpstreamUnavailable when the request is shed
+    and hedging.DeadlineExceeded when the budget runs out.
+    """
+    model_name = model_name or get_gemini_config().model
+    hedger = get_hedger()
+    if hedger is None:
+        return await _governed_post(payload, model_name)
+    return await hedger.call(lambda model: _governed_post(payload, model), model_name)
+
+
+async def stream_generate_content(payload, model_name=None):
+    """
+    POST a streamGenerateContent request (SSE framing) and yield the text of
+    each partial response as it arrives. The stream holds a governor slot
+    while open but is not retried, since text may already have been yielded.
+    """
+    config = get_gemini_config()
+    model_name = model_name or config.model
+    governor = get_governor()
+    status, usage = 'error', None
+    started = time.perf_counter()
+    async with governor.slot() if governor is not None else contextlib.nullcontext():
+        try:
+            async with get_client().stream(
+                'POST',
+                config.model_url(model_name, 'streamGenerateContent'),
+                params={'key': config.api_key, 'alt': 'sse'},
+                content=encode_payload(payload),
+                headers=JSON_HEADERS,
+                timeout=_request_timeout(),
+            ) as response:
+                status = response.status_code
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith('data:'):
+                        continue
+                    chunk = json.loads(line[len('data:'):])
+                    # Usage is cumulative; the last chunk has the totals.
+                    usage = chunk.get('usageMetadata') or usage
+                    for candidate in chunk.get('candidates', []):
+                        for part in candidate.get('content', {}).get('parts', []):
+                            if part.get('text'):
+                                yield part['text']
+        finally:
+            # Time to the end of the stream (or to the failure).
+            record_gemini_call(model_name, 'streamGenerateContent', status, time.perf_counter() - started)
+            record_gemini_usage(model_name, {'usageMetadata': usage})
+
+
+def response_text(response_data):
+    """
+    Extract the generated text from a generateContent response body.
+    """
+    return response_data['candidates'][0]['content']['parts'][0]['text']
@@ -0,0 +1,352 @@
+# taramgo/app/geocoding.py
+
+import json
+import logging
+import math
+import re
+import statistics
+import threading
+import unicodedata
+from collections import OrderedDict, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F
+
+from .gemini import generate_content, response_text
+from .models import Place
+from .optimizer import distance_matrix
+from .prompts import GEOCODE_SCHEMA, build_geocode_prompt, build_payload
+from .routing import haversine_m
+
+logger = logging.getLogger(__name__)
+
+# (latitude field, longitude field, name field) for every mappable point.
+POINT_FIELDS = {
+    'Visit': (('latitude', 'longitude', 'location_name'),),
+    'Travel': (
+        ('start_point_lat', 'start_point_lon', 'start_point_location'),
+        ('end_point_lat', 'end_point_lon', 'end_point_location'),
+    ),
+}
+
+
+def _geocoding_setting(name, default):
+    return getattr(settings, 'GEOCODING', {}).get(name, default)
+
+
+def normalise_name(name):
+    """
+    Accent-, case- and punctuation-insensitive key for a place or city name.
+    """
+    name = unicodedata.normalize('NFKD', str(name or '')).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', name.lower()).split())
+
+
+def _similar(a, b):
+    a, b = set(a.split()), set(b.split())
+    return bool(a and b) and len(a & b) / len(a | b) >= 0.5
+
+
+class GridIndex:
+    """
+    Fixed-size lat/lon grid for "what is near this point" lookups; a cell of
+    0.01 degrees is roughly 1 km.
+    """
+
+    def __init__(self, cell_degrees=0.01):
+        self.cell_degrees = cell_degrees
+        self._cells = defaultdict(list)
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def add(self, lat, lon, item):
+        self._cells[self._cell(lat, lon)].append((lat, lon, item))
+
+    def nearby(self, lat, lon, radius_m):
+        """
+        Items within radius_m of the point, nearest first, as (distance, item).
+        """
+        lat_cells = math.ceil(radius_m / 111_320 / self.cell_degrees)
+        lon_cells = math.ceil(radius_m / (111_320 * max(0.01, math.cos(math.radians(lat)))) / self.cell_degrees)
+        row, column = self._cell(lat, lon)
+        found = []
+        for r in range(row - lat_cells, row + lat_cells + 1):
+            for c in range(column - lon_cells, column + lon_cells + 1):
+                for item_lat, item_lon, item in self._cells.get((r, c), ()):
+                    distance = haversine_m((lat, lon), (item_lat, item_lon))
+                    if distance <= radius_m:
+                        found.append((distance, item))
+        found.sort(key=lambda entry: entry[0])
+        return found
+
+
+class CityPlaces:
+    """
+    The known places of one city: by normalised name and spatially.
+    """
+
+    def __init__(self, city_key, places, cell_degrees=0.01):
+        self.city_key = city_key
+        self.by_name = {}
+        self.grid = GridIndex(cell_degrees)
+        for place in places:
+            self._index(place)
+
+    def _index(self, place):
+        self.by_name[place.name_key] = place
+        self.grid.add(place.latitude, place.longitude, place)
+
+    def lookup(self, name_key, min_confirmations=1):
+        place = self.by_name.get(name_key)
+        if place is not None and place.confirmations >= min_confirmations:
+            return place
+        return None
+
+    def match(self, name_key, lat, lon, radius_m):
+        """
+        The known place this observation refers to: same name, or a similar
+        name close by.
+        """
+        place = self.by_name.get(name_key)
+        if place is not None:
+            return place
+        for _, candidate in self.grid.nearby(lat, lon, radius_m):
+            if _similar(candidate.name_key, name_key):
+                return candidate
+        return None
+
+    def centre(self, min_places):
+        confirmed = [place for place in self.by_name.values() if place.confirmations > 1]
+        if len(confirmed) < min_places:
+            return None
+        return (statistics.median(place.latitude for place in confirmed),
+                statistics.median(place.longitude for place in confirmed))
+
+    def remember(self, observations, snap_distance_m):
+        """
+        Record validated (name, lat, lon, source) observations: confirm the
+        places they agree with and add the ones not seen before.
+        """
+        confirmed, created = [], []
+        for name, lat, lon, source in observations:
+            name_key = normalise_name(name)[:200]
+            if not name_key:
+                continue
+            place = self.match(name_key, lat, lon, snap_distance_m)
+            if place is not None:
+                if haversine_m((lat, lon), (place.latitude, place.longitude)) <= snap_distance_m:
+                    confirmed.append(place)
+                continue
+            place = Place(city_key=self.city_key, name_key=name_key, name=name[:200],
+                          latitude=lat, longitude=lon, source=source)
+            created.append(place)
+            self._index(place)
+
+        if created:
+            Place.objects.bulk_create(created, ignore_conflicts=True)
+        if confirmed:
+            Place.objects.filter(city_key=self.city_key, name_key__in={p.name_key for p in confirmed}) \
+                .update(confirmations=F('confirmations') + 1)
+            for place in confirmed:
+                place.confirmations += 1
+
+
+class PlaceCache:
+    """
+    Process-wide LRU of CityPlaces loaded from the Place table.
+    """
+
+    def __init__(self, max_cities=256, cell_degrees=0.01):
+        self.max_cities = max_cities
+        self.cell_degrees = cell_degrees
+        self._cities = OrderedDict()
+        self._lock = threading.Lock()
+
+    def city(self, city):
+        city_key = normalise_name(city)[:100]
+        with self._lock:
+            places = self._cities.get(city_key)
+            if places is not None:
+                self._cities.move_to_end(city_key)
+                return places
+        places = CityPlaces(city_key, Place.objects.filter(city_key=city_key), self.cell_degrees)
+        with self._lock:
+            places = self._cities.setdefault(city_key, places)
+            while len(self._cities) > self.max_cities:
+                self._cities.popitem(last=False)
+        return places
+
+    def clear(self):
+        with self._lock:
+            self._cities.clear()
+
+
+_place_cache = None
+_place_cache_lock = threading.Lock()
+
+
+def get_place_cache():
+    global _place_cache
+    if _place_cache is None:
+        with _place_cache_lock:
+            if _place_cache is None:
+                _place_cache = PlaceCache(_geocoding_setting('MAX_CITIES', 256),
+                                          _geocoding_setting('CELL_DEGREES', 0.01))
+    return _place_cache
+
+
+def _read_point(activity, lat_field, lon_field):
+    try:
+        lat, lon = float(activity[lat_field]), float(activity[lon_field])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or (lat == 0 and lon == 0):
+        return None
+    return lat, lon
+
+
+def _repair(point, centre, max_distance_m):
+    """
+    The point if it lies near the city, a swapped or sign-flipped version of
+    it that does, or None.
+    """
+    if point is None:
+        return None
+    lat, lon = point
+    for candidate in ((lat, lon), (lon, lat), (-lat, lon), (lat, -lon), (-lat, -lon)):
+        if -90 <= candidate[0] <= 90 and haversine_m(candidate, centre) <= max_distance_m:
+            return candidate
+    return None
+
+
+def _cluster_centre(points, max_distance_m):
+    """
+    Median of the largest group of points lying within max_distance_m of one
+    of them. Most of Gemini's points are right, so this is inside the city
+    even when a few are swapped or wildly off.
+    """
+    if not points:
+        return None
+    close = distance_matrix(points) <= max_distance_m
+    best = [point for point, near in zip(points, close[close.sum(axis=1).argmax()]) if near]
+    return statistics.median(p[0] for p in best), statistics.median(p[1] for p in best)
+
+
+async def _geocode_followup(city, names):
+    """
+    One batched Gemini call for the coordinates of every unresolved place.
+    """
+    payload = build_payload(build_geocode_prompt(city, names), GEOCODE_SCHEMA)
+    response_data = await generate_content(payload)
+    results = {}
+    for entry in json.loads(response_text(response_data)):
+        point = _read_point(entry, 'latitude', 'longitude')
+        if point is not None:
+            results[normalise_name(entry.get('name'))] = point
+    return results
+
+
+class ValidationStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = defaultdict(int)
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                self.counts[name] += value
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+
+validation_stats = ValidationStats()
+
+
+async def validate_locations(itinerary_data, city):
+    """
+    Check every coordinate in the itinerary against the city: fix swapped or
+    sign-flipped pairs, snap names the place cache already knows, and ask
+    Gemini once, in a single batch, for whatever is still out of bounds.
+    Points that can't be repaired lose their coordinates so they are left off
+    the map instead of landing in the ocean.
+    """
+    if not _geocoding_setting('ENABLED', True) or not itinerary_data:
+        return itinerary_data
+
+    max_distance_m = _geocoding_setting('MAX_DISTANCE_KM', 60) * 1000
+    snap_distance_m = _geocoding_setting('SNAP_DISTANCE_M', 300)
+    min_confirmations = _geocoding_setting('MIN_CONFIRMATIONS', 2)
+    places = await sync_to_async(get_place_cache().city)(city)
+
+    refs = []
+    for day_plan in itinerary_data:
+        for activity in day_plan.get('activities', []):
+            for lat_field, lon_field, name_field in POINT_FIELDS.get(activity.get('type'), ()):
+                refs.append((activity, lat_field, lon_field, activity.get(name_field) or ''))
+    if not refs:
+        return itinerary_data
+
+    raw_points = [point for point in (_read_point(a, lat, lon) for a, lat, lon, _ in refs) if point]
+    centre = places.centre(_geocoding_setting('MIN_KNOWN_PLACES', 3)) or _cluster_centre(raw_points, max_distance_m)
+    if centre is None:
+        return itinerary_data
+
+    counts = defaultdict(int)
+    resolved, bad, observations = {}, [], []
+    # Visits first, so Travel endpoints named after a visit reuse its point.
+    refs.sort(key=lambda ref: ref[0].get('type') != 'Visit')
+    for activity, lat_field, lon_field, name in refs:
+        name_key = normalise_name(name)
+        original = _read_point(activity, lat_field, lon_field)
+        if name_key and name_key in resolved:
+            point = resolved[name_key]
+        else:
+            point = _repair(original, centre, max_distance_m)
+            known = places.lookup(name_key, min_confirmations) if name_key else None
+            if known is not None and (point is None or
+                                      haversine_m(point, (known.latitude, known.longitude)) > snap_distance_m):
+                point = (known.latitude, known.longitude)
+                counts['snapped'] += 1
+            elif point is not None and point != original:
+                counts['repaired'] += 1
+            elif point is not None and name_key:
+                observations.append((name, *point, 'model'))
+        if point is None:
+            bad.append((activity, lat_field, lon_field, name_key, name))
+            continue
+        if name_key:
+            resolved[name_key] = point
+        activity[lat_field], activity[lon_field] = point
+    counts['checked'] = len(refs)
+
+    if bad:
+        names = list(OrderedDict.fromkeys(name for *_, name_key, name in bad if name_key))
+        found = {}
+        if names and _geocoding_setting('FOLLOWUP', True):
+            try:
+                found = await _geocode_followup(city, names)
+            except Exception as e:
+                logger.warning(f"Geocoding follow-up for {len(names)} places in {city} failed: {e}")
+        for activity, lat_field, lon_field, name_key, name in bad:
+            point = resolved.get(name_key) or _repair(found.get(name_key), centre, max_distance_m)
+            if point is not None:
+                if name_key not in resolved:
+                    observations.append((name, *point, 'followup'))
+                    resolved[name_key] = point
+                counts['followup_fixed'] += 1
+            else:
+                counts['dropped'] += 1
+            activity[lat_field], activity[lon_field] = point if point is not None else (None, None)
+        logger.info(f"Geocoding for {city}: {len(bad)} bad points, {counts['followup_fixed']} fixed by follow-up.")
+
+    if observations:
+        try:
+            await sync_to_async(places.remember)(observations, snap_distance_m)
+        except Exception as e:
+            logger.error(f"Failed to update the place cache: {e}", exc_info=True)
+    validation_stats.add(**counts)
+    return itinerary_data
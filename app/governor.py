@@ -0,0 +1,365 @@
+# taramgo/app/governor.py
+
+import asyncio
+import collections
+import contextlib
+import email.utils
+import logging
+import random
+import threading
+import time
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Status codes that mean "slow down" rather than "this request is wrong".
+THROTTLE_STATUSES = (429, 503)
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class UpstreamUnavailable(Exception):
+    """
+    Raised without calling Gemini when the governor refuses a request.
+    retry_after is a hint, in seconds, for when trying again may succeed.
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UpstreamOverloaded(UpstreamUnavailable):
+    """
+    Too many requests are already waiting for an upstream slot.
+    """
+
+
+class CircuitOpen(UpstreamUnavailable):
+    """
+    Gemini has been failing; requests fail fast until the reset timeout.
+    """
+
+
+def parse_retry_after(value):
+    """
+    Seconds to wait from a Retry-After header (delta-seconds or HTTP-date).
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def retry_after_for(exc):
+    if isinstance(exc, httpx.HTTPStatusError):
+        return parse_retry_after(exc.response.headers.get('Retry-After'))
+    return None
+
+
+def is_retryable(exc):
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUSES
+    return isinstance(exc, httpx.TransportError)
+
+
+class UpstreamGovernor:
+    """
+    Adaptive concurrency limit for calls to Gemini.
+
+    The number of concurrent calls follows AIMD: each success adds roughly one
+    slot per window, each burst of 429/503s halves the limit, so throughput
+    settles just under the quota instead of collapsing into a wall of 429s.
+    An optional token bucket caps the request rate, a Retry-After header
+    pauses all callers, requests beyond MAX_QUEUE waiters are shed at once,
+    and repeated failures open a circuit breaker.
+
+    One instance is shared by every event loop in the process, so the state is
+    guarded by a thread lock and waiters are woken on their own loop.
+    """
+
+    def __init__(self, initial_concurrency=8, min_concurrency=1, max_concurrency=64, rate_limit=0, burst=10,
+                 max_queue=200, queue_timeout=30.0, max_retries=3, backoff_base=0.5, backoff_max=20.0,
+                 failure_threshold=5, reset_timeout=30.0, **options):
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.limit = float(max(min_concurrency, min(initial_concurrency, max_concurrency)))
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._waiters = collections.deque()
+        self.in_flight = 0
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+        self.successes = 0
+        self.throttled = 0
+        self.errors = 0
+        self.shed = 0
+        self.rejected = 0
+        self.retries = 0
+
+    # --- Circuit breaker -------------------------------------------------
+
+    def _check_circuit(self):
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self._opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpen("The Gemini API is failing; not sending more requests for now.", remaining)
+                self.state = HALF_OPEN
+                logger.info("Gemini circuit half-open; sending a probe request.")
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    self.rejected += 1
+                    raise CircuitOpen("Waiting for a probe request to the Gemini API.", self.reset_timeout)
+                self._probing = True
+
+    def _trip(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        logger.warning(f"Gemini circuit opened after {self.failures} failures; "
+                       f"failing fast for {self.reset_timeout:g}s.")
+
+    # --- Slots -----------------------------------------------------------
+
+    def _grant(self, future):
+        # Runs on the waiter's loop. A waiter that gave up hands its slot on.
+        if future.done():
+            self._release_slot()
+        else:
+            future.set_result(None)
+
+    def _wake_waiters(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            future = self._waiters.popleft()
+            self.in_flight += 1
+            try:
+                future.get_loop().call_soon_threadsafe(self._grant, future)
+            except RuntimeError:
+                # The waiter's loop has already closed.
+                self.in_flight -= 1
+
+    def _release_slot(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._wake_waiters()
+
+    async def _acquire_slot(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_flight < int(self.limit) and not self._waiters:
+                self.in_flight += 1
+                return
+            if self.max_queue is not None and len(self._waiters) >= self.max_queue:
+                self.shed += 1
+                raise UpstreamOverloaded(
+                    f"{len(self._waiters)} requests are already waiting for the Gemini API.", self.queue_timeout,
+                )
+            future = loop.create_future()
+            self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except BaseException as e:
+            # If the slot was granted meanwhile, _grant() sees the finished future and frees it.
+            with self._lock:
+                with contextlib.suppress(ValueError):
+                    self._waiters.remove(future)
+                if isinstance(e, asyncio.TimeoutError):
+                    self.shed += 1
+            if isinstance(e, asyncio.TimeoutError):
+                raise UpstreamOverloaded("Timed out waiting for a free Gemini API slot.", self.queue_timeout) from None
+            raise
+
+    async def _throttle(self):
+        """
+        Wait out a Retry-After pause and, with RATE_LIMIT set, take a token.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                delay = self.paused_until - now
+                if delay <= 0:
+                    if not self.rate_limit:
+                        return
+                    self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_limit)
+                    self._refilled_at = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    delay = (1 - self._tokens) / self.rate_limit
+            await asyncio.sleep(delay)
+
+    # --- Feedback --------------------------------------------------------
+
+    def _record_success(self):
+        with self._lock:
+            self.successes += 1
+            self.failures = 0
+            self._probing = False
+            if self.state != CLOSED:
+                self.state = CLOSED
+                logger.info("Gemini circuit closed.")
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._wake_waiters()
+
+    def _record_failure(self, started, throttled=False, retry_after=None, count=True):
+        with self._lock:
+            now = time.monotonic()
+            self._probing = False
+            if throttled:
+                self.throttled += 1
+                # A burst of 429s is one signal: only requests sent after the
+                # last decrease can ask for another one.
+                if started >= self._last_decrease:
+                    self.limit = max(self.min_concurrency, self.limit / 2)
+                    self._last_decrease = now
+                    logger.warning(f"Gemini throttled us; concurrency limit now {int(self.limit)}.")
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+            else:
+                self.errors += 1
+            if count:
+                self.failures += 1
+                if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                    self._trip()
+
+    def _record_neutral(self):
+        with self._lock:
+            self._probing = False
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """
+        Hold one upstream slot for the body of the block and learn from how
+        it ends. Raises UpstreamUnavailable instead of waiting when saturated.
+        """
+        self._check_circuit()
+        try:
+            await self._acquire_slot()
+        except BaseException:
+            self._record_neutral()
+            raise
+        try:
+            await self._throttle()
+            started = time.monotonic()
+            yield
+        except httpx.HTTPStatusError as e:
+            status = e.response.status_code
+            if status in THROTTLE_STATUSES:
+                # A 429 means the service is up, so only a 503 counts towards the breaker.
+                self._record_failure(started, throttled=True, retry_after=retry_after_for(e), count=status != 429)
+            elif status >= 500:
+                self._record_failure(started)
+            else:
+                self._record_neutral()
+            raise
+        except httpx.TransportError:
+            self._record_failure(started)
+            raise
+        except BaseException:
+            self._record_neutral()
+            raise
+        else:
+            self._record_success()
+        finally:
+            self._release_slot()
+
+    def has_spare_capacity(self):
+        """
+        Whether an extra (e.g. hedged) request could start without queueing.
+        """
+        with self._lock:
+            return (self.state == CLOSED and not self._waiters and self.in_flight < int(self.limit)
+                    and self.paused_until <= time.monotonic())
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        Exponential backoff with full jitter, never shorter than Retry-After.
+        """
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def call(self, func):
+        """
+        Run func() in a slot, retrying throttled, 5xx and transport failures.
+        """
+        attempt = 0
+        while True:
+            try:
+                async with self.slot():
+                    return await func()
+            except (httpx.HTTPStatusError, httpx.TransportError) as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self.backoff(attempt, retry_after_for(e))
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                reason = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else type(e).__name__
+                logger.warning(f"Gemini request failed ({reason}); retry {attempt}/{self.max_retries} in {delay:.1f}s.")
+                await asyncio.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'waiting': len(self._waiters),
+                'circuit': self.state,
+                'successes': self.successes,
+                'throttled': self.throttled,
+                'errors': self.errors,
+                'retries': self.retries,
+                'shed': self.shed,
+                'rejected': self.rejected,
+            }
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_governor():
+    """
+    Return the process-wide governor configured by settings.GEMINI_GOVERNOR,
+    or None when it is disabled.
+    """
+    global _governor
+    config = dict(getattr(settings, 'GEMINI_GOVERNOR', {}))
+    if not config.pop('ENABLED', True):
+        return None
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = UpstreamGovernor(**{key.lower(): value for key, value in config.items()})
+                logger.info(f"Gemini governor initialised with concurrency limit {int(_governor.limit)}.")
+    return _governor
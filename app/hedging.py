@@ -0,0 +1,238 @@
+# taramgo/app/hedging.py
+
+import asyncio
+import collections
+import contextlib
+import contextvars
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+
+from .governor import UpstreamUnavailable, get_governor
+
+logger = logging.getLogger(__name__)
+
+# Monotonic time by which the current itinerary must be finished. Tasks started
+# inside deadline() (e.g. the planner's per-day calls) inherit it.
+_deadline = contextvars.ContextVar('gemini_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """
+    The request's end-to-end time budget ran out before Gemini answered.
+    """
+
+
+@contextlib.contextmanager
+def deadline(seconds):
+    """
+    Give everything inside the block at most `seconds` in total. Nested
+    deadlines can only shorten the budget, never extend it.
+    """
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        expires_at = min(expires_at, current)
+    token = _deadline.set(expires_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """
+    Seconds left in the current budget, or None outside of deadline().
+    """
+    expires_at = _deadline.get()
+    return None if expires_at is None else expires_at - time.monotonic()
+
+
+class LatencyTracker:
+    """
+    Sliding window of call latencies per model. Failed calls count too, and
+    calls cancelled unfinished (a hedge won, or the budget ran out) count
+    with the time they had run: leaving the slow ones out would pull the
+    hedge threshold down.
+    """
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self._lock:
+            self._samples.setdefault(key, collections.deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key, percent, min_samples=1):
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        return samples[max(0, math.ceil(percent / 100 * len(samples)) - 1)]
+
+
+class Hedger:
+    """
+    Tail-latency control for Gemini calls.
+
+    A call that is still running after the HEDGE_PERCENTILE latency seen for
+    its model gets a second, identical request; the first answer wins and the
+    other is cancelled. Hedges are only sent when the governor has spare
+    capacity. Once less than FALLBACK_AT of the budget is left, calls and
+    hedges go to FALLBACK_MODEL instead.
+    """
+
+    def __init__(self, budget=90.0, hedge_percentile=95, hedge_min_delay=2.0, hedge_initial_delay=20.0,
+                 min_samples=20, window=200, fallback_model=None, fallback_at=0.25, **options):
+        self.budget = budget
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_initial_delay = hedge_initial_delay
+        self.min_samples = min_samples
+        self.fallback_model = fallback_model
+        self.fallback_at = fallback_at
+        self.latencies = LatencyTracker(window)
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+        self.deadlines_exceeded = 0
+
+    def _record(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def hedge_delay(self, model_name):
+        observed = self.latencies.percentile(model_name, self.hedge_percentile, self.min_samples)
+        return max(self.hedge_min_delay, observed if observed is not None else self.hedge_initial_delay)
+
+    def choose_model(self, model_name):
+        left = remaining()
+        if self.fallback_model and left is not None and left < self.budget * self.fallback_at:
+            self._record('fallbacks')
+            return self.fallback_model
+        return model_name
+
+    def _can_hedge(self):
+        governor = get_governor()
+        return governor is None or governor.has_spare_capacity()
+
+    def _start(self, tasks, func, model_name, role):
+        started = time.monotonic()
+
+        def finished(task):
+            # Successes and failures alike, except calls the governor turned
+            # away without sending; cancelled calls are recorded by call().
+            if not task.cancelled() and not isinstance(task.exception(), UpstreamUnavailable):
+                self.latencies.record(model_name, time.monotonic() - started)
+
+        task = asyncio.ensure_future(func(model_name))
+        task.add_done_callback(finished)
+        tasks[task] = (role, model_name, started)
+
+    async def _first_success(self, tasks):
+        pending, error = set(tasks), None
+        while pending:
+            left = remaining()
+            done, pending = await asyncio.wait(
+                pending, timeout=max(0.0, left) if left is not None else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                self._record('deadlines_exceeded')
+                raise DeadlineExceeded("The itinerary time budget ran out waiting for Gemini.")
+            for task in done:
+                if task.exception() is None:
+                    if tasks[task][0] == 'hedge':
+                        self._record('hedge_wins')
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    async def call(self, func, model_name):
+        """
+        Run func(model_name) under the current deadline, hedging it if it
+        runs long. func must be safe to call twice concurrently.
+        """
+        left = remaining()
+        if left is not None and left <= 0:
+            self._record('deadlines_exceeded')
+            raise DeadlineExceeded("The itinerary time budget was already spent.")
+        self._record('calls')
+
+        tasks = {}
+        primary_model = self.choose_model(model_name)
+        self._start(tasks, func, primary_model, 'primary')
+        abandoned = False
+        try:
+            # Latencies are kept per model actually called, so a call already
+            # on the fallback model is hedged by the fallback's timings.
+            delay = self.hedge_delay(primary_model)
+            if left is not None:
+                delay = min(delay, max(0.0, left))
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self._can_hedge() and (remaining() is None or remaining() > 0):
+                hedge_model = self.choose_model(model_name)
+                logger.info(f"Gemini call still running after {delay:.1f}s; hedging with {hedge_model}.")
+                self._record('hedges')
+                self._start(tasks, func, hedge_model, 'hedge')
+            return await self._first_success(tasks)
+        except asyncio.CancelledError:
+            # The caller went away: how long the calls had run says nothing
+            # about Gemini.
+            abandoned = True
+            raise
+        finally:
+            for task, (_, called_model, started) in tasks.items():
+                if not task.done():
+                    if not abandoned:
+                        # Outrun by a hedge or the budget: it took at least this long.
+                        self.latencies.record(called_model, time.monotonic() - started)
+                    task.cancel()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'calls': self.calls,
+                'hedges': self.hedges,
+                'hedge_wins': self.hedge_wins,
+                'fallbacks': self.fallbacks,
+                'deadlines_exceeded': self.deadlines_exceeded,
+            }
+
+
+_hedger = None
+_hedger_lock = threading.Lock()
+
+
+def _hedging_config():
+    return dict(getattr(settings, 'GEMINI_HEDGING', {}))
+
+
+def itinerary_budget():
+    """
+    End-to-end budget, in seconds, for generating one itinerary.
+    """
+    return _hedging_config().get('BUDGET', 90.0)
+
+
+def get_hedger():
+    """
+    Return the process-wide Hedger configured by settings.GEMINI_HEDGING, or
+    None when hedging is disabled (deadlines still apply).
+    """
+    global _hedger
+    config = _hedging_config()
+    if not config.pop('ENABLED', True):
+        return None
+    if _hedger is None:
+        with _hedger_lock:
+            if _hedger is None:
+                _hedger = Hedger(**{key.lower(): value for key, value in config.items()})
+    return _hedger
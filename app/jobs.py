@@ -0,0 +1,240 @@
+# taramgo/app/jobs.py
+
+import asyncio
+import datetime
+import logging
+import os
+import socket
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import canonical_form_data
+from .models import GenerationBatch, GenerationJob
+from .pipeline import clean_request_data, describe_error, get_or_generate_itinerary, itinerary_request_key
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (GenerationJob.Status.QUEUED, GenerationJob.Status.RUNNING)
+# Jobs are claimed lowest priority first; batch items queue behind (see
+# settings.ITINERARY_BATCH['PRIORITY']).
+INTERACTIVE_PRIORITY = 0
+
+
+class QueueFull(Exception):
+    """
+    Raised by enqueue_job() when MAX_QUEUE_DEPTH jobs are already waiting.
+    """
+
+
+def _jobs_setting(name, default):
+    return getattr(settings, 'ITINERARY_JOBS', {}).get(name, default)
+
+
+def jobs_enabled():
+    return _jobs_setting('ENABLED', False)
+
+
+async def enqueue_job(cleaned_data):
+    """
+    Queue an itinerary generation and return its GenerationJob. An identical
+    request that is already queued or running is returned instead of a new
+    job; a queued batch item is moved up to interactive priority first.
+    """
+    request_hash = itinerary_request_key(cleaned_data)
+    existing = await GenerationJob.objects.filter(request_hash=request_hash, status__in=ACTIVE_STATUSES).afirst()
+    if existing is not None:
+        if existing.priority > INTERACTIVE_PRIORITY:
+            promoted = await GenerationJob.objects.filter(
+                id=existing.id, status=GenerationJob.Status.QUEUED, priority__gt=INTERACTIVE_PRIORITY,
+            ).aupdate(priority=INTERACTIVE_PRIORITY)
+            if promoted:
+                existing.priority = INTERACTIVE_PRIORITY
+        return existing
+
+    max_depth = _jobs_setting('MAX_QUEUE_DEPTH', 100)
+    queued = GenerationJob.objects.filter(status=GenerationJob.Status.QUEUED, batch__isnull=True)
+    if max_depth and await queued.acount() >= max_depth:
+        raise QueueFull(f"The itinerary queue is full ({max_depth} jobs waiting).")
+
+    job = await GenerationJob.objects.acreate(
+        request_hash=request_hash, request_data=canonical_form_data(cleaned_data), priority=INTERACTIVE_PRIORITY,
+    )
+    logger.info(f"Queued itinerary job {job.public_id} for {cleaned_data['city']}.")
+    wake_runner()
+    return job
+
+
+def wake_runner():
+    """
+    Let the in-process worker pool, if any, pick up new jobs immediately.
+    """
+    if _runner is not None:
+        _runner.wake()
+
+
+def claim_next_job(worker_id):
+    """
+    Atomically move the next queued job (lowest priority, then oldest) to
+    'running'. The conditional UPDATE makes this safe across processes on
+    both SQLite and Postgres without row locks; losing a race just means
+    trying the next job.
+    """
+    for _ in range(5):
+        job_id = (
+            GenerationJob.objects.filter(status=GenerationJob.Status.QUEUED)
+            .order_by('priority', 'created_at').values_list('id', flat=True).first()
+        )
+        if job_id is None:
+            return None
+        claimed = GenerationJob.objects.filter(id=job_id, status=GenerationJob.Status.QUEUED).update(
+            status=GenerationJob.Status.RUNNING,
+            started_at=timezone.now(),
+            worker=worker_id,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return GenerationJob.objects.get(id=job_id)
+    return None
+
+
+def requeue_stale_jobs():
+    """
+    Jobs left 'running' past JOB_TIMEOUT belong to a worker that died. Requeue
+    them, or fail them once MAX_ATTEMPTS is used up.
+    """
+    cutoff = timezone.now() - datetime.timedelta(seconds=_jobs_setting('JOB_TIMEOUT', 300))
+    stale = GenerationJob.objects.filter(status=GenerationJob.Status.RUNNING, started_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=_jobs_setting('MAX_ATTEMPTS', 3)).update(
+        status=GenerationJob.Status.FAILED, error="The job timed out.", finished_at=timezone.now(),
+    )
+    requeued = stale.update(status=GenerationJob.Status.QUEUED, worker='')
+    if failed or requeued:
+        logger.warning(f"Recovered stale itinerary jobs: {requeued} requeued, {failed} failed.")
+    return requeued
+
+
+def prune_finished_jobs(max_age_days):
+    cutoff = timezone.now() - datetime.timedelta(days=max_age_days)
+    deleted = GenerationJob.objects.exclude(status__in=ACTIVE_STATUSES).filter(created_at__lt=cutoff).delete()[0]
+    GenerationBatch.objects.filter(jobs__isnull=True, created_at__lt=cutoff).delete()
+    return deleted
+
+
+async def run_job(job):
+    """
+    Run one claimed job through the shared generation pipeline.
+    """
+    try:
+        cleaned_data = clean_request_data(job.request_data)
+        _, stored, _ = await get_or_generate_itinerary(cleaned_data)
+        if stored is None:
+            raise RuntimeError("The generated itinerary could not be saved.")
+        job.itinerary = stored
+        job.status = GenerationJob.Status.SUCCEEDED
+        job.error = ''
+    except Exception as e:
+        job.status = GenerationJob.Status.FAILED
+        job.error = describe_error(e)
+    job.finished_at = timezone.now()
+    await job.asave(update_fields=['itinerary', 'status', 'error', 'finished_at'])
+    logger.info(f"Itinerary job {job.public_id} finished: {job.status}.")
+    return job
+
+
+class JobRunner:
+    """
+    Local worker pool: CONCURRENCY asyncio tasks that claim jobs from the
+    GenerationJob table and run them. No external broker is needed; several
+    processes can run pools against the same database.
+    """
+
+    def __init__(self, concurrency=None, poll_interval=None):
+        self.concurrency = concurrency or _jobs_setting('CONCURRENCY', 4)
+        self.poll_interval = poll_interval or _jobs_setting('POLL_INTERVAL', 1.0)
+        self.requeue_interval = _jobs_setting('REQUEUE_INTERVAL', 60)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks = []
+        self._wakeup = None
+
+    def wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work(index)) for index in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._requeue_stale()))
+        logger.info(f"Itinerary job runner started with {self.concurrency} workers ({self.worker_id}).")
+
+    async def _work(self, index):
+        worker_id = f"{self.worker_id}/{index}"
+        while True:
+            try:
+                job = await sync_to_async(claim_next_job)(worker_id)
+            except Exception as e:
+                logger.error(f"Failed to claim an itinerary job: {e}", exc_info=True)
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await run_job(job)
+            except Exception as e:
+                # The job stays 'running' until _requeue_stale picks it up.
+                logger.error(f"Failed to finish itinerary job {job.public_id}: {e}", exc_info=True)
+
+    async def _requeue_stale(self):
+        """
+        Recover jobs abandoned by a crashed worker in any process, now and
+        every REQUEUE_INTERVAL seconds.
+        """
+        while True:
+            try:
+                await sync_to_async(requeue_stale_jobs)()
+            except Exception as e:
+                logger.error(f"Failed to requeue stale itinerary jobs: {e}", exc_info=True)
+            else:
+                self.wake()
+            await asyncio.sleep(self.requeue_interval)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Itinerary job runner stopped.")
+
+    async def run_forever(self):
+        await self.start()
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.stop()
+
+
+_runner = None
+
+
+async def start_in_process_runner():
+    """
+    ASGI startup hook: run the worker pool inside the web process when
+    ITINERARY_JOBS['ENABLED'] and ['RUN_IN_PROCESS'] are set.
+    """
+    global _runner
+    if jobs_enabled() and _jobs_setting('RUN_IN_PROCESS', True) and _runner is None:
+        _runner = JobRunner()
+        await _runner.start()
+
+
+async def stop_in_process_runner():
+    global _runner
+    if _runner is not None:
+        await _runner.stop()
+        _runner = None
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from django.conf import settings
+
+from app.jobs import prune_finished_jobs
+from app.store import prune_itineraries
+
+
+class Command(BaseCommand):
+    help = "Delete expired, duplicate and overflow stored itineraries, and old finished generation jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Delete itineraries older than this many days.")
+        parser.add_argument('--max-rows', type=int, help="Keep at most this many of the newest itineraries.")
+        parser.add_argument(
+            '--no-compact', action='store_true',
+            help="Keep older itineraries that share a request hash with a newer one.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_itineraries(
+            max_age_days=options['days'],
+            max_rows=options['max_rows'],
+            compact=not options['no_compact'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} stored itineraries."))
+
+        max_age_days = options['days'] or getattr(settings, 'ITINERARY_RETENTION', {}).get('MAX_AGE_DAYS')
+        if max_age_days:
+            jobs = prune_finished_jobs(max_age_days)
+            self.stdout.write(self.style.SUCCESS(f"Deleted {jobs} finished generation jobs."))
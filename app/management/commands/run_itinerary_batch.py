@@ -0,0 +1,79 @@
+import asyncio
+import os
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.batches import BatchError, batch_progress, create_batch, parse_specs, reclaim_running, retry_failed
+from app.jobs import JobRunner
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute itineraries from a CSV or JSONL file of request specs. Running it again with the "
+        "same file resumes the batch while it has queued, running or retryable failed items; once it "
+        "has finished, the same file starts a new batch that queues every item again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV (header of form field names, lists separated by ';') or JSONL file.")
+        parser.add_argument('--format', choices=('csv', 'jsonl'), help="Defaults to guessing from the content.")
+        parser.add_argument('--name', default='', help="Label for the batch; defaults to the file name.")
+        parser.add_argument('--concurrency', type=int, help="Items to generate at once.")
+        parser.add_argument('--retry-failed', action='store_true', help="Requeue items that failed last time.")
+        parser.add_argument(
+            '--reclaim', action='store_true',
+            help="Requeue items left running by a previous run that was interrupted.",
+        )
+        parser.add_argument(
+            '--enqueue-only', action='store_true',
+            help="Queue the batch and exit; run_itinerary_worker processes it.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], encoding='utf-8-sig') as spec_file:
+                specs = parse_specs(spec_file.read(), options['format'])
+            batch, created = create_batch(specs, options['name'] or os.path.basename(options['path']))
+        except (OSError, BatchError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{'Created' if created else 'Resuming'} batch {batch.public_id} ({len(specs)} items).")
+        if options['retry_failed']:
+            self.stdout.write(f"Requeued {retry_failed(batch)} failed items.")
+        if options['reclaim']:
+            self.stdout.write(f"Requeued {reclaim_running(batch)} interrupted items.")
+        if options['enqueue_only']:
+            self.stdout.write(f"Status: {batch.get_absolute_url()}")
+            return
+
+        concurrency = options['concurrency'] or getattr(settings, 'ITINERARY_BATCH', {}).get('CONCURRENCY', 16)
+        try:
+            progress = asyncio.run(self._run(batch, concurrency))
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped; run the same command again to resume.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Batch finished: {progress['succeeded']} succeeded, {progress['failed']} failed."
+        ))
+
+    async def _run(self, batch, concurrency):
+        runner = JobRunner(concurrency=concurrency)
+        await runner.start()
+        last = None
+        try:
+            while True:
+                progress = await sync_to_async(batch_progress)(batch)
+                counts = (progress['succeeded'], progress['failed'], progress['running'])
+                if counts != last:
+                    self.stdout.write(
+                        f"{progress['succeeded'] + progress['failed']}/{progress['total']} done "
+                        f"({progress['succeeded']} succeeded, {progress['failed']} failed, {progress['running']} running)"
+                    )
+                    last = counts
+                if progress['finished']:
+                    return progress
+                await asyncio.sleep(1.0)
+        finally:
+            await runner.stop()
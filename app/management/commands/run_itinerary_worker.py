@@ -0,0 +1,21 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from app.jobs import JobRunner
+
+
+class Command(BaseCommand):
+    help = "Run a pool of workers that process queued itinerary generation jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, help="Number of jobs to run at once.")
+        parser.add_argument('--poll-interval', type=float, help="Seconds to wait between empty queue checks.")
+
+    def handle(self, *args, **options):
+        runner = JobRunner(concurrency=options['concurrency'], poll_interval=options['poll_interval'])
+        self.stdout.write(f"Processing itinerary jobs with {runner.concurrency} workers (Ctrl+C to stop).")
+        try:
+            asyncio.run(runner.run_forever())
+        except KeyboardInterrupt:
+            self.stdout.write("Worker stopped.")
@@ -0,0 +1,301 @@
+# taramgo/app/metrics.py
+
+import bisect
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers in-process stages (sub-millisecond) up to whole Gemini calls.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _metrics_setting(name, default):
+    return getattr(settings, 'METRICS', {}).get(name, default)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels, e.g.
+    counter.inc(model='gemini-1.5-flash', status='200').
+    """
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        # The name its HELP/TYPE lines and samples are exposed under.
+        self.family = f"{name}_total"
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def snapshot(self):
+        """
+        {label values: count} for every series seen so far.
+        """
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [(self.family, _labels(self.labelnames, key), value) for key, value in values]
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram (Prometheus semantics) with optional labels.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.family = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), sum.
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            return sum(series[0]) if series else 0
+
+    def snapshot(self):
+        """
+        {label values: (count, sum)} for every series seen so far.
+        """
+        with self._lock:
+            return {key: (sum(counts), total) for key, (counts, total) in self._series.items()}
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        samples = []
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", _labels(self.labelnames, key, f'le="{_number(bound)}"'), cumulative))
+            samples.append((f"{self.name}_sum", _labels(self.labelnames, key), total))
+            samples.append((f"{self.name}_count", _labels(self.labelnames, key), cumulative))
+        return samples
+
+
+class Registry:
+    """
+    The metrics of this process, plus collectors that read gauges from the
+    existing stats() methods at scrape time.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, func):
+        """
+        Register func() -> [(name, kind, help, [(labels dict, value), ...])].
+        """
+        self._collectors.append(func)
+        return func
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.family} {metric.documentation}")
+            lines.append(f"# TYPE {metric.family} {metric.kind}")
+            lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in metric.samples())
+        for func in self._collectors:
+            try:
+                families = func()
+            except Exception as e:
+                logger.warning(f"Metrics collector {func.__name__} failed: {e}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    label_text = _labels(tuple(labels), tuple(labels.values()))
+                    lines.append(f"{name}{label_text} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+stage_seconds = registry.register(Histogram(
+    'itinerary_stage_seconds', "Time spent in each itinerary pipeline stage.", ('stage',),
+))
+gemini_requests = registry.register(Counter(
+    'gemini_requests', "Gemini HTTP requests by model, method and response status.", ('model', 'method', 'status'),
+))
+gemini_request_seconds = registry.register(Histogram(
+    'gemini_request_seconds', "Gemini HTTP round-trip time, per attempt.", ('model', 'method'),
+))
+gemini_tokens = registry.register(Counter(
+    'gemini_tokens', "Tokens reported in Gemini usageMetadata.", ('model', 'kind'),
+))
+itinerary_requests = registry.register(Counter(
+    'itinerary_requests', "Buffered itinerary requests by where the result came from.", ('source',),
+))
+
+
+def _tracer():
+    if otel_trace is None or not _metrics_setting('TRACING', False):
+        return None
+    return otel_trace.get_tracer('app')
+
+
+class stage:
+    """
+    Time a pipeline stage into itinerary_stage_seconds and, when TRACING is
+    on and OpenTelemetry is installed, wrap it in a span of the same name.
+
+        with stage('prompt'):
+            payload = build_payload(...)
+    """
+    __slots__ = ('name', 'started', 'span')
+
+    def __init__(self, name):
+        self.name = name
+        self.span = None
+
+    def __enter__(self):
+        tracer = _tracer()
+        if tracer is not None:
+            self.span = tracer.start_as_current_span(f"itinerary.{self.name}")
+            self.span.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        stage_seconds.observe(time.perf_counter() - self.started, stage=self.name)
+        if self.span is not None:
+            return self.span.__exit__(exc_type, exc, tb)
+        return False
+
+
+def record_gemini_call(model, method, status, seconds):
+    gemini_requests.inc(model=model, method=method, status=str(status))
+    gemini_request_seconds.observe(seconds, model=model, method=method)
+
+
+def record_gemini_usage(model, response_data):
+    """
+    Count the prompt and output tokens of a (possibly partial) response body.
+    """
+    usage = response_data.get('usageMetadata') if isinstance(response_data, dict) else None
+    if not usage:
+        return
+    for kind, field in (('prompt', 'promptTokenCount'), ('output', 'candidatesTokenCount')):
+        if usage.get(field):
+            gemini_tokens.inc(usage[field], model=model, kind=kind)
+
+
+@registry.collector
+def _component_stats():
+    # Imported here: these modules import this one to record their timings.
+    from .cache import get_itinerary_cache
+    from .geocoding import validation_stats
+    from .governor import CLOSED, get_governor
+    from .hedging import get_hedger
+    from .similarity import similarity_stats
+    from .singleflight import itinerary_flights
+
+    cache_stats = get_itinerary_cache().stats()
+    families = [
+        ('itinerary_cache_lookups_total', 'counter', "Itinerary cache lookups.",
+         [({'result': 'hit'}, cache_stats['hits']), ({'result': 'miss'}, cache_stats['misses'])]),
+        ('itinerary_cache_hit_ratio', 'gauge', "Share of itinerary cache lookups that hit.",
+         [({}, cache_stats['hit_ratio'])]),
+        ('itinerary_cache_evictions_total', 'counter', "Itinerary cache evictions.", [({}, cache_stats['evictions'])]),
+    ]
+    if 'entries' in cache_stats:
+        families.append(('itinerary_cache_entries', 'gauge', "Entries in the in-process itinerary cache.",
+                         [({}, cache_stats['entries'])]))
+        families.append(('itinerary_cache_bytes', 'gauge', "Encoded size of the in-process itinerary cache.",
+                         [({}, cache_stats['bytes'])]))
+
+    similar = similarity_stats.stats()
+    families.append(('itinerary_similar_lookups_total', 'counter', "Near-duplicate lookups.",
+                     [({'result': 'hit'}, similar['hits']), ({'result': 'miss'}, similar['lookups'] - similar['hits'])]))
+    flights = itinerary_flights.stats()
+    families.append(('itinerary_singleflight_total', 'counter', "Generations led versus joined in flight.",
+                     [({'role': 'leader'}, flights['leaders']), ({'role': 'coalesced'}, flights['coalesced'])]))
+    families.append(('geocoding_points_total', 'counter', "Coordinate validation outcomes.",
+                     [({'outcome': outcome}, count) for outcome, count in sorted(validation_stats.snapshot().items())]))
+
+    governor = get_governor()
+    if governor is not None:
+        stats = governor.stats()
+        families.append(('gemini_governor_limit', 'gauge', "Current adaptive concurrency limit.", [({}, stats['limit'])]))
+        families.append(('gemini_governor_in_flight', 'gauge', "Gemini calls holding a slot.", [({}, stats['in_flight'])]))
+        families.append(('gemini_governor_waiting', 'gauge', "Gemini calls queued for a slot.", [({}, stats['waiting'])]))
+        families.append(('gemini_governor_circuit_open', 'gauge', "1 while the circuit breaker is not closed.",
+                         [({}, int(stats['circuit'] != CLOSED))]))
+        families.append(('gemini_governor_events_total', 'counter', "Governor outcomes.", [
+            ({'event': event}, stats[event]) for event in ('successes', 'throttled', 'errors', 'retries', 'shed', 'rejected')
+        ]))
+    hedger = get_hedger()
+    if hedger is not None:
+        stats = hedger.stats()
+        families.append(('gemini_hedging_events_total', 'counter', "Hedged-call outcomes.", [
+            ({'event': event}, value) for event, value in stats.items()
+        ]))
+    return families
+
+
+def render_metrics():
+    return registry.render()
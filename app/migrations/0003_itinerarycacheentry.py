@@ -0,0 +1,26 @@
+# Generated by Django 5.1.4 on 2026-10-17 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('app', '0002_delete_itinerary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItineraryCacheEntry',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('value', models.JSONField()),
+                ('size_bytes', models.PositiveIntegerField(default=0)),
+                ('expires_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('last_accessed', models.DateTimeField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-17 01:47
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_itinerarycacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Itinerary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('public_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('request_hash', models.CharField(db_index=True, max_length=64)),
+                ('city', models.CharField(max_length=255)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('request_data', models.JSONField(default=dict)),
+                ('itinerary_data', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['city', 'start_date', 'end_date'], name='itinerary_city_dates_idx')],
+            },
+        ),
+    ]
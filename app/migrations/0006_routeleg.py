@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-17 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_generationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteLeg',
+            fields=[
+                ('key', models.CharField(max_length=128, primary_key=True, serialize=False)),
+                ('profile', models.CharField(max_length=20)),
+                ('polyline', models.TextField()),
+                ('distance_m', models.FloatField()),
+                ('duration_s', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-17 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_place'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itinerary',
+            name='match_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
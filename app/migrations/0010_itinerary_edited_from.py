@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-17 02:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_generationbatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itinerary',
+            name='edited_from',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='edits', to='app.itinerary'),
+        ),
+        migrations.AlterField(
+            model_name='itinerary',
+            name='request_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
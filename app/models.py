@@ -1,14 +1,188 @@
 # # taramgo/app/models.py
+import datetime
+import uuid
+
 from django.db import models
+from django.urls import reverse
+from django.utils import timezone
+
+class ItineraryQuerySet(models.QuerySet):
+
+    def latest_for_hash(self, request_hash):
+        # Edits are stored with an empty hash, so they never answer a form submission.
+        return self.filter(request_hash=request_hash).exclude(request_hash='').order_by('-created_at')
+
+    def prune(self, max_age_days=None, max_rows=None, compact=True):
+        """
+        Retention/compaction: drop rows older than max_age_days, keep only the
+        newest row per request hash (edits, which have none, are kept), then
+        cap the table at max_rows.
+        Returns the number of deleted rows.
+        """
+        deleted = 0
+        if max_age_days:
+            cutoff = timezone.now() - datetime.timedelta(days=max_age_days)
+            deleted += self.filter(created_at__lt=cutoff).delete()[0]
+        if compact:
+            newest = self.values('request_hash').annotate(newest_id=models.Max('id')).values('newest_id')
+            deleted += self.exclude(request_hash='').exclude(id__in=models.Subquery(newest)).delete()[0]
+        if max_rows:
+            overflow = list(self.order_by('-created_at').values_list('id', flat=True)[max_rows:])
+            if overflow:
+                deleted += self.filter(id__in=overflow).delete()[0]
+        return deleted
+
+
+class Itinerary(models.Model):
+    """
+    A generated itinerary, kept so it can be reloaded and shared through its
+    permalink without calling Gemini again.
+    """
+    public_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    # Empty for edits (app.regeneration), which no other request may be served.
+    request_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    # Shared by near-duplicate requests (app.similarity.match_key); empty for edits.
+    match_key = models.CharField(max_length=64, blank=True, db_index=True)
+    # The itinerary this one was regenerated from, for edits.
+    edited_from = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, related_name='edits')
+    city = models.CharField(max_length=255)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    # Canonical form data the itinerary was generated from.
+    request_data = models.JSONField(default=dict)
+    itinerary_data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ItineraryQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['city', 'start_date', 'end_date'], name='itinerary_city_dates_idx'),
+        ]
+
+    def __str__(self):
+        return f"Itinerary for {self.city} created at {self.created_at.strftime('%Y-%m-%d')}"
+
+    def get_absolute_url(self):
+        return reverse('itinerary_detail', args=[self.public_id])
+
+
+class ItineraryCacheEntry(models.Model):
+    """
+    A cached Gemini itinerary, keyed by the canonical request hash.
+    Backs app.cache.DatabaseBackend.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    value = models.JSONField()
+    size_bytes = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    last_accessed = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Cache entry {self.key[:12]} ({self.size_bytes} bytes)"
+
+
+class GenerationBatch(models.Model):
+    """
+    A bulk precomputation run: one GenerationJob per request spec, so each
+    item has its own status and an interrupted batch can be resumed.
+    """
+    public_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    name = models.CharField(max_length=200, blank=True)
+    # SHA-256 of the submitted specs; resubmitting the same specs resumes this
+    # batch until it has finished (see batches.create_batch).
+    spec_hash = models.CharField(max_length=64, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Batch {self.name or self.public_id}"
+
+    def get_absolute_url(self):
+        return reverse('batch_status', args=[self.public_id])
+
+
+class GenerationJob(models.Model):
+    """
+    A queued itinerary generation, run by the worker pool in app.jobs so
+    the submitting request can return immediately.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        SUCCEEDED = 'succeeded', 'Succeeded'
+        FAILED = 'failed', 'Failed'
+
+    public_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.QUEUED)
+    request_hash = models.CharField(max_length=64, db_index=True)
+    # Canonical form data, re-validated through ItineraryForm by the worker.
+    request_data = models.JSONField()
+    itinerary = models.ForeignKey(Itinerary, null=True, blank=True, on_delete=models.SET_NULL, related_name='jobs')
+    batch = models.ForeignKey(GenerationBatch, null=True, blank=True, on_delete=models.CASCADE, related_name='jobs')
+    # Position of the spec in its batch.
+    batch_index = models.PositiveIntegerField(null=True, blank=True)
+    # Lower runs first: interactive requests (0) overtake batch items.
+    priority = models.SmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'priority', 'created_at'], name='job_status_priority_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.public_id} ({self.status})"
+
+    def get_absolute_url(self):
+        return reverse('job_status', args=[self.public_id])
+
+
+class RouteLeg(models.Model):
+    """
+    Road route between two points, as returned by the OSRM-compatible routing
+    service (app.routing). Keyed by profile and coordinates rounded to
+    ROUTING['PRECISION'] decimals, so nearby legs share one entry.
+    """
+    key = models.CharField(max_length=128, primary_key=True)
+    profile = models.CharField(max_length=20)
+    # Google encoded polyline (precision 5) of the full route geometry.
+    polyline = models.TextField()
+    distance_m = models.FloatField()
+    duration_s = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.key
+
+
+class Place(models.Model):
+    """
+    Known coordinates for a place name in a city, learned from validated
+    itineraries and geocoding follow-ups (app.geocoding).
+    """
+    city_key = models.CharField(max_length=100)
+    name_key = models.CharField(max_length=200)
+    name = models.CharField(max_length=200)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    source = models.CharField(max_length=20, default='model')
+    # How many separate itineraries placed it within SNAP_DISTANCE_M of here.
+    confirmations = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['city_key', 'name_key'], name='place_city_name_unique'),
+        ]
 
-# class Itinerary(models.Model):
-#     # Use Django's built-in JSONField, which is compatible with SQLite
-#     itinerary_data = models.JSONField()
-    
-#     # Optional metadata fields
-#     city = models.CharField(max_length=255)
-#     created_at = models.DateTimeField(auto_now_add=True)
-#     updated_at = models.DateTimeField(auto_now=True)
-
-#     def __str__(self):
-#         return f"Itinerary for {self.city} created at {self.created_at.strftime('%Y-%m-%d')}"
\ No newline at end of file
+    def __str__(self):
+        return f"{self.name} ({self.latitude}, {self.longitude})"
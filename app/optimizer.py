@@ -0,0 +1,271 @@
+# taramgo/app/optimizer.py
+
+import datetime
+import logging
+import math
+import re
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371008.8
+
+# Rough door-to-door speeds used to re-time legs that no longer match Gemini's.
+WALK_MAX_M = 1200
+WALK_M_PER_MIN = 80
+TRANSIT_M_PER_MIN = 330
+TRANSIT_OVERHEAD_MIN = 10
+# Stops closer than this need no Travel leg between them.
+SAME_PLACE_M = 100
+
+TIME_PATTERN = re.compile(r'(\d{1,2}):(\d{2})\s*([AaPp]\.?[Mm]\.?)?')
+
+
+def _optimizer_setting(name, default):
+    return getattr(settings, 'ITINERARY_OPTIMIZER', {}).get(name, default)
+
+
+def distance_matrix(coordinates):
+    """
+    Pairwise haversine distances in metres for an (n, 2) array of lat/lon degrees.
+    """
+    radians = np.radians(np.asarray(coordinates, dtype=float))
+    lat, lon = radians[:, 0], radians[:, 1]
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def path_length(matrix, order):
+    order = np.asarray(order)
+    return float(matrix[order[:-1], order[1:]].sum())
+
+
+def nearest_neighbour(matrix):
+    """
+    Greedy open path from node 0 to node n-1 through every other node.
+    """
+    n = len(matrix)
+    order = [0]
+    unvisited = np.ones(n, dtype=bool)
+    unvisited[[0, n - 1]] = False
+    for _ in range(n - 2):
+        distances = np.where(unvisited, matrix[order[-1]], np.inf)
+        nearest = int(distances.argmin())
+        order.append(nearest)
+        unvisited[nearest] = False
+    order.append(n - 1)
+    return np.array(order)
+
+
+def _best_two_opt(matrix, order):
+    # Reversing order[i..j] (1 <= i < j <= n-2) swaps edges (i-1, i), (j, j+1)
+    # for (i-1, j), (i, j+1). All candidate moves are scored at once.
+    before, first = order[:-2], order[1:-1]
+    last, after = order[1:-1], order[2:]
+    delta = (matrix[before[:, None], last[None, :]] + matrix[first[:, None], after[None, :]]
+             - matrix[before, first][:, None] - matrix[last, after][None, :])
+    delta[np.tril_indices_from(delta)] = np.inf
+    i, j = np.unravel_index(delta.argmin(), delta.shape)
+    return delta[i, j], i + 1, j + 1
+
+
+def _best_or_opt(matrix, order, segment_length):
+    # Move order[i..i+L-1] between order[k] and order[k+1], keeping the ends fixed.
+    n = len(order)
+    starts = np.arange(1, n - segment_length)
+    ends = starts + segment_length - 1
+    head, tail = order[starts], order[ends]
+    removal = (matrix[order[starts - 1], head] + matrix[tail, order[ends + 1]]
+               - matrix[order[starts - 1], order[ends + 1]])
+    edges = np.arange(n - 1)
+    left, right = order[edges], order[edges + 1]
+    insertion = (matrix[left[None, :], head[:, None]] + matrix[tail[:, None], right[None, :]]
+                 - matrix[left, right][None, :])
+    delta = insertion - removal[:, None]
+    overlapping = (edges[None, :] >= starts[:, None] - 1) & (edges[None, :] <= ends[:, None])
+    delta[overlapping] = np.inf
+    s, k = np.unravel_index(delta.argmin(), delta.shape)
+    return delta[s, k], starts[s], k
+
+
+def improve(matrix, order, max_rounds=1000, tolerance=1e-6):
+    """
+    2-opt and Or-opt (segments of 1-3 stops) local search on an open path
+    with fixed endpoints, applying the best improving move each round.
+    """
+    order = np.array(order)
+    for _ in range(max_rounds):
+        if len(order) < 4:
+            break
+        delta, i, j = _best_two_opt(matrix, order)
+        if delta < -tolerance:
+            order[i:j + 1] = order[i:j + 1][::-1]
+            continue
+        moved = False
+        for segment_length in (1, 2, 3):
+            if len(order) - 2 <= segment_length:
+                break
+            delta, start, edge = _best_or_opt(matrix, order, segment_length)
+            if delta < -tolerance:
+                segment = order[start:start + segment_length]
+                rest = np.concatenate([order[:start], order[start + segment_length:]])
+                insert_at = edge + 1 if edge < start else edge + 1 - segment_length
+                order = np.concatenate([rest[:insert_at], segment, rest[insert_at:]])
+                moved = True
+                break
+        if not moved:
+            break
+    return order
+
+
+def optimise_order(matrix):
+    """
+    Visiting order for the stops of a distance matrix, starting at the first
+    and ending at the last. Returns (order, original length, optimised length).
+    """
+    identity = np.arange(len(matrix))
+    original = path_length(matrix, identity)
+    order = improve(matrix, nearest_neighbour(matrix))
+    optimised = path_length(matrix, order)
+    if optimised >= original:
+        return identity, original, original
+    return order, original, optimised
+
+
+def parse_time_slot(time_slot):
+    """
+    Parse '09:00 AM - 10:30 AM' (or 24-hour '09:00 - 10:30') into
+    (start, end, twelve_hour) with start/end as minutes after midnight.
+    """
+    matches = TIME_PATTERN.findall(time_slot or '')
+    if len(matches) < 2:
+        return None
+    minutes = []
+    for hours, mins, meridiem in matches[:2]:
+        hours, mins = int(hours), int(mins)
+        meridiem = meridiem.lower().replace('.', '')
+        if meridiem == 'pm' and hours != 12:
+            hours += 12
+        elif meridiem == 'am' and hours == 12:
+            hours = 0
+        minutes.append(hours * 60 + mins)
+    start, end = minutes
+    if end < start:
+        end += 24 * 60
+    return start, end, bool(matches[0][2])
+
+
+def format_time_slot(start, end, twelve_hour=True):
+    fmt = '%I:%M %p' if twelve_hour else '%H:%M'
+    midnight = datetime.datetime(2000, 1, 1)
+    return (f"{(midnight + datetime.timedelta(minutes=start)).strftime(fmt)} - "
+            f"{(midnight + datetime.timedelta(minutes=end)).strftime(fmt)}")
+
+
+def _visit_point(activity):
+    try:
+        return float(activity['latitude']), float(activity['longitude'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _new_leg(origin, destination, distance_m):
+    if distance_m <= WALK_MAX_M:
+        minutes, mode, verb = distance_m / WALK_M_PER_MIN, 'Walk', 'Walk'
+    else:
+        minutes = distance_m / TRANSIT_M_PER_MIN + TRANSIT_OVERHEAD_MIN
+        mode, verb = 'Taxi or public transport', 'Take a taxi or public transport'
+    destination_name = destination.get('location_name') or 'the next stop'
+    leg = {
+        'id': f"leg-{origin.get('id')}-{destination.get('id')}",
+        'type': 'Travel',
+        'description': f"- {verb} to {destination_name}",
+        'transport_mode_details': mode,
+        'start_point_location': origin.get('location_name'),
+        'end_point_location': destination.get('location_name'),
+        'start_point_lat': origin['latitude'],
+        'start_point_lon': origin['longitude'],
+        'end_point_lat': destination['latitude'],
+        'end_point_lon': destination['longitude'],
+    }
+    return leg, max(5, 5 * math.ceil(minutes / 5))
+
+
+def optimise_day(day_plan):
+    """
+    Reorder a day's Visit stops (first and last stay fixed) to shorten the
+    walk between them, then rebuild the Travel legs between visits and
+    re-time the day. Days that can't be parsed safely, or where the saving is
+    below MIN_IMPROVEMENT, are left exactly as Gemini wrote them. Returns
+    True if the day was changed.
+    """
+    activities = day_plan.get('activities') or []
+    visit_positions = [index for index, activity in enumerate(activities) if activity.get('type') == 'Visit']
+    if len(visit_positions) < _optimizer_setting('MIN_STOPS', 4):
+        return False
+
+    first, last = visit_positions[0], visit_positions[-1]
+    middle = activities[first:last + 1]
+    if any(activity.get('type') not in ('Visit', 'Travel') for activity in middle):
+        return False
+    if any(a.get('type') == b.get('type') == 'Travel' for a, b in zip(middle, middle[1:])):
+        # Multi-leg journeys can't be rebuilt from stop coordinates alone.
+        return False
+    visits = [activities[index] for index in visit_positions]
+    points = [_visit_point(visit) for visit in visits]
+    slots = [parse_time_slot(activity.get('time_slot')) for activity in activities]
+    if None in points or None in slots:
+        return False
+
+    matrix = distance_matrix(points)
+    order, original, optimised = optimise_order(matrix)
+    if original <= 0 or (original - optimised) / original < _optimizer_setting('MIN_IMPROVEMENT', 0.1):
+        return False
+
+    # Gemini's own legs are kept (with their timings) wherever the new order
+    # still travels between the same two stops.
+    existing_legs = {}
+    for index, activity in enumerate(middle[1:], start=1):
+        if activity.get('type') == 'Travel' and middle[index - 1].get('type') == 'Visit' \
+                and index + 1 < len(middle) and middle[index + 1].get('type') == 'Visit':
+            existing_legs[(id(middle[index - 1]), id(middle[index + 1]))] = activity
+    durations = {id(activity): slot[1] - slot[0] for activity, slot in zip(activities, slots)}
+
+    twelve_hour = slots[first][2]
+    clock = slots[first][0]
+    rebuilt = []
+    for position, visit_index in enumerate(order):
+        visit = visits[visit_index]
+        if position:
+            previous_index = order[position - 1]
+            previous = visits[previous_index]
+            leg = existing_legs.get((id(previous), id(visit)))
+            distance_m = float(matrix[previous_index, visit_index])
+            if leg is not None:
+                minutes = durations[id(leg)]
+            elif distance_m >= SAME_PLACE_M:
+                leg, minutes = _new_leg(previous, visit, distance_m)
+            if leg is not None:
+                leg['time_slot'] = format_time_slot(clock, clock + minutes, twelve_hour)
+                rebuilt.append(leg)
+                clock += minutes
+        visit['time_slot'] = format_time_slot(clock, clock + durations[id(visit)], twelve_hour)
+        rebuilt.append(visit)
+        clock += durations[id(visit)]
+
+    shift = clock - slots[last][1]
+    for activity, slot in zip(activities[last + 1:], slots[last + 1:]):
+        activity['time_slot'] = format_time_slot(slot[0] + shift, slot[1] + shift, twelve_hour)
+
+    day_plan['activities'] = activities[:first] + rebuilt + activities[last + 1:]
+    logger.debug(f"Reordered {len(visits)} stops for '{day_plan.get('day')}': "
+                 f"{original / 1000:.1f} km -> {optimised / 1000:.1f} km.")
+    return True
+
+
+def optimizer_enabled():
+    return _optimizer_setting('ENABLED', True)
@@ -0,0 +1,94 @@
+# taramgo/app/pages.py
+
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import caches
+from django.template.loader import get_template, render_to_string
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+
+RESULT_TEMPLATE = 'app/itinerary_result.html'
+DAY_TEMPLATES = {
+    'nav_html': 'app/includes/day_nav_item.html',
+    'timeline_html': 'app/includes/timeline_day.html',
+}
+
+
+def _pages_setting(name, default):
+    return getattr(settings, 'ITINERARY_PAGES', {}).get(name, default)
+
+
+@functools.lru_cache(maxsize=None)
+def template_version():
+    """
+    Short digest of the result page templates and the static files manifest,
+    part of every fragment key and ETag so a deploy that changes the markup or
+    a vendored asset (and so its hashed URL) never serves stale copies.
+    """
+    digest = hashlib.sha256()
+    for name in (RESULT_TEMPLATE, *DAY_TEMPLATES.values()):
+        template = get_template(name)
+        digest.update(getattr(template.template, 'source', name).encode('utf-8'))
+    digest.update(getattr(staticfiles_storage, 'manifest_hash', '').encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+def day_digest(day_plan):
+    encoded = json.dumps(day_plan, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def render_day_fragments(day_plan, day_index):
+    context = {'day_plan': day_plan, 'day_index': day_index, 'is_first': day_index == 0}
+    fragments = {'index': day_index, 'day': day_plan}
+    for field, template_name in DAY_TEMPLATES.items():
+        fragments[field] = render_to_string(template_name, context)
+    return fragments
+
+
+async def cached_day_fragments(itinerary_data):
+    """
+    Rendered nav and timeline HTML for every day, cached per day by content
+    hash: unchanged days of an edited itinerary (and repeated days of any
+    other page view) are not rendered again. One get_many/set_many per page.
+    """
+    if not itinerary_data:
+        return []
+    cache = caches[_pages_setting('CACHE_ALIAS', 'default')]
+    version = template_version()
+    keys = [f"itinerary-day:{version}:{index}:{day_digest(day_plan)}" for index, day_plan in enumerate(itinerary_data)]
+    found = await cache.aget_many(keys)
+    fragments, missing = [], {}
+    for index, (key, day_plan) in enumerate(zip(keys, itinerary_data)):
+        html = found.get(key)
+        if html is None:
+            rendered = render_day_fragments(day_plan, index)
+            html = missing[key] = {field: str(rendered[field]) for field in DAY_TEMPLATES}
+        fragments.append({field: mark_safe(value) for field, value in html.items()})
+    if missing:
+        await cache.aset_many(missing, _pages_setting('FRAGMENT_TIMEOUT', 60 * 60 * 24))
+    return fragments
+
+
+def itinerary_version(itinerary):
+    return f"{int(itinerary.updated_at.timestamp() * 1_000_000):x}"
+
+
+def itinerary_etag(itinerary, kind):
+    """
+    Weak ETag for a stored itinerary's page or data: it changes when the row
+    is edited or the templates change, and is shared by every encoding.
+    """
+    return f'W/"{kind}-{itinerary.public_id.hex}-{itinerary_version(itinerary)}-{template_version()}"'
+
+
+def itinerary_data_url(itinerary):
+    """
+    Versioned URL of the itinerary JSON; a given version never changes, so
+    browsers may keep it for as long as they like.
+    """
+    return f"{reverse('itinerary_data', args=[itinerary.public_id])}?v={itinerary_version(itinerary)}"
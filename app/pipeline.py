@@ -0,0 +1,182 @@
+# taramgo/app/pipeline.py
+
+import json
+import logging
+
+import httpx
+from django.core.exceptions import ImproperlyConfigured
+
+from .cache import get_itinerary_cache, request_cache_key
+from .forms import ItineraryForm
+from .geocoding import validate_locations
+from .conf import gemini_model
+from .gemini import generate_content, response_text, stream_generate_content
+from .governor import UpstreamUnavailable
+from .hedging import DeadlineExceeded, deadline, itinerary_budget
+from .metrics import itinerary_requests, stage
+from .optimizer import optimise_day, optimizer_enabled
+from .planner import generate_itinerary_fanout, iter_itinerary_fanout, use_planner
+from .prompts import RESPONSE_SCHEMA, build_itinerary_prompt, build_payload
+from .records import ItineraryFormatError, compile_day
+from .routing import add_routes
+from .similarity import find_similar_itinerary
+from .singleflight import coalesce
+from .store import find_itinerary_data, get_or_save_itinerary
+from .streaming import IncrementalArrayParser
+
+logger = logging.getLogger(__name__)
+
+
+def clean_request_data(request_data):
+    """
+    Re-validate stored canonical form data (jobs, batch specs, regeneration)
+    through ItineraryForm and return its cleaned_data.
+    """
+    form = ItineraryForm(request_data)
+    if not form.is_valid():
+        raise ValueError(f"Invalid itinerary request: {form.errors.as_json()}")
+    return form.cleaned_data
+
+
+def itinerary_request_key(cleaned_data):
+    return request_cache_key(cleaned_data, gemini_model(), RESPONSE_SCHEMA)
+
+
+def finish_day(day_plan):
+    """
+    Post-process one generated day: reorder its stops, then validate it and
+    add the Maps URL. Returns the normalised day.
+    """
+    if optimizer_enabled():
+        with stage('optimise'):
+            optimise_day(day_plan)
+    with stage('compile'):
+        return compile_day(day_plan)
+
+
+def describe_error(exc):
+    """
+    Log an itinerary generation failure and return the message shown to the user.
+    """
+    if isinstance(exc, ImproperlyConfigured):
+        logger.error(f"Gemini is not configured: {exc}")
+        return "The trip planner is not configured on this server. Please contact the site administrator."
+    if isinstance(exc, UpstreamUnavailable):
+        logger.warning(f"Gemini request not sent: {exc}")
+        return "Our trip planner is handling a lot of requests right now. Please try again in a minute."
+    if isinstance(exc, DeadlineExceeded):
+        logger.warning(f"Itinerary generation ran out of time: {exc}")
+        return "Generating your itinerary took too long. Please try again."
+    if isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 429:
+        logger.error(f"Gemini API quota exhausted: {exc.response.text}")
+        return "Our trip planner is handling a lot of requests right now. Please try again in a minute."
+    if isinstance(exc, httpx.HTTPStatusError):
+        logger.error(f"HTTP error from Gemini API: {exc.response.status_code}")
+        logger.error(f"Gemini's exact error message: {exc.response.text}")
+        return f"Gemini API returned an error ({exc.response.status_code}). Please check the server logs."
+    if isinstance(exc, (json.JSONDecodeError, KeyError, ItineraryFormatError)):
+        logger.error("Failed to decode or parse JSON from Gemini's response.", exc_info=exc)
+        return "The model's response was not valid or had an unexpected structure. Please try again."
+    logger.error(f"An unexpected error occurred: {exc}", exc_info=exc)
+    return f"An unexpected error occurred: {exc}"
+
+
+async def generate_itinerary(cleaned_data):
+    """
+    Buffered generation: one generateContent call for the whole trip, or a
+    skeleton plus concurrent per-day calls for long trips, all within the
+    GEMINI_HEDGING['BUDGET'] deadline.
+    """
+    with deadline(itinerary_budget()):
+        if use_planner(cleaned_data):
+            itinerary_generated_data = await generate_itinerary_fanout(cleaned_data)
+        else:
+            with stage('prompt'):
+                payload = build_payload(build_itinerary_prompt(cleaned_data))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Sending payload to Gemini: {json.dumps(payload, indent=2)}")
+            with stage('gemini'):
+                response_data = await generate_content(payload)
+            with stage('parse'):
+                itinerary_generated_data = json.loads(response_text(response_data))
+        if not isinstance(itinerary_generated_data, list):
+            raise ItineraryFormatError("Expected a list of days.")
+        with stage('validate'):
+            await validate_locations(itinerary_generated_data, cleaned_data['city'])
+
+    itinerary_generated_data = [finish_day(day_plan) for day_plan in itinerary_generated_data]
+    with stage('routing'):
+        return await add_routes(itinerary_generated_data)
+
+
+async def iter_generated_days(cleaned_data):
+    """
+    Yield days in order as they are generated: per-day fan-out for long
+    trips, otherwise parsed incrementally from streamGenerateContent.
+    """
+    if use_planner(cleaned_data):
+        async for day_plan in iter_itinerary_fanout(cleaned_data):
+            yield day_plan
+        return
+
+    payload = build_payload(build_itinerary_prompt(cleaned_data))
+    parser = IncrementalArrayParser()
+    async for chunk in stream_generate_content(payload):
+        for day_plan in parser.feed(chunk):
+            yield day_plan
+    parser.close()
+
+
+async def reuse_similar_itinerary(cleaned_data, cache_key):
+    """
+    A stored near-duplicate re-dated for this request, cached and stored
+    under its own key, or None.
+    """
+    itinerary_data = await find_similar_itinerary(cleaned_data)
+    if itinerary_data is not None:
+        await get_itinerary_cache().aset(cache_key, itinerary_data)
+    return itinerary_data
+
+
+async def find_generated_itinerary(cache_key):
+    """
+    A result for this key published by any worker: the itinerary cache, or
+    failing that (it is per-process by default) the stored itinerary.
+    """
+    itinerary_data = await get_itinerary_cache().aget(cache_key)
+    if itinerary_data is None:
+        itinerary_data = await find_itinerary_data(cache_key)
+    return itinerary_data
+
+
+async def get_or_generate_itinerary(cleaned_data):
+    """
+    The full buffered pipeline shared by the views, the job worker and batch
+    runs: cache lookup, single-flighted generation (or reuse of a stored
+    near-duplicate), cache fill and storage.
+    Returns (itinerary_data, stored Itinerary or None, cache_hit).
+    """
+    itinerary_cache = get_itinerary_cache()
+    cache_key = itinerary_request_key(cleaned_data)
+    itinerary_data = await itinerary_cache.aget(cache_key)
+    if itinerary_data is not None:
+        logger.info(f"Itinerary cache hit for {cleaned_data['city']} ({cache_key[:12]}).")
+        itinerary_requests.inc(source='cache')
+        return itinerary_data, await get_or_save_itinerary(cache_key, cleaned_data, itinerary_data), True
+
+    source = ['shared']
+
+    async def generate_and_cache():
+        source[0] = 'similar'
+        generated = await find_similar_itinerary(cleaned_data)
+        if generated is None:
+            source[0] = 'generated'
+            generated = await generate_itinerary(cleaned_data)
+        await itinerary_cache.aset(cache_key, generated)
+        await get_or_save_itinerary(cache_key, cleaned_data, generated)
+        return generated
+
+    # Identical requests already in flight share one upstream call.
+    itinerary_data = await coalesce(cache_key, generate_and_cache, lambda: find_generated_itinerary(cache_key))
+    itinerary_requests.inc(source=source[0])
+    return itinerary_data, await get_or_save_itinerary(cache_key, cleaned_data, itinerary_data), False
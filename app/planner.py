@@ -0,0 +1,176 @@
+# taramgo/app/planner.py
+
+import asyncio
+import datetime
+import json
+import logging
+
+from django.conf import settings
+
+from .gemini import generate_content, response_text
+from .metrics import stage
+from .prompts import (
+    DAY_SCHEMA, SKELETON_SCHEMA, build_day_prompt, build_payload,
+    build_skeleton_prompt, trip_duration_days,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _planner_setting(name, default):
+    return getattr(settings, 'ITINERARY_PLANNER', {}).get(name, default)
+
+
+def use_planner(cleaned_data):
+    """
+    Whether a trip is long enough to be generated day by day.
+    """
+    min_days = _planner_setting('MIN_DAYS', 7)
+    return bool(min_days) and trip_duration_days(cleaned_data) >= min_days
+
+
+def _place(location, lat, lon):
+    if lat is not None and lon is not None:
+        return f"at {location} ({lat}, {lon})"
+    return f"at {location}"
+
+
+def day_constraints(cleaned_data, outline, day_index):
+    """
+    Start/end constraints for one day of the skeleton, with the trip's own
+    start and end time on the first and last day.
+    """
+    day = outline[day_index]
+    start = _place(day.get('start_location'), day.get('start_lat'), day.get('start_lon'))
+    end = _place(day.get('end_location'), day.get('end_lat'), day.get('end_lon'))
+    if day_index == 0:
+        start += f" at {cleaned_data['start_time']}"
+    else:
+        start += " in the morning"
+    if day_index == len(outline) - 1:
+        end += f" by {cleaned_data['end_time']}"
+    else:
+        end += " in the evening"
+    return start, end
+
+
+async def generate_skeleton(cleaned_data):
+    with stage('prompt'):
+        payload = build_payload(build_skeleton_prompt(cleaned_data), SKELETON_SCHEMA)
+    with stage('skeleton'):
+        response_data = await generate_content(payload)
+    with stage('parse'):
+        outline = json.loads(response_text(response_data))
+    if not outline:
+        raise ValueError("The model returned an empty trip outline.")
+    logger.debug(f"Planner skeleton has {len(outline)} days for {cleaned_data['city']}.")
+    return fit_outline(outline, cleaned_data)
+
+
+def fit_outline(outline, cleaned_data):
+    """
+    Exactly one outline entry per day of the trip. Extra entries are dropped;
+    missing days are added as open days that start and end where the outline
+    left off, and get their activities from the per-day call like any other.
+    """
+    days = trip_duration_days(cleaned_data)
+    if len(outline) == days:
+        return outline
+    logger.warning(f"Planner skeleton has {len(outline)} days for a {days}-day trip to {cleaned_data['city']}; "
+                   f"{'trimming' if len(outline) > days else 'padding'} it.")
+    outline = outline[:days]
+    while len(outline) < days:
+        last = outline[-1]
+        outline.append({
+            'day': f"Day {len(outline) + 1}",
+            'date': (cleaned_data['start_date'] + datetime.timedelta(days=len(outline))).isoformat(),
+            'theme': '',
+            'areas': [],
+            'highlights': [],
+            'start_location': last.get('end_location'), 'start_lat': last.get('end_lat'), 'start_lon': last.get('end_lon'),
+            'end_location': last.get('end_location'), 'end_lat': last.get('end_lat'), 'end_lon': last.get('end_lon'),
+        })
+    return outline
+
+
+def _normalise_day(day_plan, day_outline, day_number):
+    """
+    Keep the skeleton's day/date labels and make activity ids unique
+    across independently generated days.
+    """
+    if isinstance(day_plan, list):
+        day_plan = day_plan[0] if day_plan else {}
+    day_plan['day'] = day_outline.get('day') or day_plan.get('day')
+    day_plan['date'] = day_outline.get('date') or day_plan.get('date')
+    prefix = f"d{day_number}-"
+    for position, activity in enumerate(day_plan.get('activities', []), start=1):
+        activity_id = str(activity.get('id') or position)
+        if not activity_id.startswith(prefix):
+            activity['id'] = prefix + activity_id
+    return day_plan
+
+
+async def generate_day(cleaned_data, day_outline, day_number, start_constraint, end_constraint, avoid_places=()):
+    """
+    Generate the detailed activities for one day. Transient upstream errors
+    are retried by the governor (GEMINI_GOVERNOR['MAX_RETRIES']); anything
+    else fails the day.
+    """
+    with stage('prompt'):
+        payload = build_payload(
+            build_day_prompt(cleaned_data, day_outline, day_number, start_constraint, end_constraint, avoid_places),
+            DAY_SCHEMA,
+        )
+    with stage('gemini'):
+        response_data = await generate_content(payload)
+    with stage('parse'):
+        day_plan = json.loads(response_text(response_data))
+    return _normalise_day(day_plan, day_outline, day_number)
+
+
+def start_day_tasks(cleaned_data, outline):
+    """
+    Schedule one task per outlined day, bounded by the planner semaphore.
+    """
+    semaphore = asyncio.Semaphore(_planner_setting('CONCURRENCY', 4))
+    highlights = [day.get('highlights') or [] for day in outline]
+
+    async def run(day_index):
+        start_constraint, end_constraint = day_constraints(cleaned_data, outline, day_index)
+        avoid_places = [place for index, places in enumerate(highlights) if index != day_index for place in places]
+        async with semaphore:
+            return await generate_day(
+                cleaned_data, outline[day_index], day_index + 1, start_constraint, end_constraint, avoid_places,
+            )
+
+    return [asyncio.ensure_future(run(day_index)) for day_index in range(len(outline))]
+
+
+async def generate_itinerary_fanout(cleaned_data):
+    """
+    Skeleton first, then every day concurrently; returns the same list-of-days
+    structure as the single-prompt path.
+    """
+    outline = await generate_skeleton(cleaned_data)
+    tasks = start_day_tasks(cleaned_data, outline)
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+async def iter_itinerary_fanout(cleaned_data):
+    """
+    Like generate_itinerary_fanout(), but yields each day in order as soon as
+    it and all earlier days are ready. Used by the streaming view.
+    """
+    outline = await generate_skeleton(cleaned_data)
+    tasks = start_day_tasks(cleaned_data, outline)
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
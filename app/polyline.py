@@ -0,0 +1,54 @@
+# taramgo/app/polyline.py
+"""
+Google encoded polyline format, as used by OSRM's geometries=polyline.
+"""
+
+
+def _encode_value(value):
+    value = ~(value << 1) if value < 0 else value << 1
+    chunks = []
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+    return ''.join(chunks)
+
+
+def encode(coordinates, precision=5):
+    """
+    Encode a sequence of (lat, lon) pairs.
+    """
+    factor = 10 ** precision
+    output = []
+    previous_lat = previous_lon = 0
+    for lat, lon in coordinates:
+        lat, lon = round(lat * factor), round(lon * factor)
+        output.append(_encode_value(lat - previous_lat))
+        output.append(_encode_value(lon - previous_lon))
+        previous_lat, previous_lon = lat, lon
+    return ''.join(output)
+
+
+def decode(text, precision=5):
+    """
+    Decode a polyline into a list of (lat, lon) pairs.
+    """
+    factor = 10 ** precision
+    coordinates = []
+    index = lat = lon = 0
+    while index < len(text):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(text[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        coordinates.append((lat / factor, lon / factor))
+    return coordinates
@@ -0,0 +1,269 @@
+# taramgo/app/prompts.py
+
+import json
+
+# Structured-output schema sent with every request. It is also part of the
+# cache key, so changing it invalidates previously cached itineraries.
+RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "day": {"type": "STRING"},
+            "date": {"type": "STRING"},
+            "activities": {
+                "type": "ARRAY",
+                "items": {
+                    "type": "OBJECT",
+                    "properties": {
+                        "id": {"type": "STRING"},
+                        "type": {"type": "STRING", "enum": ["Visit", "Travel"]},
+                        "time_slot": {"type": "STRING"},
+                        "description": {"type": "STRING"},
+                        "location_name": {"type": "STRING"},
+                        "latitude": {"type": "NUMBER"},
+                        "longitude": {"type": "NUMBER"},
+                        "cost_estimate": {"type": "STRING"},
+                        "transport_mode_details": {"type": "STRING"},
+                        "start_point_location": {"type": "STRING"},
+                        "end_point_location": {"type": "STRING"},
+                        "start_point_lat": {"type": "NUMBER"},
+                        "start_point_lon": {"type": "NUMBER"},
+                        "end_point_lat": {"type": "NUMBER"},
+                        "end_point_lon": {"type": "NUMBER"}
+                    },
+                    "required": ["id", "type", "time_slot", "description"]
+                }
+            }
+        },
+        "required": ["day", "date", "activities"]
+    }
+}
+
+
+# A single day of RESPONSE_SCHEMA, used when days are generated one at a time.
+DAY_SCHEMA = RESPONSE_SCHEMA['items']
+
+# A run of activities, used to replace part of a day in place.
+ACTIVITIES_SCHEMA = DAY_SCHEMA['properties']['activities']
+
+# Day-by-day outline requested before fanning out per-day generation.
+SKELETON_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "day": {"type": "STRING"},
+            "date": {"type": "STRING"},
+            "theme": {"type": "STRING"},
+            "areas": {"type": "ARRAY", "items": {"type": "STRING"}},
+            "highlights": {"type": "ARRAY", "items": {"type": "STRING"}},
+            "start_location": {"type": "STRING"},
+            "start_lat": {"type": "NUMBER"},
+            "start_lon": {"type": "NUMBER"},
+            "end_location": {"type": "STRING"},
+            "end_lat": {"type": "NUMBER"},
+            "end_lon": {"type": "NUMBER"}
+        },
+        "required": ["day", "date", "theme", "start_location", "end_location"]
+    }
+}
+
+
+# Follow-up request for the coordinates of places that failed validation.
+GEOCODE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "name": {"type": "STRING"},
+            "latitude": {"type": "NUMBER"},
+            "longitude": {"type": "NUMBER"}
+        },
+        "required": ["name", "latitude", "longitude"]
+    }
+}
+
+
+# Pacing, formatting and coordinate rules shared by every itinerary prompt.
+ACTIVITY_RULES = """
+    Don't spend too much time in each place, dont spend more than 1 hour in each place unless absolutely necessary.
+    time spent at each place need not be in factors of an hour, it can be 45 mins, 30 mins, 20 mins etc.
+    You can visit places until 9 PM, only exceed this time if absolutely necessary.
+    All Cost Should be in the Local currency of the Country.
+    If the user gives a starting point, then always start the itinerary from the starting point.
+    If the user gives an ending point, then always end the itinerary at the ending point.
+
+
+    **DESCRIPTION FORMAT RULES**:
+    - Every activity description must be **concise, 3–4 bullet points only**.
+    - Write them like checklist items (e.g., "- Explore temple", "- Take photos").
+    - Do NOT write paragraphs, long explanations, or guides. Keep it short and practical.
+
+    **CRITICAL INSTRUCTION**: For every single activity, whether it is a 'Visit' or a 'Travel' type, you MUST provide precise latitude and longitude coordinates. This is a mandatory requirement.
+    - For 'Visit' activities, you MUST populate the `latitude` and `longitude` fields.
+    - For 'Travel' activities, you MUST populate all four coordinate fields: `start_point_lat`, `start_point_lon`, `end_point_lat`, and `end_point_lon`.
+    Do not leave any of these coordinate fields empty, null, or 0 unless the location is a general area that cannot be mapped. The response is not useful without these coordinates.
+    """
+
+
+def trip_duration_days(cleaned_data):
+    return (cleaned_data['end_date'] - cleaned_data['start_date']).days + 1
+
+
+def _interests(cleaned_data):
+    return ", ".join(cleaned_data['interests']) if cleaned_data['interests'] else "General sightseeing"
+
+
+def build_itinerary_prompt(cleaned_data):
+    """
+    Prompt for generating the whole trip in a single request.
+    """
+    city = cleaned_data['city']
+    start_date_obj = cleaned_data['start_date']
+    start_time_str = cleaned_data['start_time']
+    end_date_obj = cleaned_data['end_date']
+    ending_point = cleaned_data.get('ending_point', 'a major departure hub')
+    duration_days = trip_duration_days(cleaned_data)
+
+    return f"""
+    Generate a detailed travel itinerary for a {duration_days}-day trip to {city}.
+    The traveler is a {cleaned_data['traveler_type']} with a {cleaned_data['budget']} budget.
+    Their interests are: {_interests(cleaned_data)}.
+    The trip starts on {start_date_obj.strftime('%Y-%m-%d')} at {start_time_str} and ends on {end_date_obj.strftime('%Y-%m-%d')} at {cleaned_data['end_time']}.
+    The user must end up at {ending_point}.{ACTIVITY_RULES}"""
+
+
+def build_skeleton_prompt(cleaned_data):
+    """
+    Cheap first pass for long trips: one line per day (theme, areas and the
+    day's start/end points), no individual activities.
+    """
+    city = cleaned_data['city']
+    starting_point = cleaned_data.get('starting_point') or 'the traveler\'s arrival point'
+    ending_point = cleaned_data.get('ending_point') or 'a major departure hub'
+
+    return f"""
+    Outline a {trip_duration_days(cleaned_data)}-day trip to {city}, one entry per day.
+    The traveler is a {cleaned_data['traveler_type']} with a {cleaned_data['budget']} budget.
+    Their interests are: {_interests(cleaned_data)}.
+    The trip starts on {cleaned_data['start_date'].strftime('%Y-%m-%d')} at {cleaned_data['start_time']} from {starting_point}
+    and ends on {cleaned_data['end_date'].strftime('%Y-%m-%d')} at {cleaned_data['end_time']} at {ending_point}.
+    For each day give only a short theme, the neighbourhoods or areas it covers, 3-6 headline places, and where the day
+    starts and ends with precise coordinates. Each day must start where the previous day ended (e.g. the hotel).
+    Do not repeat headline places across days. Do NOT list detailed activities or time slots.
+    """
+
+
+def build_day_prompt(cleaned_data, day_outline, day_number, start_constraint, end_constraint, avoid_places=()):
+    """
+    Detailed prompt for a single day, constrained by where the day must start
+    and end so that it joins up with its neighbours.
+    """
+    avoid = ", ".join(avoid_places) if avoid_places else "none"
+    return f"""
+    Generate the detailed plan for day {day_number} ({day_outline.get('date')}) of a {trip_duration_days(cleaned_data)}-day trip to {cleaned_data['city']}.
+    The traveler is a {cleaned_data['traveler_type']} with a {cleaned_data['budget']} budget.
+    Their interests are: {_interests(cleaned_data)}.
+    Theme for the day: {day_outline.get('theme') or 'free exploration'}.
+    Areas to cover: {", ".join(day_outline.get('areas') or []) or 'your choice'}.
+    Headline places: {", ".join(day_outline.get('highlights') or []) or 'your choice'}.
+    The day MUST start {start_constraint}.
+    The day MUST end {end_constraint}.
+    These places are covered on other days, do not visit them again: {avoid}.
+    Use the exact values "{day_outline.get('day')}" for `day` and "{day_outline.get('date')}" for `date`.
+    Prefix every activity `id` with "d{day_number}-".{ACTIVITY_RULES}"""
+
+
+def build_activity_prompt(cleaned_data, day_plan, replaced, start_constraint, end_constraint, avoid_places=()):
+    """
+    Narrow prompt replacing one stop of an existing day (and the legs into
+    and out of it) within the same time window.
+    """
+    time_window = f"{replaced[0].get('time_slot', '').split('-')[0].strip()} - " \
+                  f"{replaced[-1].get('time_slot', '').split('-')[-1].strip()}"
+    current = ", ".join(a.get('location_name') for a in replaced if a.get('location_name')) or "the current stop"
+    avoid = ", ".join(avoid_places) if avoid_places else "none"
+    return f"""
+    Replace part of {day_plan.get('day')} ({day_plan.get('date')}) of a trip to {cleaned_data['city']}.
+    The traveler is a {cleaned_data['traveler_type']} with a {cleaned_data['budget']} budget.
+    Their interests are: {_interests(cleaned_data)}.
+    The traveler wants something other than {current}. Suggest one different place to visit instead.
+    Return only the replacement activities, in order, covering {time_window}: the travel leg to the new place
+    if needed, the visit, and the travel leg onward if needed.
+    The replacement MUST start {start_constraint}.
+    The replacement MUST end {end_constraint}.
+    These places are already in the trip, do not use them: {avoid}.{ACTIVITY_RULES}"""
+
+
+def build_geocode_prompt(city, place_names):
+    """
+    Ask for the coordinates of a handful of places in one batch.
+    """
+    places = "\n".join(f"    - {name}" for name in place_names)
+    return f"""
+    Give the precise latitude and longitude of each of these places in or near {city}.
+    Return exactly one entry per place and repeat its name exactly as written.
+    Latitude is north/south and comes first; longitude is east/west.
+{places}
+    """
+
+
+class GenerationConfig(dict):
+    """
+    A compiled generationConfig. It carries its own JSON encoding, so
+    encode_payload() can splice it into a request body as-is.
+    """
+    __slots__ = ('encoded',)
+
+
+class CompiledSchema:
+    """
+    The parts of a request that depend only on its response schema, built
+    once: the generationConfig, its JSON encoding for request bodies, and
+    the canonical (key-sorted) schema encoding used in cache keys.
+    """
+    __slots__ = ('schema', 'generation_config', 'encoded_config', 'canonical_json')
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.generation_config = GenerationConfig(responseMimeType="application/json", responseSchema=schema)
+        self.encoded_config = json.dumps(self.generation_config, separators=(',', ':')).encode('utf-8')
+        self.generation_config.encoded = self.encoded_config
+        self.canonical_json = json.dumps(schema, sort_keys=True, separators=(',', ':'))
+
+
+# Keyed by id(); each entry holds its schema, so that id can't be reused by
+# another object while the entry exists.
+_compiled_schemas = {}
+
+
+def compiled_schema(schema):
+    """
+    The CompiledSchema for a schema dict, built on first use. The schemas
+    are module constants; they must not be modified once compiled.
+    """
+    compiled = _compiled_schemas.get(id(schema))
+    if compiled is None or compiled.schema is not schema:
+        compiled = _compiled_schemas[id(schema)] = CompiledSchema(schema)
+    return compiled
+
+
+def build_payload(prompt, response_schema=RESPONSE_SCHEMA):
+    # The generationConfig is shared between payloads; treat it as read-only.
+    return {
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+        "generationConfig": compiled_schema(response_schema).generation_config,
+    }
+
+
+def encode_payload(payload):
+    """
+    JSON request body for a build_payload() payload. Only the prompt is
+    encoded per request; the generationConfig was encoded when compiled.
+    """
+    config = payload.get('generationConfig')
+    if not isinstance(config, GenerationConfig) or payload.keys() != {'contents', 'generationConfig'}:
+        return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    contents = json.dumps(payload['contents'], separators=(',', ':')).encode('utf-8')
+    return b'{"contents":' + contents + b',"generationConfig":' + config.encoded + b'}'
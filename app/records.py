@@ -0,0 +1,131 @@
+# taramgo/app/records.py
+
+import json
+
+ACTIVITY_TYPES = ('Visit', 'Travel')
+GOOGLE_MAPS_DIR_URL = "https://www.google.com/maps/dir/"
+
+_encoder = json.JSONEncoder(separators=(',', ':'), check_circular=False)
+
+
+class ItineraryFormatError(ValueError):
+    """
+    Gemini returned JSON that doesn't match RESPONSE_SCHEMA.
+    """
+
+
+def _text(value):
+    return value if isinstance(value, str) else ('' if value is None else str(value))
+
+
+def _coordinate(value, limit=180.0):
+    """
+    The value as a float within ±limit (90 for latitudes), or None.
+    """
+    if type(value) is float:
+        return value if -limit <= value <= limit else None
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value == value and abs(value) <= limit else None
+
+
+class Activity:
+    """
+    One entry of a day's timeline, with coordinates as floats (or None).
+    """
+
+    TEXT_FIELDS = (
+        'id', 'type', 'time_slot', 'description', 'location_name', 'cost_estimate',
+        'transport_mode_details', 'start_point_location', 'end_point_location',
+    )
+    COORDINATE_FIELDS = ('latitude', 'longitude', 'start_point_lat', 'start_point_lon', 'end_point_lat', 'end_point_lon')
+    LATITUDE_FIELDS = frozenset(('latitude', 'start_point_lat', 'end_point_lat'))
+    FIELDS = frozenset(TEXT_FIELDS + COORDINATE_FIELDS)
+    __slots__ = TEXT_FIELDS + COORDINATE_FIELDS + ('extra',)
+
+    @classmethod
+    def from_dict(cls, data, position):
+        if not isinstance(data, dict):
+            raise ItineraryFormatError(f"Activity {position} is not an object.")
+        activity_type = data.get('type')
+        if activity_type not in ACTIVITY_TYPES:
+            raise ItineraryFormatError(f"Activity {position} has unknown type {activity_type!r}.")
+        activity = cls()
+        for name in cls.TEXT_FIELDS:
+            value = data.get(name)
+            setattr(activity, name, value if value is None or isinstance(value, str) else str(value))
+        for name in cls.COORDINATE_FIELDS:
+            setattr(activity, name, _coordinate(data.get(name), 90.0 if name in cls.LATITUDE_FIELDS else 180.0))
+        activity.id = activity.id or f"a{position}"
+        activity.time_slot = activity.time_slot or ''
+        activity.description = activity.description or ''
+        # Anything beyond the schema (e.g. 'route') is carried through as is.
+        activity.extra = {key: value for key, value in data.items() if key not in cls.FIELDS}
+        return activity
+
+    def stop(self):
+        """
+        The "lat,lon" this activity leaves the traveller at, or None.
+        """
+        if self.type == 'Visit':
+            lat, lon = self.latitude, self.longitude
+        else:
+            lat, lon = self.end_point_lat, self.end_point_lon
+        return None if lat is None or lon is None else f"{lat},{lon}"
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in self.__slots__[:-1] if getattr(self, name) is not None}
+        data.update(self.extra)
+        return data
+
+
+class DayPlan:
+    __slots__ = ('day', 'date', 'activities', 'google_maps_url', 'extra')
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict) or not isinstance(data.get('activities'), list):
+            raise ItineraryFormatError("Day is not an object with an 'activities' list.")
+        day_plan = cls()
+        extra = dict(data)
+        day_plan.day = _text(extra.pop('day', None))
+        day_plan.date = _text(extra.pop('date', None))
+        extra.pop('google_maps_url', None)
+
+        # Validation and the Maps URL stops come out of the same walk.
+        day_plan.activities, stops = [], []
+        for position, item in enumerate(extra.pop('activities'), start=1):
+            activity = Activity.from_dict(item, position)
+            day_plan.activities.append(activity)
+            stop = activity.stop()
+            if stop and (not stops or stops[-1] != stop):
+                stops.append(stop)
+        day_plan.google_maps_url = GOOGLE_MAPS_DIR_URL + "/".join(stops) if len(stops) > 1 else None
+        day_plan.extra = extra
+        return day_plan
+
+    def to_dict(self):
+        data = {'day': self.day, 'date': self.date, 'activities': [a.to_dict() for a in self.activities]}
+        data.update(self.extra)
+        data['google_maps_url'] = self.google_maps_url
+        return data
+
+
+def compile_day(day_plan):
+    """
+    Validate a generated day and return it normalised, with coordinates as
+    floats and its Google Maps directions URL, in one pass over its activities.
+    """
+    return DayPlan.from_dict(day_plan).to_dict()
+
+
+def dumps_itinerary(itinerary_data):
+    """
+    Compact JSON for the page's <script type="application/json"> block.
+    """
+    # Escaped as json_script does, so the data can't close the tag.
+    return _encoder.encode(itinerary_data).replace('<', '\\u003C').replace('>', '\\u003E').replace('&', '\\u0026')
@@ -0,0 +1,175 @@
+# taramgo/app/regeneration.py
+
+import copy
+import json
+import logging
+import uuid
+
+from .gemini import generate_content, response_text
+from .geocoding import validate_locations
+from .hedging import deadline, itinerary_budget
+from .models import Itinerary
+from .pipeline import finish_day
+from .planner import day_constraints, generate_day
+from .prompts import ACTIVITIES_SCHEMA, build_activity_prompt, build_payload
+from .records import ItineraryFormatError, compile_day
+from .routing import add_routes
+
+logger = logging.getLogger(__name__)
+
+
+class RegenerationError(ValueError):
+    """
+    The requested day or activity doesn't exist or can't be regenerated.
+    """
+
+
+def _start_point(activity):
+    if activity.get('type') == 'Travel':
+        return activity.get('start_point_location'), activity.get('start_point_lat'), activity.get('start_point_lon')
+    return activity.get('location_name'), activity.get('latitude'), activity.get('longitude')
+
+
+def _end_point(activity):
+    if activity.get('type') == 'Travel':
+        return activity.get('end_point_location'), activity.get('end_point_lat'), activity.get('end_point_lon')
+    return activity.get('location_name'), activity.get('latitude'), activity.get('longitude')
+
+
+def _place(point):
+    name, lat, lon = point
+    return f"at {name} ({lat}, {lon})" if lat is not None and lon is not None else f"at {name}"
+
+
+def _visit_names(day_plan):
+    return [a['location_name'] for a in day_plan.get('activities', []) if a.get('type') == 'Visit' and a.get('location_name')]
+
+
+def outline_from_itinerary(cleaned_data, itinerary_data):
+    """
+    A planner outline for an existing itinerary: each day starts where the
+    previous one ended and ends where the next one starts, so a regenerated
+    day still joins up with its neighbours.
+    """
+    outline = []
+    for day_index, day_plan in enumerate(itinerary_data):
+        activities = day_plan.get('activities') or [{}]
+        if day_index > 0 and itinerary_data[day_index - 1].get('activities'):
+            start = _end_point(itinerary_data[day_index - 1]['activities'][-1])
+        elif cleaned_data.get('starting_point'):
+            start = (cleaned_data['starting_point'], None, None)
+        else:
+            start = _start_point(activities[0])
+        if day_index < len(itinerary_data) - 1 and itinerary_data[day_index + 1].get('activities'):
+            end = _start_point(itinerary_data[day_index + 1]['activities'][0])
+        elif cleaned_data.get('ending_point'):
+            end = (cleaned_data['ending_point'], None, None)
+        else:
+            end = _end_point(activities[-1])
+        outline.append({
+            'day': day_plan.get('day'),
+            'date': day_plan.get('date'),
+            'highlights': _visit_names(day_plan),
+            'start_location': start[0], 'start_lat': start[1], 'start_lon': start[2],
+            'end_location': end[0], 'end_lat': end[1], 'end_lon': end[2],
+        })
+    return outline
+
+
+async def regenerate_day(cleaned_data, itinerary_data, day_index):
+    """
+    Return a copy of the itinerary with one day generated afresh, avoiding
+    every place already in the trip (including that day's own).
+    """
+    if not 0 <= day_index < len(itinerary_data):
+        raise RegenerationError(f"The itinerary has no day {day_index}.")
+    outline = outline_from_itinerary(cleaned_data, itinerary_data)
+    start_constraint, end_constraint = day_constraints(cleaned_data, outline, day_index)
+    avoid_places = list(dict.fromkeys(place for day in outline for place in day['highlights']))
+
+    with deadline(itinerary_budget()):
+        day_plan = await generate_day(
+            cleaned_data, outline[day_index], day_index + 1, start_constraint, end_constraint, avoid_places,
+        )
+        await validate_locations([day_plan], cleaned_data['city'])
+    day_plan = finish_day(day_plan)
+    await add_routes([day_plan])
+
+    edited = list(itinerary_data)
+    edited[day_index] = day_plan
+    return edited, day_index
+
+
+def find_activity(itinerary_data, activity_id):
+    for day_index, day_plan in enumerate(itinerary_data):
+        for position, activity in enumerate(day_plan.get('activities', [])):
+            if activity.get('id') == activity_id:
+                return day_index, position
+    raise RegenerationError(f"The itinerary has no activity {activity_id!r}.")
+
+
+async def regenerate_activity(cleaned_data, itinerary_data, activity_id):
+    """
+    Return a copy of the itinerary with one Visit (and the Travel legs into
+    and out of it) replaced by a different stop in the same time window.
+    """
+    day_index, position = find_activity(itinerary_data, activity_id)
+    day_plan = copy.deepcopy(itinerary_data[day_index])
+    activities = day_plan['activities']
+    if activities[position].get('type') != 'Visit':
+        raise RegenerationError("Only Visit activities can be regenerated on their own.")
+
+    first = position - 1 if position > 0 and activities[position - 1].get('type') == 'Travel' else position
+    last = position + 1 if position + 1 < len(activities) and activities[position + 1].get('type') == 'Travel' else position
+    replaced = activities[first:last + 1]
+    start_time = replaced[0].get('time_slot', '').split('-')[0].strip()
+    end_time = replaced[-1].get('time_slot', '').split('-')[-1].strip()
+    start_constraint = f"{_place(_end_point(activities[first - 1]))} at {start_time}" if first > 0 else f"at {start_time}"
+    end_constraint = f"{_place(_start_point(activities[last + 1]))} by {end_time}" \
+        if last + 1 < len(activities) else f"by {end_time}"
+    avoid_places = list(dict.fromkeys(place for day in itinerary_data for place in _visit_names(day)))
+
+    payload = build_payload(
+        build_activity_prompt(cleaned_data, day_plan, replaced, start_constraint, end_constraint, avoid_places),
+        ACTIVITIES_SCHEMA,
+    )
+    with deadline(itinerary_budget()):
+        response_data = await generate_content(payload)
+        replacement = json.loads(response_text(response_data))
+        if not isinstance(replacement, list) or not replacement:
+            raise ItineraryFormatError("The model returned no replacement activities.")
+        await validate_locations([{'activities': replacement}], cleaned_data['city'])
+
+    prefix = f"d{day_index + 1}-r{uuid.uuid4().hex[:6]}-"
+    for number, activity in enumerate(replacement, start=1):
+        activity['id'] = f"{prefix}{number}"
+    day_plan['activities'] = activities[:first] + replacement + activities[last + 1:]
+    # Only the slice changes, so the optimizer is skipped here.
+    day_plan = compile_day(day_plan)
+    await add_routes([day_plan])
+
+    edited = list(itinerary_data)
+    edited[day_index] = day_plan
+    return edited, day_index
+
+
+async def save_edit(itinerary, itinerary_data):
+    """
+    Store an edited itinerary as a new row with its own permalink and return
+    it. The original, which everyone who submitted the same request is
+    linked to, is left as it was; the edit has no request hash or match key,
+    so it is never served from the itinerary cache, a form submission or a
+    near-duplicate lookup.
+    """
+    edit = await Itinerary.objects.acreate(
+        request_hash='',
+        match_key='',
+        edited_from=itinerary,
+        city=itinerary.city,
+        start_date=itinerary.start_date,
+        end_date=itinerary.end_date,
+        request_data=itinerary.request_data,
+        itinerary_data=itinerary_data,
+    )
+    logger.info(f"Saved edit {edit.public_id} of itinerary {itinerary.public_id}.")
+    return edit
@@ -0,0 +1,230 @@
+# taramgo/app/routing.py
+
+import asyncio
+import logging
+import math
+import weakref
+
+import httpx
+from django.conf import settings
+
+from . import polyline
+from .models import RouteLeg
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371008.8
+
+# Words in transport_mode_details that pick a non-driving OSRM profile.
+PROFILE_KEYWORDS = (
+    ('foot', ('walk', 'foot', 'hike', 'stroll')),
+    ('bike', ('bike', 'bicycle', 'cycl')),
+)
+
+
+# Pooled routing client per event loop, as for Gemini (app.gemini.get_client).
+_clients = weakref.WeakKeyDictionary()
+# Fetches outliving the render that started them (see add_routes' wait).
+_background = set()
+
+
+def _routing_setting(name, default):
+    return getattr(settings, 'ROUTING', {}).get(name, default)
+
+
+def routing_enabled():
+    """
+    Routing needs ENABLED and an explicitly configured BASE_URL: there is no
+    default service to fall back on.
+    """
+    return bool(_routing_setting('ENABLED', True) and _routing_setting('BASE_URL', ''))
+
+
+def render_wait():
+    """
+    How long a page render waits on the routing service (see add_routes).
+    """
+    return _routing_setting('RENDER_WAIT', 0.5)
+
+
+def get_client():
+    """
+    Return the routing AsyncClient for the running event loop, creating it on
+    first use. Callers must not close it; see aclose_clients().
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=_routing_setting('BASE_URL', ''),
+            timeout=_routing_setting('TIMEOUT', 5.0),
+            limits=httpx.Limits(max_connections=_routing_setting('CONCURRENCY', 4) * 2),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def aclose_clients():
+    """
+    Close the running loop's routing client. Registered as an ASGI shutdown hook.
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+def haversine_m(start, end):
+    lat1, lon1, lat2, lon2 = map(math.radians, (*start, *end))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def _point(lat, lon):
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    precision = _routing_setting('PRECISION', 4)
+    return round(lat, precision), round(lon, precision)
+
+
+def leg_endpoints(activity):
+    """
+    Rounded ((lat, lon), (lat, lon)) for a Travel activity, or None.
+    """
+    start = _point(activity.get('start_point_lat'), activity.get('start_point_lon'))
+    end = _point(activity.get('end_point_lat'), activity.get('end_point_lon'))
+    if start is None or end is None or start == end:
+        return None
+    return start, end
+
+
+def profile_for(activity):
+    details = (activity.get('transport_mode_details') or '').lower()
+    for profile, keywords in PROFILE_KEYWORDS:
+        if any(keyword in details for keyword in keywords):
+            return profile
+    return _routing_setting('DEFAULT_PROFILE', 'driving')
+
+
+def leg_key(profile, start, end):
+    return f"{profile}:{start[0]},{start[1]};{end[0]},{end[1]}"
+
+
+def _route(polyline_text, distance_m, duration_s, source):
+    return {
+        'polyline': polyline_text,
+        'distance_km': round(distance_m / 1000, 1),
+        'duration_min': round(duration_s / 60) if duration_s is not None else None,
+        'source': source,
+    }
+
+
+def straight_route(start, end):
+    """
+    Fallback when the routing service is unavailable: a straight segment.
+    """
+    return _route(polyline.encode([start, end]), haversine_m(start, end), None, 'straight')
+
+
+async def fetch_leg(client, profile, start, end):
+    """
+    Ask the OSRM-compatible service for one leg and return an unsaved RouteLeg.
+    """
+    coordinates = f"{start[1]},{start[0]};{end[1]},{end[0]}"
+    response = await client.get(
+        f"/route/v1/{profile}/{coordinates}",
+        params={'overview': 'full', 'geometries': 'polyline', 'steps': 'false'},
+    )
+    response.raise_for_status()
+    body = response.json()
+    if body.get('code') != 'Ok' or not body.get('routes'):
+        raise ValueError(f"No route found ({body.get('code')}).")
+    route = body['routes'][0]
+    return RouteLeg(
+        key=leg_key(profile, start, end),
+        profile=profile,
+        polyline=route['geometry'],
+        distance_m=route['distance'],
+        duration_s=route['duration'],
+    )
+
+
+async def _fetch_missing(legs):
+    """
+    Fetch unseen legs from the routing service and store them in RouteLeg.
+    """
+    semaphore = asyncio.Semaphore(_routing_setting('CONCURRENCY', 4))
+    client = get_client()
+
+    async def fetch(key, profile, start, end):
+        async with semaphore:
+            try:
+                return await fetch_leg(client, profile, start, end)
+            except Exception as e:
+                logger.warning(f"Routing failed for {key}: {e}")
+                return None
+
+    fetched = [leg for leg in await asyncio.gather(*(fetch(key, *leg) for key, leg in legs.items())) if leg is not None]
+    if fetched:
+        try:
+            await RouteLeg.objects.abulk_create(fetched, ignore_conflicts=True)
+        except Exception as e:
+            logger.error(f"Failed to store {len(fetched)} route legs: {e}", exc_info=True)
+    return fetched
+
+
+async def add_routes(itinerary_data, wait=None):
+    """
+    Attach a 'route' (encoded polyline, distance, duration) to every Travel
+    activity that lacks one, or only has the straight-line fallback stored
+    while the service was down. Legs come from the RouteLeg table first; only
+    unseen legs hit the routing service, and failures fall back to a straight
+    line again. With `wait`, the service gets at most that many seconds: legs it
+    hasn't answered by then are drawn straight, and the fetch carries on in
+    the background to fill the route cache for later views.
+    """
+    if not routing_enabled() or not itinerary_data:
+        return itinerary_data
+
+    legs, activities = {}, {}
+    for day_plan in itinerary_data:
+        for activity in day_plan.get('activities', []):
+            route = activity.get('route')
+            if activity.get('type') != 'Travel' or (route and route.get('source') != 'straight'):
+                continue
+            endpoints = leg_endpoints(activity)
+            if endpoints is None:
+                continue
+            profile = profile_for(activity)
+            key = leg_key(profile, *endpoints)
+            legs[key] = (profile, *endpoints)
+            activities.setdefault(key, []).append(activity)
+    if not legs:
+        return itinerary_data
+
+    known = {}
+    try:
+        known = {leg.key: leg async for leg in RouteLeg.objects.filter(key__in=list(legs))}
+        missing = {key: leg for key, leg in legs.items() if key not in known}
+        if missing:
+            task = asyncio.ensure_future(_fetch_missing(missing))
+            done, _ = await asyncio.wait({task}, timeout=wait)
+            if done:
+                known.update((leg.key, leg) for leg in task.result())
+            else:
+                logger.info(f"Routing {len(missing)} legs took over {wait}s; finishing in the background.")
+                _background.add(task)
+                task.add_done_callback(_background.discard)
+        logger.debug(f"Routed {len(legs)} legs, {len(legs) - len(missing)} from the route cache.")
+    except Exception as e:
+        logger.error(f"Route lookup failed: {e}", exc_info=True)
+
+    for key, (profile, start, end) in legs.items():
+        leg = known.get(key)
+        route = _route(leg.polyline, leg.distance_m, leg.duration_s, 'osrm') if leg else straight_route(start, end)
+        for activity in activities[key]:
+            activity['route'] = route
+    return itinerary_data
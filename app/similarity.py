@@ -0,0 +1,206 @@
+# taramgo/app/similarity.py
+
+import copy
+import datetime
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from .geocoding import normalise_name
+from .models import Itinerary
+from .optimizer import format_time_slot, parse_time_slot
+
+logger = logging.getLogger(__name__)
+
+# Date formats Gemini has been seen to use for a day's 'date', tried in order.
+DATE_FORMATS = ('%Y-%m-%d', '%B %d, %Y', '%d %B %Y', '%A, %B %d, %Y', '%a, %b %d, %Y', '%b %d, %Y', '%d/%m/%Y')
+
+
+def _similarity_setting(name, default):
+    return getattr(settings, 'ITINERARY_SIMILARITY', {}).get(name, default)
+
+
+def similarity_enabled():
+    return _similarity_setting('ENABLED', True)
+
+
+def _as_date(value):
+    return value if isinstance(value, datetime.date) else datetime.date.fromisoformat(value)
+
+
+def _as_minutes(value):
+    if not isinstance(value, datetime.time):
+        value = datetime.time.fromisoformat(value)
+    return value.hour * 60 + value.minute
+
+
+def city_key(city):
+    """
+    'Paris, France', ' paris ,FRANCE' and 'PARÍS, France' all become
+    'paris, france'. The region or country is kept, so 'Paris, Texas' never
+    shares a plan with 'Paris, France'; CITY_ALIASES maps other spellings
+    (a bare 'paris', say) onto one of them.
+    """
+    parts = (normalise_name(part) for part in str(city or '').split(','))
+    key = ', '.join(part for part in parts if part)
+    return _similarity_setting('CITY_ALIASES', {}).get(key, key)
+
+
+def request_signature(cleaned_data):
+    """
+    The parts of a request that shape the plan, with the dates reduced to a
+    duration and weekday pattern. Works on cleaned form data or on the
+    canonical request_data stored with an Itinerary.
+    """
+    start_date, end_date = _as_date(cleaned_data['start_date']), _as_date(cleaned_data['end_date'])
+    days = (end_date - start_date).days + 1
+    return {
+        'city': city_key(cleaned_data['city']),
+        'days': days,
+        'budget': cleaned_data.get('budget') or '',
+        'traveler_type': cleaned_data.get('traveler_type') or '',
+        'starting_point': normalise_name(cleaned_data.get('starting_point')),
+        'ending_point': normalise_name(cleaned_data.get('ending_point')),
+        'start_date': start_date,
+        'weekdays': [(start_date + datetime.timedelta(days=offset)).weekday() for offset in range(days)],
+        'start_minutes': _as_minutes(cleaned_data['start_time']),
+        'end_minutes': _as_minutes(cleaned_data['end_time']),
+        'interests': frozenset(cleaned_data.get('interests') or ()),
+        'food_preferences': frozenset(cleaned_data.get('food_preferences') or ()),
+    }
+
+
+def match_key(signature):
+    """
+    Index key shared by every request that could reuse the same plan: same
+    city, length, budget, party and start/end points.
+    """
+    document = '|'.join(str(signature[name]) for name in (
+        'city', 'days', 'budget', 'traveler_type', 'starting_point', 'ending_point'))
+    return hashlib.sha256(document.encode('utf-8')).hexdigest()
+
+
+def match_key_for(cleaned_data):
+    return match_key(request_signature(cleaned_data))
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def similarity(a, b):
+    """
+    Score in [0, 1] for reusing b's plan for request a, or 0 if they are for
+    different cities (rows stored before city_key kept the country share a
+    match_key) or b's days can't be fitted into a's: adapt_itinerary moves
+    b's timings to a's start time, and they must then end by a's end time.
+    """
+    if a['city'] != b['city']:
+        return 0.0
+    tolerance = _similarity_setting('TIME_TOLERANCE_MINUTES', 60)
+    if abs(a['start_minutes'] - b['start_minutes']) > tolerance or \
+            abs(a['end_minutes'] - b['end_minutes']) > tolerance or \
+            b['end_minutes'] - b['start_minutes'] > a['end_minutes'] - a['start_minutes']:
+        return 0.0
+    weekdays = sum(x == y for x, y in zip(a['weekdays'], b['weekdays'])) / max(1, len(a['weekdays']))
+    return (0.5 * _jaccard(a['interests'], b['interests'])
+            + 0.2 * _jaccard(a['food_preferences'], b['food_preferences'])
+            + 0.3 * weekdays)
+
+
+def _redate(value, offset_days):
+    for fmt in DATE_FORMATS:
+        try:
+            parsed = datetime.datetime.strptime(value.strip(), fmt)
+        except (AttributeError, ValueError):
+            continue
+        return (parsed + datetime.timedelta(days=offset_days)).strftime(fmt)
+    return None
+
+
+def _retime(activity, offset_minutes):
+    slot = parse_time_slot(activity.get('time_slot'))
+    if slot is not None:
+        start, end, twelve_hour = slot
+        activity['time_slot'] = format_time_slot(start + offset_minutes, end + offset_minutes, twelve_hour)
+
+
+def adapt_itinerary(itinerary_data, source_signature, target_signature):
+    """
+    Copy of a stored itinerary moved onto the target request's dates, with
+    every time slot shifted by the difference in start times.
+    """
+    offset_days = (target_signature['start_date'] - source_signature['start_date']).days
+    offset_minutes = target_signature['start_minutes'] - source_signature['start_minutes']
+    adapted = copy.deepcopy(itinerary_data)
+    for index, day_plan in enumerate(adapted):
+        date = _redate(day_plan.get('date'), offset_days)
+        if date is None:
+            date = (target_signature['start_date'] + datetime.timedelta(days=index)).isoformat()
+        day_plan['date'] = date
+        if offset_minutes:
+            for activity in day_plan.get('activities') or []:
+                _retime(activity, offset_minutes)
+    return adapted
+
+
+class SimilarityStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.adapt_seconds = 0.0
+
+    def record(self, hit, seconds):
+        with self._lock:
+            self.lookups += 1
+            if hit:
+                self.hits += 1
+                self.adapt_seconds += seconds
+
+    def stats(self):
+        with self._lock:
+            return {
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'hit_ratio': self.hits / self.lookups if self.lookups else 0.0,
+                'mean_adapt_ms': self.adapt_seconds / self.hits * 1000 if self.hits else 0.0,
+            }
+
+
+similarity_stats = SimilarityStats()
+
+
+async def find_similar_itinerary(cleaned_data):
+    """
+    Adapt the closest stored itinerary for a near-duplicate request, or
+    return None when nothing scores at least MIN_SCORE.
+    """
+    if not similarity_enabled():
+        return None
+    started = time.perf_counter()
+    target = request_signature(cleaned_data)
+    candidates = Itinerary.objects.filter(match_key=match_key(target)).order_by('-created_at') \
+        .values_list('id', 'request_data')[:_similarity_setting('MAX_CANDIDATES', 50)]
+
+    best_score, best_id, best_signature = 0.0, None, None
+    async for itinerary_id, request_data in candidates:
+        try:
+            signature = request_signature(request_data)
+        except (KeyError, TypeError, ValueError):
+            continue
+        score = similarity(target, signature)
+        if score > best_score:
+            best_score, best_id, best_signature = score, itinerary_id, signature
+
+    adapted = None
+    if best_score >= _similarity_setting('MIN_SCORE', 0.8):
+        itinerary_data = await Itinerary.objects.filter(id=best_id).values_list('itinerary_data', flat=True).afirst()
+        if itinerary_data:
+            adapted = adapt_itinerary(itinerary_data, best_signature, target)
+            logger.info(f"Reusing stored itinerary {best_id} for {cleaned_data['city']} (score {best_score:.2f}).")
+    similarity_stats.record(adapted is not None, time.perf_counter() - started)
+    return adapted
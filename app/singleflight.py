@@ -0,0 +1,226 @@
+# taramgo/app/singleflight.py
+
+import asyncio
+import contextlib
+import copy
+import logging
+import threading
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import checks
+
+logger = logging.getLogger(__name__)
+
+# Cache backends that live inside one process and so can't lock across workers.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def _singleflight_setting(name, default):
+    return getattr(settings, 'ITINERARY_SINGLEFLIGHT', {}).get(name, default)
+
+
+def _consume_exception(future):
+    # Followers may all have gone away; don't log "exception never retrieved".
+    if not future.cancelled():
+        future.exception()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key onto one in-flight future, so
+    identical requests that arrive while the first is still running await its
+    result instead of calling upstream again.
+
+    Calls are only shared within the event loop that started them.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def in_flight(self, key):
+        """
+        Return the future for a running call with this key, if any.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+        if future is None or future.done() or future.get_loop() is not asyncio.get_running_loop():
+            return None
+        return future
+
+    @contextlib.contextmanager
+    def track(self, key):
+        """
+        Register the caller as the leader for a key and yield a future that it
+        must resolve with set_result(). Use this when the result is produced
+        incrementally (e.g. while streaming) rather than by a single coroutine.
+        """
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        with self._lock:
+            self._calls[key] = future
+            self.leaders += 1
+        try:
+            yield future
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            with self._lock:
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+
+    async def _wait(self, future):
+        with self._lock:
+            self.coalesced += 1
+        try:
+            result = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise
+            return False, None
+        # Every waiter gets its own copy so post-processing can't leak between requests.
+        return True, copy.deepcopy(result)
+
+    async def join(self, key):
+        """
+        Wait for a call already in flight for this key. Returns (True, result),
+        or (False, None) if there is none or its leader was cancelled.
+        """
+        future = self.in_flight(key)
+        if future is None:
+            return False, None
+        return await self._wait(future)
+
+    async def do(self, key, func):
+        """
+        Run func() once for all concurrent callers with the same key.
+        """
+        shared, result = await self.join(key)
+        if shared:
+            return result
+
+        with self.track(key) as future:
+            result = await func()
+            future.set_result(result)
+        return copy.deepcopy(result)
+
+    def stats(self):
+        with self._lock:
+            return {'leaders': self.leaders, 'coalesced': self.coalesced, 'in_flight': len(self._calls)}
+
+
+class CacheLock:
+    """
+    Cross-worker lock built on cache.add(), which is atomic in every Django
+    cache backend. Point CACHE_ALIAS at a shared cache (database, Redis,
+    Memcached) for it to coordinate between processes.
+    """
+
+    def __init__(self, key, timeout=None, alias=None):
+        self.key = f"singleflight:{key}"
+        self.timeout = timeout or _singleflight_setting('LOCK_TIMEOUT', 120)
+        self.alias = alias or _singleflight_setting('CACHE_ALIAS', 'default')
+        self.token = uuid.uuid4().hex
+
+    @property
+    def _cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    async def acquire(self):
+        return await sync_to_async(self._cache.add)(self.key, self.token, self.timeout)
+
+    async def locked(self):
+        return await sync_to_async(self._cache.get)(self.key) is not None
+
+    async def release(self):
+        def _release():
+            if self._cache.get(self.key) == self.token:
+                self._cache.delete(self.key)
+        await sync_to_async(_release)()
+
+
+async def run_once_across_workers(key, func, lookup):
+    """
+    Run func() in at most one worker at a time for a key. Other workers poll
+    lookup() (the stored itineraries, which every worker sees) until the
+    holder publishes the result, and take over if the holder dies without one.
+    """
+    lock = CacheLock(key)
+    poll_interval = _singleflight_setting('POLL_INTERVAL', 0.5)
+    deadline = time.monotonic() + lock.timeout
+
+    while True:
+        if await lock.acquire():
+            try:
+                return await func()
+            finally:
+                await lock.release()
+
+        logger.debug(f"Waiting for another worker to generate {key[:12]}.")
+        while await lock.locked() and time.monotonic() < deadline:
+            await asyncio.sleep(poll_interval)
+            result = await lookup()
+            if result is not None:
+                return result
+        result = await lookup()
+        if result is not None:
+            return result
+        if time.monotonic() >= deadline:
+            # The holder is stuck; stop waiting and do the work ourselves.
+            return await func()
+
+
+def lock_cache_is_shared():
+    alias = _singleflight_setting('CACHE_ALIAS', 'default')
+    return settings.CACHES.get(alias, {}).get('BACKEND') not in LOCAL_CACHE_BACKENDS
+
+
+def distributed_enabled():
+    """
+    DISTRIBUTED only takes effect when CACHE_ALIAS is a shared cache: with a
+    per-process one every worker would take the lock (see
+    check_singleflight_config).
+    """
+    return _singleflight_setting('DISTRIBUTED', False) and lock_cache_is_shared()
+
+
+def check_singleflight_config(app_configs, **kwargs):
+    """
+    System check (registered in AppConfig.ready) for a DISTRIBUTED
+    single-flight that can't work.
+    """
+    if not _singleflight_setting('DISTRIBUTED', False) or lock_cache_is_shared():
+        return []
+    alias = _singleflight_setting('CACHE_ALIAS', 'default')
+    return [checks.Warning(
+        f"ITINERARY_SINGLEFLIGHT['DISTRIBUTED'] is set, but the {alias!r} cache is local to each process.",
+        hint="Point ITINERARY_SINGLEFLIGHT['CACHE_ALIAS'] at a database, Redis or Memcached cache; "
+             "until then requests are only coalesced within a process.",
+        id='app.W002',
+    )]
+
+
+itinerary_flights = SingleFlight()
+
+
+async def coalesce(key, func, lookup):
+    """
+    Single-flight an itinerary generation: in-process first, then optionally
+    across workers (settings.ITINERARY_SINGLEFLIGHT['DISTRIBUTED']).
+    """
+    if distributed_enabled():
+        return await itinerary_flights.do(key, lambda: run_once_across_workers(key, func, lookup))
+    return await itinerary_flights.do(key, func)
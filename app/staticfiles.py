@@ -0,0 +1,64 @@
+# taramgo/app/staticfiles.py
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise for the async middleware stack. WhiteNoiseMiddleware is
+    sync-only, so Django would put every request, not just the static ones,
+    through a thread hop to reach it; this answers static paths from
+    WhiteNoise's in-memory file table and hands everything else straight on
+    to the async views.
+
+    WhiteNoise picks the .br/.gz copy collectstatic built for the client's
+    Accept-Encoding and sends hashed (manifest) names with a far-future,
+    immutable Cache-Control.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        path = request.path_info
+        if self.autorefresh:
+            # DEBUG: look the file up on disk (and through the finders) each time.
+            static_file = None
+            if path.startswith(self.static_prefix):
+                static_file = await sync_to_async(self.find_file, thread_sensitive=False)(path)
+        else:
+            static_file = self.files.get(path)
+        if static_file is None:
+            return await self.get_response(request)
+        return await sync_to_async(self.serve_buffered, thread_sensitive=False)(static_file, request)
+
+    @staticmethod
+    def serve_buffered(static_file, request):
+        """
+        Like WhiteNoiseMiddleware.serve, with the body read up front: the
+        vendored assets are small, and under ASGI Django would otherwise warn
+        about (and buffer anyway) the synchronous file iterator.
+        """
+        response = static_file.get_response(request.method, request.META)
+        body = b''
+        if response.file is not None:
+            with response.file:
+                body = response.file.read()
+        http_response = HttpResponse(body, status=int(response.status))
+        del http_response['Content-Type']
+        for key, value in response.headers:
+            http_response[key] = value
+        return http_response
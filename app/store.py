@@ -0,0 +1,69 @@
+# taramgo/app/store.py
+
+import logging
+
+from django.conf import settings
+
+from .cache import canonical_form_data
+from .models import Itinerary
+from .similarity import match_key_for
+
+logger = logging.getLogger(__name__)
+
+
+async def find_itinerary(request_hash):
+    """
+    Newest stored itinerary generated from an identical request, if any.
+    """
+    return await Itinerary.objects.latest_for_hash(request_hash).afirst()
+
+
+async def find_itinerary_data(request_hash):
+    """
+    Just the itinerary JSON of find_itinerary(), or None.
+    """
+    return await Itinerary.objects.latest_for_hash(request_hash).values_list('itinerary_data', flat=True).afirst()
+
+
+async def save_itinerary(request_hash, cleaned_data, itinerary_data):
+    """
+    Persist a generated itinerary and return the model instance.
+    """
+    itinerary = await Itinerary.objects.acreate(
+        request_hash=request_hash,
+        match_key=match_key_for(cleaned_data),
+        city=cleaned_data['city'],
+        start_date=cleaned_data['start_date'],
+        end_date=cleaned_data['end_date'],
+        request_data=canonical_form_data(cleaned_data),
+        itinerary_data=itinerary_data,
+    )
+    logger.debug(f"Stored itinerary {itinerary.public_id} for {itinerary.city}.")
+    return itinerary
+
+
+async def get_or_save_itinerary(request_hash, cleaned_data, itinerary_data):
+    """
+    Reuse the stored row for this request hash, or store a new one. Storage
+    failures are logged and never fail the request; None is returned instead.
+    """
+    try:
+        itinerary = await find_itinerary(request_hash)
+        if itinerary is None:
+            itinerary = await save_itinerary(request_hash, cleaned_data, itinerary_data)
+        return itinerary
+    except Exception as e:
+        logger.error(f"Failed to store itinerary {request_hash[:12]}: {e}", exc_info=True)
+        return None
+
+
+def prune_itineraries(max_age_days=None, max_rows=None, compact=True):
+    """
+    Apply settings.ITINERARY_RETENTION; explicit arguments override it.
+    """
+    retention = getattr(settings, 'ITINERARY_RETENTION', {})
+    if max_age_days is None:
+        max_age_days = retention.get('MAX_AGE_DAYS')
+    if max_rows is None:
+        max_rows = retention.get('MAX_ROWS')
+    return Itinerary.objects.prune(max_age_days=max_age_days, max_rows=max_rows, compact=compact)
@@ -0,0 +1,101 @@
+# taramgo/app/streaming.py
+
+import json
+
+
+class IncrementalArrayParser:
+    """
+    Incrementally parses a top-level JSON array that arrives in arbitrary
+    text chunks, returning each element as soon as its closing brace or
+    bracket has been seen.
+
+        parser = IncrementalArrayParser()
+        for chunk in chunks:
+            for item in parser.feed(chunk):
+                ...
+        parser.close()
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._pos = 0
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._item_start = None
+
+    def feed(self, text):
+        """
+        Add more text and return the list of elements completed by it.
+        """
+        self._buffer += text
+        items = []
+        buffer = self._buffer
+        pos = self._pos
+        length = len(buffer)
+
+        while pos < length and not self._finished:
+            char = buffer[pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif not self._started:
+                if char == '[':
+                    self._started = True
+                elif not char.isspace():
+                    raise json.JSONDecodeError("Expected a JSON array", buffer, pos)
+            elif char == '"':
+                self._in_string = True
+                if self._item_start is None:
+                    self._item_start = pos
+            elif char in '{[':
+                if self._item_start is None:
+                    self._item_start = pos
+                self._depth += 1
+            elif char in '}]':
+                if self._depth == 0:
+                    if char == ']':
+                        items.extend(self._flush_scalar(buffer, pos))
+                        self._finished = True
+                    else:
+                        raise json.JSONDecodeError("Unbalanced '}'", buffer, pos)
+                else:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        items.append(json.loads(buffer[self._item_start:pos + 1]))
+                        self._item_start = None
+            elif char == ',' and self._depth == 0:
+                items.extend(self._flush_scalar(buffer, pos))
+            elif self._item_start is None and not char.isspace():
+                self._item_start = pos
+            pos += 1
+
+        # Drop everything that has been consumed so the buffer only ever
+        # holds the element currently being received.
+        keep_from = self._item_start if self._item_start is not None else pos
+        self._buffer = buffer[keep_from:]
+        self._pos = pos - keep_from
+        if self._item_start is not None:
+            self._item_start = 0
+        return items
+
+    def _flush_scalar(self, buffer, pos):
+        # Scalars (numbers, strings, literals) end at a comma or the closing bracket.
+        if self._item_start is None:
+            return []
+        text = buffer[self._item_start:pos].strip()
+        self._item_start = None
+        return [json.loads(text)] if text else []
+
+    def close(self):
+        """
+        Raise if the stream ended before the closing bracket of the array.
+        """
+        if not self._finished:
+            raise json.JSONDecodeError("Incomplete JSON array", self._buffer, len(self._buffer))
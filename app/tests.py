@@ -1,3 +1,379 @@
-from django.test import TestCase
+# taramgo/app/tests.py
 
-# Create your tests here.
+import datetime
+import hashlib
+import json
+import random
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import polyline
+from .batches import batch_progress, create_batch, reclaim_running, retry_failed
+from .cache import CACHE_KEY_VERSION, canonical_form_data, request_cache_key
+from .governor import CLOSED, HALF_OPEN, OPEN, CircuitOpen, UpstreamGovernor
+from .jobs import claim_next_job, enqueue_job, requeue_stale_jobs
+from .metrics import Counter, Histogram, Registry
+from .models import GenerationBatch, GenerationJob, Itinerary, RouteLeg
+from .optimizer import distance_matrix, optimise_day, optimise_order, parse_time_slot, path_length
+from .pipeline import clean_request_data
+from .prompts import DAY_SCHEMA, RESPONSE_SCHEMA
+from .routing import leg_key, straight_route
+from .similarity import city_key, find_similar_itinerary, match_key_for, request_signature, similarity
+
+REQUEST = {
+    'city': 'Lisbon',
+    'start_date': '2026-11-02',
+    'end_date': '2026-11-03',
+    'start_time': '09:00',
+    'end_time': '18:00',
+    'budget': 'mid',
+    'traveler_type': 'couple',
+    'interests': ['history', 'museums'],
+    'food_preferences': ['local'],
+}
+
+
+ITINERARY = [{
+    'day': 'Day 1',
+    'date': '2026-11-02',
+    'activities': [
+        {'id': 'a1', 'type': 'Visit', 'time_slot': '09:00 AM - 10:30 AM', 'location_name': 'Belém Tower',
+         'description': '- Climb the tower', 'latitude': 38.6916, 'longitude': -9.2160},
+        {'id': 'a2', 'type': 'Travel', 'time_slot': '10:30 AM - 10:45 AM', 'description': '- Walk',
+         'transport_mode_details': 'Walk',
+         'start_point_lat': 38.6916, 'start_point_lon': -9.2160, 'end_point_lat': 38.6979, 'end_point_lon': -9.2068},
+        {'id': 'a3', 'type': 'Visit', 'time_slot': '10:45 AM - 12:00 PM', 'location_name': 'Jerónimos Monastery',
+         'description': '- See the cloister', 'latitude': 38.6979, 'longitude': -9.2068},
+    ],
+}]
+
+
+def request_data(**changes):
+    return clean_request_data({**REQUEST, **changes})
+
+
+def stored_itinerary(**fields):
+    source = request_data()
+    return Itinerary.objects.create(**{
+        'request_hash': 'hash', 'city': 'Lisbon', 'start_date': source['start_date'], 'end_date': source['end_date'],
+        'request_data': canonical_form_data(source), 'itinerary_data': ITINERARY, **fields,
+    })
+
+
+class RequestCacheKeyTests(SimpleTestCase):
+    def test_key_ignores_list_order_and_whitespace(self):
+        reordered = request_data(city='  Lisbon ', interests=['museums', 'history'])
+        self.assertEqual(request_cache_key(request_data(), 'model', RESPONSE_SCHEMA),
+                         request_cache_key(reordered, 'model', RESPONSE_SCHEMA))
+
+    def test_key_changes_with_request_model_and_schema(self):
+        key = request_cache_key(request_data(), 'model', RESPONSE_SCHEMA)
+        self.assertNotEqual(key, request_cache_key(request_data(budget='high'), 'model', RESPONSE_SCHEMA))
+        self.assertNotEqual(key, request_cache_key(request_data(), 'other-model', RESPONSE_SCHEMA))
+        self.assertNotEqual(key, request_cache_key(request_data(), 'model', DAY_SCHEMA))
+
+    def test_key_matches_plain_json_encoding(self):
+        # Keys already stored must survive changes to how the key is built.
+        cleaned_data = request_data()
+        document = json.dumps({'v': CACHE_KEY_VERSION, 'form': canonical_form_data(cleaned_data), 'model': 'model',
+                               'schema': RESPONSE_SCHEMA}, sort_keys=True, separators=(',', ':'))
+        self.assertEqual(request_cache_key(cleaned_data, 'model', RESPONSE_SCHEMA),
+                         hashlib.sha256(document.encode('utf-8')).hexdigest())
+
+
+class PolylineTests(SimpleTestCase):
+    def test_known_encoding(self):
+        coordinates = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+        self.assertEqual(polyline.encode(coordinates), '_p~iF~ps|U_ulLnnqC_mqNvxq`@')
+        self.assertEqual(polyline.decode('_p~iF~ps|U_ulLnnqC_mqNvxq`@'), coordinates)
+
+    def test_round_trip(self):
+        rng = random.Random(3)
+        coordinates = [(round(rng.uniform(-90, 90), 5), round(rng.uniform(-180, 180), 5)) for _ in range(50)]
+        coordinates.append((0.0, 0.0))
+        for precision in (5, 6):
+            decoded = polyline.decode(polyline.encode(coordinates, precision), precision)
+            self.assertEqual(len(decoded), len(coordinates))
+            for (lat, lon), (expected_lat, expected_lon) in zip(decoded, coordinates):
+                self.assertAlmostEqual(lat, expected_lat, places=precision)
+                self.assertAlmostEqual(lon, expected_lon, places=precision)
+
+
+class OptimizerTests(SimpleTestCase):
+    def test_order_is_a_shorter_path_with_fixed_ends(self):
+        rng = random.Random(5)
+        for size in (4, 7, 12):
+            points = [(38.7 + rng.uniform(0, 0.05), -9.2 + rng.uniform(0, 0.1)) for _ in range(size)]
+            matrix = distance_matrix(points)
+            order, original, optimised = optimise_order(matrix)
+            self.assertEqual(sorted(order.tolist()), list(range(size)))
+            self.assertEqual((order[0], order[-1]), (0, size - 1))
+            self.assertLessEqual(optimised, original)
+            self.assertAlmostEqual(path_length(matrix, order), optimised)
+
+    def test_day_keeps_its_stops_and_timings(self):
+        # A zigzag along one street: 1, 3, 2, 4 instead of 1, 2, 3, 4.
+        stops = [('A', 38.70, -9.20), ('C', 38.70, -9.16), ('B', 38.70, -9.18), ('D', 38.70, -9.14)]
+        activities = []
+        for index, (name, latitude, longitude) in enumerate(stops):
+            if index:
+                activities.append({'id': f't{index}', 'type': 'Travel', 'time_slot': f'{9 + 2 * index - 1}:00 - '
+                                   f'{9 + 2 * index - 1}:30'})
+            activities.append({'id': name, 'type': 'Visit', 'location_name': name, 'latitude': latitude,
+                               'longitude': longitude, 'time_slot': f'{9 + 2 * index}:00 - {10 + 2 * index}:00'})
+        day_plan = {'day': 'Day 1', 'activities': activities}
+
+        self.assertTrue(optimise_day(day_plan))
+        visits = [activity for activity in day_plan['activities'] if activity['type'] == 'Visit']
+        self.assertEqual([visit['id'] for visit in visits], ['A', 'B', 'C', 'D'])
+        slots = [parse_time_slot(activity['time_slot']) for activity in day_plan['activities']]
+        self.assertEqual(slots[0][0], 9 * 60)
+        for (_, end, _), (start, _, _) in zip(slots, slots[1:]):
+            self.assertEqual(end, start)
+        self.assertEqual([end - start for start, end, _ in slots[::2]], [60] * 4)
+
+
+def status_error(status):
+    request = httpx.Request('POST', 'https://gemini.invalid')
+    return httpx.HTTPStatusError(str(status), request=request, response=httpx.Response(status, request=request))
+
+
+class GovernorTests(SimpleTestCase):
+    async def succeed(self, governor):
+        async with governor.slot():
+            pass
+
+    async def fail(self, governor, status):
+        with self.assertRaises(httpx.HTTPStatusError):
+            async with governor.slot():
+                raise status_error(status)
+
+    async def test_success_grows_limit_additively(self):
+        governor = UpstreamGovernor(initial_concurrency=4, max_concurrency=5)
+        await self.succeed(governor)
+        self.assertAlmostEqual(governor.limit, 4.25)
+        for _ in range(20):
+            await self.succeed(governor)
+        self.assertEqual(governor.limit, 5)
+
+    async def test_throttling_halves_limit_once_per_burst(self):
+        governor = UpstreamGovernor(initial_concurrency=8)
+        # Both requests are sent before the first 429 comes back.
+        with self.assertRaises(httpx.HTTPStatusError):
+            async with governor.slot():
+                await self.fail(governor, 429)
+                self.assertEqual(governor.limit, 4)
+                raise status_error(429)
+        self.assertEqual(governor.limit, 4)
+        await self.fail(governor, 429)
+        self.assertEqual(governor.limit, 2)
+
+    async def test_limit_never_drops_below_minimum(self):
+        governor = UpstreamGovernor(initial_concurrency=2, min_concurrency=1)
+        for _ in range(3):
+            await self.fail(governor, 429)
+        self.assertEqual(governor.limit, 1)
+        self.assertEqual(governor.state, CLOSED)
+
+    async def test_circuit_opens_probes_and_closes(self):
+        governor = UpstreamGovernor(failure_threshold=2, reset_timeout=60)
+        await self.fail(governor, 500)
+        self.assertEqual(governor.state, CLOSED)
+        await self.fail(governor, 503)
+        self.assertEqual(governor.state, OPEN)
+        with self.assertRaises(CircuitOpen):
+            await self.succeed(governor)
+
+        governor._opened_at -= 60
+        async with governor.slot():
+            self.assertEqual(governor.state, HALF_OPEN)
+            with self.assertRaises(CircuitOpen):
+                await self.succeed(governor)
+        self.assertEqual(governor.state, CLOSED)
+
+    async def test_failed_probe_reopens_circuit(self):
+        governor = UpstreamGovernor(failure_threshold=1, reset_timeout=60)
+        await self.fail(governor, 500)
+        governor._opened_at -= 60
+        await self.fail(governor, 500)
+        self.assertEqual(governor.state, OPEN)
+        with self.assertRaises(CircuitOpen):
+            await self.succeed(governor)
+
+    async def test_client_errors_do_not_count(self):
+        governor = UpstreamGovernor(failure_threshold=1)
+        await self.fail(governor, 400)
+        await self.fail(governor, 429)
+        self.assertEqual(governor.state, CLOSED)
+        self.assertEqual(governor.failures, 0)
+
+
+class MetricsTests(SimpleTestCase):
+    def test_type_lines_name_the_samples(self):
+        registry = Registry()
+        registry.register(Counter('requests', "Requests.", ('status',))).inc(status='200')
+        registry.register(Histogram('latency_seconds', "Latency.", buckets=(1,))).observe(0.5)
+        self.assertEqual(registry.render().splitlines(), [
+            '# HELP requests_total Requests.',
+            '# TYPE requests_total counter',
+            'requests_total{status="200"} 1',
+            '# HELP latency_seconds Latency.',
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{le="1"} 1',
+            'latency_seconds_bucket{le="+Inf"} 1',
+            'latency_seconds_sum 0.5',
+            'latency_seconds_count 1',
+        ])
+
+
+@override_settings(ITINERARY_JOBS={'JOB_TIMEOUT': 300, 'MAX_ATTEMPTS': 2})
+class JobQueueTests(TestCase):
+    def create_job(self, priority=0):
+        return GenerationJob.objects.create(request_hash='hash', request_data=REQUEST, priority=priority)
+
+    def test_claims_lowest_priority_then_oldest(self):
+        first, second = self.create_job(priority=5), self.create_job(priority=5)
+        urgent = self.create_job(priority=0)
+        claimed = [claim_next_job('worker') for _ in range(3)]
+        self.assertEqual([job.id for job in claimed], [urgent.id, first.id, second.id])
+        self.assertIsNone(claim_next_job('worker'))
+
+        job = claimed[0]
+        self.assertEqual(job.status, GenerationJob.Status.RUNNING)
+        self.assertEqual(job.worker, 'worker')
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.started_at)
+
+    def test_requeues_stale_jobs_until_attempts_run_out(self):
+        job = self.create_job()
+        claim_next_job('worker')
+        self.assertEqual(requeue_stale_jobs(), 0)
+
+        stale = timezone.now() - datetime.timedelta(seconds=301)
+        GenerationJob.objects.filter(id=job.id).update(started_at=stale)
+        self.assertEqual(requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), (GenerationJob.Status.QUEUED, ''))
+
+        claim_next_job('worker')
+        GenerationJob.objects.filter(id=job.id).update(started_at=stale)
+        requeue_stale_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, GenerationJob.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    async def test_interactive_request_promotes_queued_batch_item(self):
+        batch, _ = await sync_to_async(create_batch)([dict(REQUEST, city='Porto'), dict(REQUEST)])
+        job = await enqueue_job(request_data())
+        self.assertEqual((job.batch_id, job.priority), (batch.id, 0))
+        claimed = await sync_to_async(claim_next_job)('worker')
+        self.assertEqual(claimed.id, job.id)
+
+
+@override_settings(ITINERARY_SIMILARITY={'ENABLED': True, 'MIN_SCORE': 0.8, 'TIME_TOLERANCE_MINUTES': 60,
+                                         'CITY_ALIASES': {'lisboa': 'lisbon'}})
+class SimilarityTests(TestCase):
+    def test_city_key(self):
+        self.assertEqual(city_key(' paris ,FRANCE'), 'paris, france')
+        self.assertEqual(city_key('PARÍS, France'), 'paris, france')
+        self.assertEqual(city_key('Lisboa'), 'lisbon')
+        self.assertNotEqual(city_key('Paris, Texas'), city_key('Paris, France'))
+
+    def test_score(self):
+        signature = request_signature(request_data())
+        self.assertEqual(similarity(signature, signature), 1.0)
+        self.assertEqual(similarity(request_signature(request_data(city='Porto')), signature), 0.0)
+        self.assertEqual(similarity(request_signature(request_data(end_time='17:00')), signature), 0.0)
+        fewer = request_signature(request_data(interests=['history']))
+        self.assertAlmostEqual(similarity(fewer, signature), 0.75)
+
+    async def test_adapts_closest_stored_itinerary(self):
+        source = request_data()
+        await Itinerary.objects.acreate(
+            request_hash='hash', match_key=match_key_for(source), city='Lisbon',
+            start_date=source['start_date'], end_date=source['end_date'], request_data=canonical_form_data(source),
+            itinerary_data=[{'date': '2026-11-02', 'activities': [{'type': 'Visit', 'time_slot': '09:00 AM - 10:00 AM'}]}],
+        )
+        # A week later, half an hour later in the day, under another spelling.
+        target = request_data(city='lisboa', start_date='2026-11-09', end_date='2026-11-10',
+                              start_time='09:30', end_time='18:30')
+        adapted = await find_similar_itinerary(target)
+        self.assertEqual(adapted, [{'date': '2026-11-09',
+                                    'activities': [{'type': 'Visit', 'time_slot': '09:30 AM - 10:30 AM'}]}])
+        self.assertIsNone(await find_similar_itinerary(request_data(budget='high')))
+
+
+class BatchTests(TestCase):
+    specs = [dict(REQUEST), dict(REQUEST, city='Porto'), dict(REQUEST, budget='unknown')]
+
+    def test_resubmitting_resumes_the_batch(self):
+        batch, created = create_batch(self.specs, name='autumn')
+        self.assertTrue(created)
+        self.assertEqual(batch_progress(batch)['queued'], 2)
+        self.assertEqual(batch_progress(batch)['failed'], 1)
+
+        claimed = claim_next_job('worker')
+        self.assertEqual(claimed.batch_id, batch.id)
+        resumed, created = create_batch(self.specs, name='autumn')
+        self.assertFalse(created)
+        self.assertEqual(resumed.id, batch.id)
+        self.assertEqual(GenerationBatch.objects.count(), 1)
+
+        self.assertEqual(reclaim_running(batch), 1)
+        self.assertEqual(batch_progress(batch)['queued'], 2)
+        # The invalid spec has no request to retry.
+        self.assertEqual(retry_failed(batch), 0)
+
+    def test_resubmitting_a_finished_batch_starts_a_new_one(self):
+        batch, _ = create_batch(self.specs)
+        batch.jobs.exclude(status=GenerationJob.Status.FAILED).update(status=GenerationJob.Status.SUCCEEDED)
+        again, created = create_batch(self.specs)
+        self.assertTrue(created)
+        self.assertNotEqual(again.id, batch.id)
+        self.assertEqual(batch_progress(again)['queued'], 2)
+
+    def test_retry_failed_requeues_valid_items(self):
+        batch, _ = create_batch(self.specs)
+        job = claim_next_job('worker')
+        GenerationJob.objects.filter(id=job.id).update(status=GenerationJob.Status.FAILED, error='Upstream error')
+        self.assertEqual(retry_failed(batch), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error, job.started_at), (GenerationJob.Status.QUEUED, '', None))
+
+
+# Pages render without running collectstatic first.
+@override_settings(STORAGES={**settings.STORAGES,
+                             'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}})
+class ItineraryPageTests(TestCase):
+    def test_shared_page_carries_no_csrf_token(self):
+        itinerary = stored_itinerary()
+        first, second = Client(enforce_csrf_checks=True), Client(enforce_csrf_checks=True)
+        pages = [client.get(itinerary.get_absolute_url()) for client in (first, second)]
+        self.assertEqual(pages[0].content, pages[1].content)
+        self.assertContains(pages[1], '<input type="hidden" name="csrfmiddlewaretoken" value="">', html=True)
+        self.assertNotEqual(first.cookies['csrftoken'].value, second.cookies['csrftoken'].value)
+        self.assertNotContains(pages[1], first.cookies['csrftoken'].value)
+
+    @override_settings(ROUTING={'ENABLED': True, 'BASE_URL': 'http://routing.invalid', 'RENDER_WAIT': 0.1})
+    def test_map_data_carries_the_page_routes(self):
+        itinerary = stored_itinerary()
+        RouteLeg.objects.create(key=leg_key('foot', (38.6916, -9.216), (38.6979, -9.2068)), profile='foot',
+                                polyline='_p~iF~ps|U_ulLnnqC', distance_m=1234, duration_s=900)
+        data = json.loads(self.client.get(reverse('itinerary_data', args=[itinerary.public_id])).content)
+        route = data[0]['activities'][1]['route']
+        self.assertEqual((route['source'], route['distance_km'], route['duration_min']), ('osrm', 1.2, 15))
+
+    @override_settings(ROUTING={'ENABLED': True, 'BASE_URL': 'http://routing.invalid', 'RENDER_WAIT': 0.1})
+    def test_straight_fallbacks_are_routed_again(self):
+        itinerary_data = json.loads(json.dumps(ITINERARY))
+        itinerary_data[0]['activities'][1]['route'] = straight_route((38.6916, -9.216), (38.6979, -9.2068))
+        itinerary = stored_itinerary(itinerary_data=itinerary_data)
+        RouteLeg.objects.create(key=leg_key('foot', (38.6916, -9.216), (38.6979, -9.2068)), profile='foot',
+                                polyline='_p~iF~ps|U_ulLnnqC', distance_m=1234, duration_s=900)
+        data = json.loads(self.client.get(reverse('itinerary_data', args=[itinerary.public_id])).content)
+        self.assertEqual(data[0]['activities'][1]['route']['source'], 'osrm')
@@ -3,4 +3,12 @@ from . import views
 
 urlpatterns = [
     path('', views.generate_itinerary_view, name='generate_itinerary'),
+    path('stream/', views.stream_itinerary_view, name='stream_itinerary'),
+    path('itineraries/<uuid:public_id>/', views.itinerary_detail_view, name='itinerary_detail'),
+    path('itineraries/<uuid:public_id>/data.json', views.itinerary_data_view, name='itinerary_data'),
+    path('itineraries/<uuid:public_id>/regenerate/', views.regenerate_itinerary_view, name='regenerate_itinerary'),
+    path('jobs/<uuid:public_id>/', views.job_status_view, name='job_status'),
+    path('batches/', views.batch_create_view, name='batch_create'),
+    path('batches/<uuid:public_id>/', views.batch_status_view, name='batch_status'),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -1,188 +1,480 @@
 # taramgo/app/views.py
 
-from django.shortcuts import render
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse,
+)
+from django.middleware.csrf import get_token
+from django.shortcuts import redirect, render
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.utils.datastructures import MultiValueDict
+from django.utils.http import http_date
+from django.views.decorators.csrf import csrf_exempt
+from .batches import BatchError, batch_payload, create_batch, parse_specs, retry_failed
+from .cache import get_itinerary_cache
+from .compression import negotiate, precompressed
 from .forms import ItineraryForm
-import asyncio
-import os
+from .jobs import QueueFull, enqueue_job, jobs_enabled
+from .metrics import render_metrics, stage
+from .models import GenerationBatch, GenerationJob, Itinerary
+from .pages import cached_day_fragments, itinerary_data_url, itinerary_etag, render_day_fragments
+from .pipeline import (
+    clean_request_data, describe_error, finish_day, generate_itinerary, get_or_generate_itinerary,
+    itinerary_request_key, iter_generated_days, reuse_similar_itinerary, validate_locations,
+)
+from .records import dumps_itinerary
+from .regeneration import RegenerationError, regenerate_activity, regenerate_day, save_edit
+from .routing import add_routes, render_wait
+from .singleflight import itinerary_flights
+from .store import get_or_save_itinerary
+from urllib.parse import urlencode
 import json
-import httpx
 import logging
-import urllib.parse
 
 # Set up proper logging
 logger = logging.getLogger(__name__)
 
-# --- Gemini API Configuration ---
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-if not GEMINI_API_KEY:
-    raise ValueError("FATAL: GEMINI_API_KEY not found in your .env file.")
+STREAM_TOKEN_SALT = 'app.views.stream_itinerary'
+STREAM_TOKEN_MAX_AGE = 10 * 60
 
-# Use the correct model name for Gemini
-GEMINI_MODEL_NAME = "gemini-1.5-flash"
-GEMINI_API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL_NAME}:generateContent"
 
-
-def _render_itinerary_page(request, itinerary_data, city, error_message=None):
+async def _render_itinerary_page(request, itinerary_data, city, error_message=None, stream_url=None, itinerary=None):
     """
-    Re-usable function to render the itinerary page.
+    Re-usable function to render the itinerary page. With a stored
+    `itinerary`, the page links its permalink and loads the map data from
+    the separately cached JSON endpoint instead of inlining it.
     """
-    map_data = []
-    if not error_message and itinerary_data:
-        logger.debug(f"Building map data for {len(itinerary_data)} days.")
-        for day_index, day_plan in enumerate(itinerary_data):
-            for activity in day_plan.get('activities', []):
-                activity_id = activity.get('id', 'No ID')
-                try:
-                    if activity.get('type') == 'Visit' and activity.get('latitude') is not None and activity.get('longitude') is not None:
-                        map_data.append({'lat': float(activity['latitude']), 'lon': float(activity['longitude']), 'popupText': activity.get('location_name', ''), 'activityId': activity_id, 'type': 'Visit', 'dayIndex': day_index})
-                    elif activity.get('type') == 'Travel' and activity.get('start_point_lat') is not None and activity.get('end_point_lat') is not None:
-                        map_data.append({'lat': float(activity['start_point_lat']), 'lon': float(activity['start_point_lon']), 'popupText': f"Start: {activity.get('start_point_location', '')}", 'activityId': f"{activity_id}-start", 'type': 'Travel', 'dayIndex': day_index})
-                        map_data.append({'lat': float(activity['end_point_lat']), 'lon': float(activity['end_point_lon']), 'popupText': f"End: {activity.get('end_point_location', '')}", 'activityId': f"{activity_id}-end", 'type': 'Travel', 'dayIndex': day_index})
-                except (ValueError, TypeError, KeyError) as e:
-                    logger.error(f"Skipping map point for activity '{activity_id}' due to invalid data: {e}")
-        logger.debug(f"Finished building map_data. Total points: {len(map_data)}")
-
-    context = {
-        'form_data': {'city': city},
-        'itinerary_data': itinerary_data,
-        'itinerary_json': json.dumps(itinerary_data),
-        'map_points_json': json.dumps(map_data),
-        'error_message': error_message
-    }
-    return render(request, 'app/itinerary_result.html', context)
+    # Legs without a road route (itineraries stored before server-side
+    # routing, or generated while the service was down) are routed here;
+    # itinerary_data_view does the same for the map.
+    with stage('routing'):
+        await add_routes(itinerary_data, wait=render_wait())
+    data_url = itinerary_data_url(itinerary) if itinerary is not None else None
+    with stage('serialise'):
+        itinerary_json = None if data_url else dumps_itinerary(itinerary_data)
+    with stage('template'):
+        context = {
+            'form_data': {'city': city},
+            'itinerary_data': itinerary_data,
+            'itinerary_json': itinerary_json,
+            'data_url': data_url,
+            'day_fragments': await cached_day_fragments(itinerary_data),
+            'error_message': error_message,
+            'stream_url': stream_url,
+            'permalink': _permalink(itinerary),
+            'regenerate_url': reverse('regenerate_itinerary', args=[itinerary.public_id]) if itinerary else None,
+        }
+        return render(request, 'app/itinerary_result.html', context)
+
+
+def _permalink(itinerary):
+    return itinerary.get_absolute_url() if itinerary is not None else None
+
+
+def _stream_form_data(request):
+    return {key: request.POST.getlist(key) for key in request.POST if key != 'csrfmiddlewaretoken'}
 
 
 async def generate_itinerary_view(request):
     if request.method == 'POST':
         form = ItineraryForm(request.POST)
-        if form.is_valid():
+        with stage('form'):
+            form_valid = form.is_valid()
+        if form_valid:
             cleaned_data = form.cleaned_data
             city = cleaned_data['city']
-            start_date_obj = cleaned_data['start_date']
-            start_time_str = cleaned_data['start_time']
-            end_date_obj = cleaned_data['end_date']
-            ending_point = cleaned_data.get('ending_point', 'a major departure hub')
-            duration_days = (end_date_obj - start_date_obj).days + 1
             itinerary_generated_data = []
             error_message = None
 
-            prompt = f"""
-            Generate a detailed travel itinerary for a {duration_days}-day trip to {city}.
-            The traveler is a {cleaned_data['traveler_type']} with a {cleaned_data['budget']} budget.
-            Their interests are: {", ".join(cleaned_data['interests']) if cleaned_data['interests'] else "General sightseeing"}.
-            The trip starts on {start_date_obj.strftime('%Y-%m-%d')} at {start_time_str} and ends on {end_date_obj.strftime('%Y-%m-%d')} at {cleaned_data['end_time']}.
-            The user must end up at {ending_point}.
-            Don't spend too much time in each place, dont spend more than 1 hour in each place unless absolutely necessary.
-            time spent at each place need not be in factors of an hour, it can be 45 mins, 30 mins, 20 mins etc.
-            You can visit places until 9 PM, only exceed this time if absolutely necessary.
-            All Cost Should be in the Local currency of the Country.
-            If the user gives a starting point, then always start the itinerary from the starting point.
-            If the user gives an ending point, then always end the itinerary at the ending point.
-            
-
-            **DESCRIPTION FORMAT RULES**:
-            - Every activity description must be **concise, 3–4 bullet points only**.
-            - Write them like checklist items (e.g., "- Explore temple", "- Take photos").
-            - Do NOT write paragraphs, long explanations, or guides. Keep it short and practical.
-
-            **CRITICAL INSTRUCTION**: For every single activity, whether it is a 'Visit' or a 'Travel' type, you MUST provide precise latitude and longitude coordinates. This is a mandatory requirement.
-            - For 'Visit' activities, you MUST populate the `latitude` and `longitude` fields.
-            - For 'Travel' activities, you MUST populate all four coordinate fields: `start_point_lat`, `start_point_lon`, `end_point_lat`, and `end_point_lon`.
-            Do not leave any of these coordinate fields empty, null, or 0 unless the location is a general area that cannot be mapped. The response is not useful without these coordinates.
-            """
-
-            payload = {
-                "contents": [{"role": "user", "parts": [{"text": prompt}]}],
-                "generationConfig": {
-                    "responseMimeType": "application/json",
-                    "responseSchema": {
-                        "type": "ARRAY",
-                        "items": {
-                            "type": "OBJECT",
-                            "properties": {
-                                "day": {"type": "STRING"},
-                                "date": {"type": "STRING"},
-                                "activities": {
-                                    "type": "ARRAY",
-                                    "items": {
-                                        "type": "OBJECT",
-                                        "properties": {
-                                            "id": {"type": "STRING"},
-                                            "type": {"type": "STRING", "enum": ["Visit", "Travel"]},
-                                            "time_slot": {"type": "STRING"},
-                                            "description": {"type": "STRING"},
-                                            "location_name": {"type": "STRING"},
-                                            "latitude": {"type": "NUMBER"},
-                                            "longitude": {"type": "NUMBER"},
-                                            "cost_estimate": {"type": "STRING"},
-                                            "transport_mode_details": {"type": "STRING"},
-                                            "start_point_location": {"type": "STRING"},
-                                            "end_point_location": {"type": "STRING"},
-                                            "start_point_lat": {"type": "NUMBER"},
-                                            "start_point_lon": {"type": "NUMBER"},
-                                            "end_point_lat": {"type": "NUMBER"},
-                                            "end_point_lon": {"type": "NUMBER"}
-                                        },
-                                        "required": ["id", "type", "time_slot", "description"]
-                                    }
-                                }
-                            },
-                            "required": ["day", "date", "activities"]
-                        }
-                    }
-                }
-            }
-            
+            if jobs_enabled() or getattr(settings, 'ITINERARY_STREAMING', False):
+                cache_key = itinerary_request_key(cleaned_data)
+                cached_itinerary = await get_itinerary_cache().aget(cache_key)
+                if cached_itinerary is None:
+                    cached_itinerary = await reuse_similar_itinerary(cleaned_data, cache_key)
+                if cached_itinerary is not None:
+                    stored = await get_or_save_itinerary(cache_key, cleaned_data, cached_itinerary)
+                    return await _render_itinerary_page(request, cached_itinerary, city, itinerary=stored)
+
+            if jobs_enabled():
+                return await _enqueue_itinerary_job(request, cleaned_data)
+
+            if getattr(settings, 'ITINERARY_STREAMING', False):
+                # Render the page shell now; the browser fetches the days over SSE.
+                token = signing.dumps(_stream_form_data(request), salt=STREAM_TOKEN_SALT)
+                stream_url = f"{reverse('stream_itinerary')}?{urlencode({'t': token})}"
+                return await _render_itinerary_page(request, [], city, stream_url=stream_url)
+
+            stored = None
             try:
-                logger.debug(f"Sending payload to Gemini: {json.dumps(payload, indent=2)}")
-                async with httpx.AsyncClient(timeout=90.0) as client:
-                    response = await client.post(
-                        f"{GEMINI_API_URL}?key={GEMINI_API_KEY}",
-                        json=payload
-                    )
-                    response.raise_for_status()
-
-                response_data = response.json()
-                itinerary_generated_data = json.loads(response_data['candidates'][0]['content']['parts'][0]['text'])
-
-                # --- GOOGLE MAPS URL GENERATION ---
-                for day_plan in itinerary_generated_data:
-                    locations = []
-                    for activity in day_plan.get('activities', []):
-                        location_coords = None
-                        
-                        if activity.get('type') == 'Visit' and activity.get('latitude') is not None:
-                            location_coords = f"{activity['latitude']},{activity['longitude']}"
-                        
-                        elif activity.get('type') == 'Travel' and activity.get('end_point_lat') is not None:
-                            location_coords = f"{activity['end_point_lat']},{activity['end_point_lon']}"
-
-                        if location_coords and (not locations or locations[-1] != location_coords):
-                            locations.append(location_coords)
-                    
-                    logger.debug(f"Day '{day_plan.get('day')}': Found {len(locations)} unique locations for Maps URL.")
-                    
-                    if len(locations) > 1:
-                        base_url = "https://www.google.com/maps/dir/"
-                        day_plan['google_maps_url'] = base_url + "/".join(locations)
-                    else:
-                        day_plan['google_maps_url'] = None
-
-            except httpx.HTTPStatusError as e:
-                logger.error(f"HTTP error from Gemini API: {e.response.status_code}")
-                logger.error(f"Gemini's exact error message: {e.response.text}")
-                error_message = f"Gemini API returned an error ({e.response.status_code}). Please check the server logs."
-            except (json.JSONDecodeError, KeyError):
-                logger.error("Failed to decode or parse JSON from Gemini's response.", exc_info=True)
-                error_message = "The model's response was not valid or had an unexpected structure. Please try again."
+                itinerary_generated_data, stored, _ = await get_or_generate_itinerary(cleaned_data)
             except Exception as e:
-                logger.error(f"An unexpected error occurred: {e}", exc_info=True)
-                error_message = f"An unexpected error occurred: {e}"
+                error_message = describe_error(e)
 
-            return _render_itinerary_page(request, itinerary_generated_data, city, error_message)
+            return await _render_itinerary_page(request, itinerary_generated_data, city, error_message, itinerary=stored)
         else:
             logger.warning(f"Form validation failed. Errors: {form.errors.as_json()}")
             return render(request, 'app/itinerary_form.html', {'form': form})
     else:
         form = ItineraryForm()
-        return render(request, 'app/itinerary_form.html', {'form': form})
\ No newline at end of file
+        return render(request, 'app/itinerary_form.html', {'form': form})
+
+
+def _wants_json(request):
+    return 'application/json' in request.headers.get('Accept', '')
+
+
+def _job_payload(job, queue_position=None):
+    payload = {
+        'id': str(job.public_id),
+        'status': job.status,
+        'status_url': job.get_absolute_url(),
+        'result_url': None,
+        'error': job.error or None,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if queue_position is not None:
+        payload['queue_position'] = queue_position
+    return payload
+
+
+async def _enqueue_itinerary_job(request, cleaned_data):
+    """
+    Queue the generation and answer at once: 202 with the job for API
+    clients, or a page that polls the job status for browsers.
+    """
+    try:
+        job = await enqueue_job(cleaned_data)
+    except QueueFull as e:
+        logger.warning(str(e))
+        error_message = "We're generating a lot of itineraries right now. Please try again in a minute."
+        if _wants_json(request):
+            return JsonResponse({'error': error_message}, status=503, headers={'Retry-After': '60'})
+        return render(
+            request, 'app/itinerary_pending.html', {'city': cleaned_data['city'], 'error_message': error_message},
+            status=503, headers={'Retry-After': '60'},
+        )
+
+    if _wants_json(request):
+        return JsonResponse(_job_payload(job), status=202)
+    return render(request, 'app/itinerary_pending.html', {'city': cleaned_data['city'], 'job': _job_payload(job)})
+
+
+async def job_status_view(request, public_id):
+    """
+    Lightweight status/result endpoint for a queued generation. Pass
+    ?include=itinerary to get the finished itinerary inline.
+    """
+    job = await GenerationJob.objects.select_related('itinerary').filter(public_id=public_id).afirst()
+    if job is None:
+        raise Http404("No such itinerary job.")
+
+    queue_position = None
+    if job.status == GenerationJob.Status.QUEUED:
+        queue_position = await GenerationJob.objects.filter(
+            Q(priority__lt=job.priority) | Q(priority=job.priority, created_at__lt=job.created_at),
+            status=GenerationJob.Status.QUEUED,
+        ).acount()
+    payload = _job_payload(job, queue_position)
+    if job.itinerary is not None:
+        payload['result_url'] = job.itinerary.get_absolute_url()
+        if request.GET.get('include') == 'itinerary':
+            payload['itinerary'] = job.itinerary.itinerary_data
+    return JsonResponse(payload)
+
+
+def _bearer_authorised(request, token):
+    return bool(token) and constant_time_compare(request.headers.get('Authorization', ''), f"Bearer {token}")
+
+
+def _batch_authorised(request):
+    return _bearer_authorised(request, getattr(settings, 'ITINERARY_BATCH', {}).get('API_TOKEN'))
+
+
+def _batch_specs(request):
+    """
+    Specs from a JSON body ({"name": ..., "items": [...]}) or a raw CSV/JSONL
+    body. Returns (specs, name, retry_failed).
+    """
+    body = request.body.decode('utf-8')
+    if request.content_type == 'application/json':
+        data = json.loads(body or '{}')
+        if not isinstance(data, dict) or not isinstance(data.get('items'), list):
+            raise BatchError("Expected a JSON object with an 'items' list.")
+        specs = parse_specs('\n'.join(json.dumps(item) for item in data['items']), 'jsonl')
+        return specs, str(data.get('name') or ''), bool(data.get('retry_failed'))
+    fmt = 'csv' if request.content_type == 'text/csv' else 'jsonl' if 'ndjson' in request.content_type else None
+    return parse_specs(body, fmt), request.GET.get('name', ''), request.GET.get('retry_failed') == '1'
+
+
+@csrf_exempt
+async def batch_create_view(request):
+    """
+    Queue a batch of itinerary requests for the worker pool. Requires
+    `Authorization: Bearer <ITINERARY_BATCH['API_TOKEN']>`.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    if not _batch_authorised(request):
+        return JsonResponse({'error': "A valid batch API token is required."}, status=403)
+    try:
+        specs, name, retry = _batch_specs(request)
+        batch, created = await sync_to_async(create_batch)(specs, name)
+    except (BatchError, ValueError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if retry and not created:
+        await sync_to_async(retry_failed)(batch)
+    payload = await sync_to_async(batch_payload)(batch)
+    payload['created'] = created
+    return JsonResponse(payload, status=202 if created else 200)
+
+
+async def batch_status_view(request, public_id):
+    """
+    Progress of a batch; ?include=items adds every item's status and result.
+    """
+    if not _batch_authorised(request):
+        return JsonResponse({'error': "A valid batch API token is required."}, status=403)
+    batch = await GenerationBatch.objects.filter(public_id=public_id).afirst()
+    if batch is None:
+        raise Http404("No such itinerary batch.")
+    payload = await sync_to_async(batch_payload)(batch, request.GET.get('include') == 'items')
+    return JsonResponse(payload)
+
+
+async def _stored_itinerary(public_id):
+    """
+    The stored itinerary without its (large) JSON columns, which are only
+    loaded when a response has to be built.
+    """
+    itinerary = await Itinerary.objects.filter(public_id=public_id).defer('itinerary_data', 'request_data').afirst()
+    if itinerary is None:
+        raise Http404("No itinerary found for this link.")
+    return itinerary
+
+
+async def _precompressed_response(request, itinerary, kind, content_type, build):
+    """
+    304 when the client's copy is current; otherwise the body from the
+    precompressed cache (rendered and compressed once per edit), with the
+    ETag and Last-Modified a browser needs to revalidate it.
+    """
+    etag = itinerary_etag(itinerary, kind)
+    last_modified = int(itinerary.updated_at.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        encoding = negotiate(request)
+        body = await precompressed(etag, encoding, build)
+        response = HttpResponse(body, content_type=content_type)
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+async def itinerary_detail_view(request, public_id):
+    """
+    Permalink for a stored itinerary. Renders from the database only, once
+    per edit; repeat views are served precompressed or answered with 304.
+    """
+    itinerary = await _stored_itinerary(public_id)
+
+    async def build():
+        await itinerary.arefresh_from_db(fields=['itinerary_data'])
+        response = await _render_itinerary_page(request, itinerary.itinerary_data, itinerary.city, itinerary=itinerary)
+        return response.content
+
+    response = await _precompressed_response(request, itinerary, 'page', 'text/html; charset=utf-8', build)
+    # The page is shared by every visitor, so the regenerate form takes its
+    # CSRF token from the cookie; make sure this browser has one.
+    get_token(request)
+    # Always revalidate: a deploy can change the page for the same itinerary.
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+async def itinerary_data_view(request, public_id):
+    """
+    The itinerary JSON the result page's map is drawn from. Requests for the
+    current version (?v=, see pages.itinerary_data_url) may be cached forever.
+    """
+    itinerary = await _stored_itinerary(public_id)
+
+    async def build():
+        await itinerary.arefresh_from_db(fields=['itinerary_data'])
+        # The same routing step as the page, so the map and the timeline agree.
+        with stage('routing'):
+            await add_routes(itinerary.itinerary_data, wait=render_wait())
+        with stage('serialise'):
+            return dumps_itinerary(itinerary.itinerary_data).encode('utf-8')
+
+    response = await _precompressed_response(request, itinerary, 'data', 'application/json', build)
+    if request.GET.get('v') == itinerary_data_url(itinerary).rsplit('=', 1)[1]:
+        patch_cache_control(response, public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _edit_params(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except json.JSONDecodeError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+async def regenerate_itinerary_view(request, public_id):
+    """
+    Regenerate one day (`day_index`, 0-based) or one Visit (`activity_id`) of
+    a stored itinerary and save the result as a new itinerary with its own
+    permalink; the original is never changed. JSON clients get the new day,
+    its rendered fragments and the new permalink; browsers are redirected
+    there. CSRF-protected like the form: JSON clients send the csrftoken
+    cookie (set by any itinerary page) back in an X-CSRFToken header.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    itinerary = await Itinerary.objects.filter(public_id=public_id).afirst()
+    if itinerary is None:
+        raise Http404("No itinerary found for this link.")
+    params = _edit_params(request) or {}
+    activity_id = params.get('activity_id')
+    try:
+        day_index = None if activity_id else int(params.get('day_index'))
+    except (TypeError, ValueError):
+        return HttpResponseBadRequest("Pass a day_index or an activity_id to regenerate.")
+    try:
+        cleaned_data = clean_request_data(itinerary.request_data)
+    except ValueError:
+        return JsonResponse({'error': "This itinerary was stored without its request and can't be edited."}, status=400)
+
+    try:
+        if activity_id:
+            itinerary_data, day_index = await regenerate_activity(cleaned_data, itinerary.itinerary_data, str(activity_id))
+        else:
+            itinerary_data, day_index = await regenerate_day(cleaned_data, itinerary.itinerary_data, day_index)
+        edit = await save_edit(itinerary, itinerary_data)
+    except RegenerationError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': describe_error(e)}, status=502)
+
+    if not _wants_json(request):
+        return redirect(edit.get_absolute_url())
+    payload = render_day_fragments(itinerary_data[day_index], day_index)
+    payload['permalink'] = edit.get_absolute_url()
+    return JsonResponse(payload)
+
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _stream_itinerary_events(cleaned_data):
+    """
+    Yield SSE events for each day as soon as Gemini finishes writing it. Falls
+    back to the buffered generateContent call if streaming fails before any
+    day has been sent.
+    """
+    itinerary_cache = get_itinerary_cache()
+    cache_key = itinerary_request_key(cleaned_data)
+    itinerary_generated_data = await itinerary_cache.aget(cache_key)
+
+    if itinerary_generated_data is None:
+        # An identical request is already generating: replay its result.
+        try:
+            shared, itinerary_generated_data = await itinerary_flights.join(cache_key)
+        except Exception as e:
+            yield _sse_event('error', {'message': describe_error(e)})
+            return
+        if not shared:
+            itinerary_generated_data = None
+
+    if itinerary_generated_data is None:
+        itinerary_generated_data = []
+        with itinerary_flights.track(cache_key) as flight:
+            try:
+                async for day_plan in iter_generated_days(cleaned_data):
+                    # Validated day by day so each day is sent as soon as it is
+                    # ready: one geocoding follow-up batched across days would
+                    # hold every day back until the last is written. A streamed
+                    # trip therefore makes up to one follow-up per day (none
+                    # for days whose points all check out); the buffered path
+                    # makes one for the whole trip.
+                    with stage('validate'):
+                        await validate_locations([day_plan], cleaned_data['city'])
+                    day_plan = finish_day(day_plan)
+                    with stage('routing'):
+                        await add_routes([day_plan])
+                    itinerary_generated_data.append(day_plan)
+                    with stage('template'):
+                        event = _sse_event('day', render_day_fragments(day_plan, len(itinerary_generated_data) - 1))
+                    yield event
+            except Exception as e:
+                if itinerary_generated_data:
+                    yield _sse_event('error', {'message': describe_error(e)})
+                    return
+                logger.warning(f"Streaming generation failed ({e}); falling back to a buffered request.")
+                try:
+                    itinerary_generated_data = await generate_itinerary(cleaned_data)
+                except Exception as e:
+                    yield _sse_event('error', {'message': describe_error(e)})
+                    return
+                for day_index, day_plan in enumerate(itinerary_generated_data):
+                    yield _sse_event('day', render_day_fragments(day_plan, day_index))
+            await itinerary_cache.aset(cache_key, itinerary_generated_data)
+            stored = await get_or_save_itinerary(cache_key, cleaned_data, itinerary_generated_data)
+            flight.set_result(itinerary_generated_data)
+    else:
+        stored = await get_or_save_itinerary(cache_key, cleaned_data, itinerary_generated_data)
+        for day_index, day_plan in enumerate(itinerary_generated_data):
+            yield _sse_event('day', render_day_fragments(day_plan, day_index))
+
+    yield _sse_event('done', {'days': len(itinerary_generated_data), 'permalink': _permalink(stored)})
+
+
+async def stream_itinerary_view(request):
+    """
+    Server-sent event stream for a form submission signed by
+    generate_itinerary_view.
+    """
+    try:
+        form_data = signing.loads(request.GET.get('t', ''), salt=STREAM_TOKEN_SALT, max_age=STREAM_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return HttpResponseBadRequest("Invalid or expired itinerary stream token.")
+
+    data = MultiValueDict(form_data)
+    form = ItineraryForm(data)
+    if not form.is_valid():
+        return HttpResponseBadRequest("Invalid itinerary request.")
+
+    response = StreamingHttpResponse(_stream_itinerary_events(form.cleaned_data), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def metrics_view(request):
+    """
+    Prometheus text exposition of this process's pipeline metrics, when
+    METRICS['ENABLED']. Requires `Authorization: Bearer <METRICS['TOKEN']>`
+    when a token is configured.
+    """
+    config = getattr(settings, 'METRICS', {})
+    if not config.get('ENABLED', False):
+        raise Http404("Metrics are disabled.")
+    if config.get('TOKEN') and not _bearer_authorised(request, config['TOKEN']):
+        return HttpResponse("A valid metrics token is required.", status=403, content_type='text/plain')
+    body = await sync_to_async(render_metrics)()
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,168 @@
+# taramgo/benchmarks/bench_database.py
+"""
+Concurrent itinerary writes and lookups through the async ORM, the way the
+views issue them: every operation is its own "request" with its own ORM
+thread (asgiref ThreadSensitiveContext, as under the ASGI handler) and
+closes its connection when done. Each backend runs in a fresh process:
+SQLite with Django's defaults (rollback journal, deferred transactions),
+SQLite as configured in settings (WAL), and, given --postgres, Postgres
+with a new connection per request and with the settings' psycopg pool.
+Reports operations/s, latency percentiles and failed operations.
+
+    python -m benchmarks.bench_database --operations 2000 --concurrency 32
+    python -m benchmarks.bench_database --postgres postgres://postgres@127.0.0.1:5432/postgres
+"""
+
+import argparse
+import asyncio
+import datetime
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.fixtures import realistic_itinerary
+
+CITIES = ('Paris', 'Kyoto', 'Lisbon', 'New York')
+
+
+def _percentile(samples, percent):
+    samples = sorted(samples)
+    return samples[max(0, int(len(samples) * percent / 100 + 0.5) - 1)]
+
+
+def _cleaned_data(index):
+    start = datetime.date(2026, 11, 2) + datetime.timedelta(days=index % 300)
+    return {
+        'city': CITIES[index % len(CITIES)], 'start_date': start, 'end_date': start + datetime.timedelta(days=2),
+        'start_time': '09:00', 'end_time': '18:00', 'budget': 'mid', 'traveler_type': 'couple',
+        'interests': ['art', 'history'],
+    }
+
+
+async def workload(operations, concurrency, read_fraction, stops, seed):
+    from asgiref.sync import ThreadSensitiveContext, sync_to_async
+    from django.db import close_old_connections
+
+    from app.store import find_itinerary, get_or_save_itinerary
+
+    rng = random.Random(seed)
+    itineraries = {city: realistic_itinerary(city, 3, stops) for city in CITIES}
+    plan = [rng.random() < read_fraction for _ in range(operations)]
+    written, failures, latencies = [], [], []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index, is_read):
+        async with semaphore, ThreadSensitiveContext():
+            started = time.perf_counter()
+            try:
+                if is_read and written:
+                    await find_itinerary(rng.choice(written))
+                else:
+                    request_hash = f"{index:064x}"
+                    cleaned_data = _cleaned_data(index)
+                    stored = await get_or_save_itinerary(
+                        request_hash, cleaned_data, itineraries[cleaned_data['city']],
+                    )
+                    if stored is None:
+                        raise RuntimeError("not stored")
+                    written.append(request_hash)
+            except Exception as e:
+                failures.append(type(e).__name__)
+            finally:
+                # What the request_finished signal does after every request.
+                await sync_to_async(close_old_connections)()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index, is_read) for index, is_read in enumerate(plan)))
+    wall = time.perf_counter() - started
+    return {
+        'operations_per_s': operations / wall,
+        'writes': operations - sum(plan),
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p95_ms': _percentile(latencies, 95) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+        'failures': len(failures),
+    }
+
+
+def _run_backend(connection, scenario, options):
+    """
+    Child process: configure Django for one scenario and run the workload.
+    """
+    import logging
+
+    workdir = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = options['postgres'] if scenario.startswith('postgres') else \
+        f"sqlite:///{os.path.join(workdir.name, 'bench.sqlite3')}"
+    os.environ.setdefault('GEMINI_API_KEY', 'bench')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taramgo.settings')
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.db import connection as db_connection
+    from django.test.utils import setup_databases, teardown_databases
+
+    # Failed operations are counted, not logged one by one.
+    logging.getLogger('app.store').setLevel(logging.CRITICAL)
+    database = settings.DATABASES['default']
+    if scenario == 'sqlite-defaults':
+        database['OPTIONS'] = {}
+    elif scenario == 'postgres-unpooled':
+        database.get('OPTIONS', {}).pop('pool', None)
+    if database['ENGINE'].endswith('sqlite3'):
+        database['TEST']['NAME'] = os.path.join(workdir.name, 'test_bench.sqlite3')
+    databases = setup_databases(verbosity=0, interactive=False)
+    try:
+        with db_connection.cursor() as cursor:
+            journal = cursor.execute('PRAGMA journal_mode').fetchone()[0] if db_connection.vendor == 'sqlite' else '-'
+        result = asyncio.run(workload(
+            options['operations'], options['concurrency'], options['read_fraction'], options['stops'], options['seed'],
+        ))
+        result['journal'] = journal
+    finally:
+        db_connection.close()
+        if 'pool' in database.get('OPTIONS', {}):
+            db_connection.close_pool()
+        teardown_databases(databases, verbosity=0)
+        workdir.cleanup()
+    connection.send(result)
+
+
+def run_scenario(scenario, options):
+    context = multiprocessing.get_context('spawn')
+    parent, child = context.Pipe()
+    process = context.Process(target=_run_backend, args=(child, scenario, options))
+    process.start()
+    result = parent.recv()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--operations', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--read-fraction', type=float, default=0.5, help="Share of operations that are lookups.")
+    parser.add_argument('--stops', type=int, default=8, help="Visits per day in the stored itineraries.")
+    parser.add_argument('--postgres', help="Database URL of a Postgres server to include.")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    scenarios = ['sqlite-defaults', 'sqlite-settings']
+    if args.postgres:
+        scenarios += ['postgres-unpooled', 'postgres-settings']
+    print(f"{args.operations} operations, {args.read_fraction:.0%} lookups, concurrency {args.concurrency}")
+    print(f"{'backend':<20} {'journal':<8} {'ops/s':>8} {'writes/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'failed':>7}")
+    for scenario in scenarios:
+        result = run_scenario(scenario, vars(args))
+        writes_per_s = result['operations_per_s'] * result['writes'] / args.operations
+        print(f"{scenario:<20} {result['journal']:<8} {result['operations_per_s']:8.0f} {writes_per_s:9.0f} "
+              f"{result['p50_ms']:8.1f} {result['p95_ms']:8.1f} {result['p99_ms']:8.1f} {result['failures']:7d}")
+
+
+if __name__ == '__main__':
+    main()
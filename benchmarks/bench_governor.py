@@ -0,0 +1,95 @@
+# taramgo/benchmarks/bench_governor.py
+"""
+Burst of concurrent Gemini calls against a stub that enforces a quota (429
+above --quota requests at once), with and without the upstream governor.
+
+    python -m benchmarks.bench_governor --requests 300 --concurrency 100 --quota 8
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.stub_gemini import run_stub_server
+
+
+async def _burst(call, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = {}
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await call()
+            except Exception as e:
+                name = type(e).__name__
+                failures[name] = failures.get(name, 0) + 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies, failures, time.perf_counter() - started
+
+
+def _report(label, handler, latencies, failures, wall, extra=''):
+    latencies = sorted(latencies)
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)] if latencies else 0.0
+    p50 = statistics.median(latencies) if latencies else 0.0
+    print(f"{label:<10} ok {len(latencies):4d}  failed {sum(failures.values()):4d}  "
+          f"upstream 429s {handler.throttled:5d}  {len(latencies) / wall:6.1f} ok/s  "
+          f"p50 {p50 * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms {extra}")
+    if failures:
+        print(f"{'':<10} failures: {failures}")
+
+
+async def bench(handler, requests, concurrency):
+    from app import gemini
+    from app.conf import gemini_model
+    from app.governor import UpstreamGovernor
+
+    payload = {'contents': [{'role': 'user', 'parts': [{'text': 'benchmark'}]}]}
+    model_name = gemini_model()
+    await gemini._post(payload, model_name)
+
+    handler.throttled = 0
+    latencies, failures, wall = await _burst(
+        lambda: gemini._post(payload, model_name), requests, concurrency,
+    )
+    _report('ungoverned', handler, latencies, failures, wall)
+
+    handler.throttled = 0
+    governor = UpstreamGovernor(initial_concurrency=16, max_queue=requests, queue_timeout=120, backoff_base=0.05)
+    latencies, failures, wall = await _burst(
+        lambda: governor.call(lambda: gemini._post(payload, model_name)), requests, concurrency,
+    )
+    _report('governed', handler, latencies, failures, wall, f" final limit {int(governor.limit)}")
+    await gemini.aclose_clients()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--quota', type=int, default=8, help="Concurrent requests the stub accepts.")
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    with run_stub_server(latency=args.latency, max_concurrency=args.quota, with_handler=True) as (base_url, handler):
+        os.environ['GEMINI_API_BASE'] = base_url
+        os.environ.setdefault('GEMINI_API_KEY', 'bench')
+        os.environ.setdefault('GEMINI_HTTP2', 'false')
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taramgo.settings')
+        import django
+        django.setup()
+        print(f"{args.requests} requests, offered concurrency {args.concurrency}, "
+              f"upstream quota {args.quota} concurrent, {args.latency * 1000:.0f} ms latency")
+        asyncio.run(bench(handler, args.requests, args.concurrency))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# taramgo/benchmarks/bench_hedging.py
+"""
+Tail latency of Gemini calls against a stub where --slow-fraction of requests
+take --slow-latency seconds, with and without hedged requests.
+
+    python -m benchmarks.bench_hedging --requests 400 --slow-fraction 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.stub_gemini import run_stub_server
+
+
+def _percentile(samples, percent):
+    samples = sorted(samples)
+    return samples[max(0, int(len(samples) * percent / 100) - 1)]
+
+
+async def _run(call, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            samples.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return samples
+
+
+async def bench(handler, requests, concurrency, budget):
+    from app import gemini
+    from app.conf import gemini_model
+    from app.hedging import Hedger, deadline
+
+    payload = {'contents': [{'role': 'user', 'parts': [{'text': 'benchmark'}]}]}
+    model_name = gemini_model()
+
+    async def plain():
+        await gemini._governed_post(payload, model_name)
+
+    hedger = Hedger(budget=budget, hedge_min_delay=0.01, hedge_initial_delay=1.0, min_samples=20)
+
+    async def hedged():
+        with deadline(budget):
+            await hedger.call(lambda model: gemini._governed_post(payload, model), model_name)
+
+    for label, call in (('single request', plain), ('hedged', hedged)):
+        handler.served = 0
+        samples = await _run(call, requests, concurrency)
+        print(f"{label:<16} p50 {_percentile(samples, 50) * 1000:7.1f} ms  p95 {_percentile(samples, 95) * 1000:7.1f} ms  "
+              f"p99 {_percentile(samples, 99) * 1000:7.1f} ms  max {max(samples) * 1000:7.1f} ms  "
+              f"upstream requests {handler.served}")
+    print(f"hedger: {hedger.stats()}")
+    await gemini.aclose_clients()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--slow-fraction', type=float, default=0.05)
+    parser.add_argument('--slow-latency', type=float, default=1.0)
+    parser.add_argument('--budget', type=float, default=10.0)
+    args = parser.parse_args()
+
+    with run_stub_server(latency=args.latency, slow_fraction=args.slow_fraction, slow_latency=args.slow_latency,
+                         with_handler=True) as (base_url, handler):
+        os.environ['GEMINI_API_BASE'] = base_url
+        os.environ.setdefault('GEMINI_API_KEY', 'bench')
+        os.environ.setdefault('GEMINI_HTTP2', 'false')
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taramgo.settings')
+        import django
+        django.setup()
+        print(f"{args.requests} requests, concurrency {args.concurrency}, {args.latency * 1000:.0f} ms typical, "
+              f"{args.slow_fraction:.0%} take {args.slow_latency * 1000:.0f} ms")
+        asyncio.run(bench(handler, args.requests, args.concurrency, args.budget))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# taramgo/benchmarks/bench_http_client.py
+"""
+Per-request overhead of a fresh httpx.AsyncClient per call (the old
+behaviour of generate_itinerary_view) versus the pooled client from
+app.gemini, measured against the local stub server.
+
+    python -m benchmarks.bench_http_client --requests 200 --concurrency 10
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.stub_gemini import run_stub_server
+
+
+def _summary(label, samples, wall):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<24} p50 {statistics.median(samples) * 1000:7.2f} ms   "
+          f"p95 {p95 * 1000:7.2f} ms   {len(samples) / wall:8.1f} req/s")
+
+
+async def _run(call, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return samples, time.perf_counter() - started
+
+
+async def bench(requests, concurrency):
+    import httpx
+    from app import gemini
+
+    payload = {'contents': [{'role': 'user', 'parts': [{'text': 'benchmark'}]}]}
+
+    async def fresh_client():
+        async with httpx.AsyncClient(timeout=90.0) as client:
+            response = await client.post(gemini.model_url(), params={'key': 'bench'}, json=payload)
+            response.raise_for_status()
+            response.json()
+
+    async def pooled_client():
+        await gemini.generate_content(payload)
+
+    # Warm up both paths so imports and the first pool connection are excluded.
+    await fresh_client()
+    await pooled_client()
+
+    for label, call in (('fresh client / request', fresh_client), ('pooled client', pooled_client)):
+        samples, wall = await _run(call, requests, concurrency)
+        _summary(label, samples, wall)
+    await gemini.aclose_clients()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=10)
+    args = parser.parse_args()
+
+    with run_stub_server() as base_url:
+        os.environ['GEMINI_API_BASE'] = base_url
+        os.environ.setdefault('GEMINI_API_KEY', 'bench')
+        os.environ.setdefault('GEMINI_HTTP2', 'false')
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taramgo.settings')
+        import django
+        django.setup()
+        print(f"{args.requests} requests, concurrency {args.concurrency}, stub at {base_url}")
+        asyncio.run(bench(args.requests, args.concurrency))
+
+
+if __name__ == '__main__':
+    main()
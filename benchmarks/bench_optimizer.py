@@ -0,0 +1,78 @@
+# taramgo/benchmarks/bench_optimizer.py
+"""
+Time the per-day stop-order optimizer (app.optimizer) on random city days
+of increasing size, and how much it shortens a randomly ordered day.
+
+    python -m benchmarks.bench_optimizer --stops 10 25 50 100
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+import numpy as np
+
+
+def random_day(stops, rng, centre=(48.8566, 2.3522), spread=0.05):
+    activities = []
+    clock = 9 * 60
+    for index in range(stops):
+        lat, lon = centre[0] + rng.uniform(-spread, spread), centre[1] + rng.uniform(-spread, spread)
+        if index:
+            activities.append({'id': f"t{index}", 'type': 'Travel', 'description': '- Walk',
+                               'time_slot': _slot(clock, clock + 15),
+                               'start_point_lat': activities[-1]['latitude'],
+                               'start_point_lon': activities[-1]['longitude'],
+                               'end_point_lat': lat, 'end_point_lon': lon})
+            clock += 15
+        activities.append({'id': f"v{index}", 'type': 'Visit', 'description': '- See', 'location_name': f"Stop {index}",
+                           'time_slot': _slot(clock, clock + 30), 'latitude': lat, 'longitude': lon})
+        clock += 30
+    return {'day': 'Day 1', 'date': '2026-11-01', 'activities': activities}
+
+
+def _slot(start, end):
+    from app.optimizer import format_time_slot
+    return format_time_slot(start, end)
+
+
+def bench(stop_counts, runs, seed):
+    from app.optimizer import distance_matrix, optimise_day, optimise_order
+
+    rng = np.random.default_rng(seed)
+    print(f"{'stops':>5}  {'order p50':>10}  {'order max':>10}  {'whole day p50':>13}  {'distance saved':>14}")
+    for stops in stop_counts:
+        order_times, day_times, savings = [], [], []
+        for _ in range(runs):
+            day = random_day(stops, rng)
+            points = [(a['latitude'], a['longitude']) for a in day['activities'] if a['type'] == 'Visit']
+
+            started = time.perf_counter()
+            _, original, optimised = optimise_order(distance_matrix(points))
+            order_times.append(time.perf_counter() - started)
+            savings.append(1 - optimised / original)
+
+            started = time.perf_counter()
+            optimise_day(day)
+            day_times.append(time.perf_counter() - started)
+        print(f"{stops:>5}  {statistics.median(order_times) * 1000:8.2f}ms  {max(order_times) * 1000:8.2f}ms  "
+              f"{statistics.median(day_times) * 1000:11.2f}ms  {statistics.mean(savings):13.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stops', type=int, nargs='+', default=[10, 25, 50, 100])
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ.setdefault('GEMINI_API_KEY', 'bench')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taramgo.settings')
+    import django
+    django.setup()
+    bench(args.stops, args.runs, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# taramgo/benchmarks/bench_pages.py
+"""
+Serve a stored itinerary's permalink page through the Django test client:
+the first (cold) view, a repeat view after the fragment and precompressed
+caches are filled, a revalidation that gets a 304, the data endpoint, and
+the vendored static assets the page links (collected into a temporary
+STATIC_ROOT). Reports time per request and bytes on the wire.
+
+    python -m benchmarks.bench_pages --days 7 --stops 10 --repeat 200
+"""
+
+import argparse
+import asyncio
+import datetime
+import os
+import re
+import statistics
+import tempfile
+import time
+
+from benchmarks.fixtures import collect_static, realistic_itinerary
+
+STATIC_LINK = re.compile(r'(?:href|src)="(/static/[^"]+)"')
+
+
+async def bench(days, stops, repeat):
+    from django.core.cache import caches
+    from django.test import AsyncClient
+
+    from app.models import Itinerary
+
+    caches['default'].clear()
+    itinerary_data = realistic_itinerary('Paris', days, stops)
+    itinerary = await Itinerary.objects.acreate(
+        request_hash='0' * 64, city='Paris', start_date=datetime.date(2026, 11, 2),
+        end_date=datetime.date(2026, 11, 2) + datetime.timedelta(days=days - 1), itinerary_data=itinerary_data,
+    )
+    client = AsyncClient()
+    url = itinerary.get_absolute_url()
+
+    async def timed(path, **headers):
+        started = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        return time.perf_counter() - started, response
+
+    # Warm the process (URL resolver, template loading) so "cold" means an
+    # itinerary that has not been viewed yet.
+    await client.get('/')
+    cold, response = await timed(url, **{'Accept-Encoding': 'gzip'})
+    etag = response['ETag']
+    plain_size = len((await client.get(url)).content)
+    print(f"page: {plain_size / 1024:.0f} KiB plain, {len(response.content) / 1024:.0f} KiB gzip; "
+          f"cold view {cold * 1000:.1f} ms")
+
+    cases = (
+        ('repeat view (gzip)', url, {'Accept-Encoding': 'gzip'}),
+        ('revalidation (304)', url, {'If-None-Match': etag}),
+    )
+    for label, path, headers in cases:
+        samples = []
+        for _ in range(repeat):
+            elapsed, response = await timed(path, **headers)
+            samples.append(elapsed)
+        print(f"{label:<20} p50 {statistics.median(samples) * 1000:6.2f} ms  status {response.status_code}  "
+              f"{len(response.content) / 1024:.1f} KiB")
+
+    data_url = f"{url}data.json"
+    elapsed, response = await timed(data_url, **{'Accept-Encoding': 'gzip'})
+    print(f"data endpoint        {elapsed * 1000:6.2f} ms cold  {len(response.content) / 1024:.1f} KiB gzip")
+
+    page = (await client.get(url)).content.decode('utf-8')
+    for path in STATIC_LINK.findall(page):
+        sizes = {}
+        for encoding in ('identity', 'gzip', 'br'):
+            response = await client.get(path, headers={'Accept-Encoding': encoding})
+            sizes[encoding] = len(response.content)
+        samples = []
+        for _ in range(repeat):
+            elapsed, response = await timed(path, **{'Accept-Encoding': 'br, gzip'})
+            samples.append(elapsed)
+        print(f"{path.rsplit('/', 1)[-1]:<36} p50 {statistics.median(samples) * 1000:5.2f} ms  "
+              + '  '.join(f"{encoding} {size / 1024:.1f} KiB" for encoding, size in sizes.items())
+              + f"  {response['Cache-Control']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--stops', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault('GEMINI_API_KEY', 'bench')
+    os.environ.setdefault('SECRET_KEY', 'bench')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taramgo.settings')
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.test.utils import setup_databases, teardown_databases
+
+    settings.ROUTING['ENABLED'] = False
+    # As in production: hashed asset URLs from the manifest, files served from
+    # STATIC_ROOT rather than looked up through the finders on each request.
+    settings.DEBUG = False
+    static_root = tempfile.TemporaryDirectory()
+    collect_static(static_root.name)
+    databases = setup_databases(verbosity=0, interactive=False)
+    try:
+        asyncio.run(bench(args.days, args.stops, args.repeat))
+    finally:
+        teardown_databases(databases, verbosity=0)
+        static_root.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+# taramgo/benchmarks/bench_postprocess.py
+"""
+Time post-processing of a generated itinerary on a synthetic trip, before
+and after app.records: once per generation (parse Gemini's text, validate,
+Maps URLs) and once per page view (map data and page JSON).
+
+    python -m benchmarks.bench_postprocess --days 30 --activities 20
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+
+def synthetic_itinerary(days, activities_per_day, seed, centre=(48.8566, 2.3522)):
+    rng = random.Random(seed)
+    itinerary = []
+    for day_index in range(days):
+        activities = []
+        for index in range(activities_per_day):
+            lat, lon = centre[0] + rng.uniform(-0.05, 0.05), centre[1] + rng.uniform(-0.05, 0.05)
+            activity_id = f"d{day_index + 1}-a{index}"
+            if index % 2:
+                previous = activities[-1]
+                activities.append({
+                    'id': activity_id, 'type': 'Travel', 'time_slot': '10:00 AM - 10:20 AM',
+                    'description': '- Take the metro', 'transport_mode_details': 'Metro line 1',
+                    'start_point_location': previous['location_name'], 'end_point_location': f"Stop {index}",
+                    'start_point_lat': previous['latitude'], 'start_point_lon': previous['longitude'],
+                    'end_point_lat': lat, 'end_point_lon': lon,
+                })
+            else:
+                activities.append({
+                    'id': activity_id, 'type': 'Visit', 'time_slot': '09:00 AM - 10:00 AM',
+                    'description': '- See the collection <and> the gardens & café', 'location_name': f"Stop {index}",
+                    'latitude': lat, 'longitude': lon, 'cost_estimate': 'EUR 15',
+                })
+        itinerary.append({'day': f"Day {day_index + 1}", 'date': f"2026-11-{day_index % 28 + 1:02d}",
+                          'activities': activities})
+    return itinerary
+
+
+def legacy_generate(text):
+    """
+    The Maps URL loop this replaced (run once, at generation time).
+    """
+    itinerary = json.loads(text)
+    for day_plan in itinerary:
+        locations = []
+        for activity in day_plan.get('activities', []):
+            location_coords = None
+            if activity.get('type') == 'Visit' and activity.get('latitude') is not None:
+                location_coords = f"{activity['latitude']},{activity['longitude']}"
+            elif activity.get('type') == 'Travel' and activity.get('end_point_lat') is not None:
+                location_coords = f"{activity['end_point_lat']},{activity['end_point_lon']}"
+            if location_coords and (not locations or locations[-1] != location_coords):
+                locations.append(location_coords)
+        day_plan['google_maps_url'] = "https://www.google.com/maps/dir/" + "/".join(locations) if len(locations) > 1 else None
+    return itinerary
+
+
+def legacy_render(itinerary):
+    """
+    The map points loop and the two json.dumps calls this replaced (run on
+    every page view).
+    """
+    map_data = []
+    for day_index, day_plan in enumerate(itinerary):
+        for activity in day_plan.get('activities', []):
+            activity_id = activity.get('id', 'No ID')
+            if activity.get('type') == 'Visit' and activity.get('latitude') is not None and activity.get('longitude') is not None:
+                map_data.append({'lat': float(activity['latitude']), 'lon': float(activity['longitude']),
+                                 'popupText': activity.get('location_name', ''), 'activityId': activity_id,
+                                 'type': 'Visit', 'dayIndex': day_index})
+            elif activity.get('type') == 'Travel' and activity.get('start_point_lat') is not None and activity.get('end_point_lat') is not None:
+                map_data.append({'lat': float(activity['start_point_lat']), 'lon': float(activity['start_point_lon']),
+                                 'popupText': f"Start: {activity.get('start_point_location', '')}",
+                                 'activityId': f"{activity_id}-start", 'type': 'Travel', 'dayIndex': day_index})
+                map_data.append({'lat': float(activity['end_point_lat']), 'lon': float(activity['end_point_lon']),
+                                 'popupText': f"End: {activity.get('end_point_location', '')}",
+                                 'activityId': f"{activity_id}-end", 'type': 'Travel', 'dayIndex': day_index})
+    return json.dumps(itinerary) + json.dumps(map_data)
+
+
+def generate(text):
+    from app.records import compile_day
+
+    return [compile_day(day_plan) for day_plan in json.loads(text)]
+
+
+def render(itinerary):
+    from app.records import dumps_itinerary
+
+    return dumps_itinerary(itinerary)
+
+
+def _time(func, value, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func(value)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--activities', type=int, default=20, help="Activities per day.")
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ.setdefault('GEMINI_API_KEY', 'bench')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taramgo.settings')
+    import django
+    django.setup()
+
+    text = json.dumps(synthetic_itinerary(args.days, args.activities, args.seed))
+    print(f"{args.days} days, {args.days * args.activities} activities, {len(text) / 1024:.0f} KiB of Gemini JSON")
+    print(f"{'':<7} {'generate p50':>12}  {'render p50':>10}  {'page JSON':>9}")
+    for label, generate_func, render_func in (('before', legacy_generate, legacy_render),
+                                              ('after', generate, render)):
+        itinerary = generate_func(text)
+        print(f"{label:<7} {_time(generate_func, text, args.runs):9.2f} ms  "
+              f"{_time(render_func, itinerary, args.runs):7.2f} ms  {len(render_func(itinerary)) / 1024:5.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# taramgo/benchmarks/bench_similarity.py
+"""
+Replay a synthetic request mix (city spellings, reordered interests, trips
+shifted by whole weeks, and genuinely new requests) through the buffered
+pipeline against the Gemini stub, with and without near-duplicate reuse.
+Reports how many requests reached Gemini and the adaptation latency.
+
+    python -m benchmarks.bench_similarity --requests 400
+"""
+
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import statistics
+import time
+
+from benchmarks.stub_gemini import run_stub_server
+
+CITIES = (('Paris', 'paris, France', 'PARIS'), ('Lisbon', 'Lisboa', 'lisbon, portugal'),
+          ('Rome', 'rome, Italy', 'ROME'), ('Kyoto', 'kyoto, japan', 'Kyoto '))
+# Bare names only match their qualified spelling through an alias.
+CITY_ALIASES = {'paris': 'paris, france', 'lisbon': 'lisbon, portugal', 'lisboa': 'lisbon, portugal',
+                'rome': 'rome, italy', 'kyoto': 'kyoto, japan'}
+INTERESTS = ('history', 'art', 'nature', 'foodie', 'museums', 'photography', 'shopping', 'nightlife')
+
+
+def request_mix(requests, seed, new_fraction):
+    rng = random.Random(seed)
+    profiles = [(spellings, tuple(rng.sample(INTERESTS, 3)), rng.choice(('low', 'mid', 'high')))
+                for spellings in CITIES for _ in range(3)]
+    base_date = datetime.date(2026, 11, 2)
+    mix = []
+    for _ in range(requests):
+        spellings, interests, budget = rng.choice(profiles)
+        interests = list(interests)
+        if rng.random() < new_fraction:
+            interests = rng.sample(INTERESTS, rng.randint(1, 4))
+        rng.shuffle(interests)
+        start = base_date + datetime.timedelta(weeks=rng.randint(0, 8))
+        mix.append({
+            'city': rng.choice(spellings), 'start_date': start.isoformat(), 'start_time': '09:00',
+            'end_date': (start + datetime.timedelta(days=2)).isoformat(), 'end_time': '18:00',
+            'budget': budget, 'traveler_type': 'couple', 'interests': interests,
+        })
+    return mix
+
+
+async def replay(mix):
+    from django.conf import settings
+
+    from app.cache import get_itinerary_cache
+    from app.models import Itinerary
+    from app.pipeline import clean_request_data, get_or_generate_itinerary
+    from app.similarity import find_similar_itinerary, similarity_stats
+
+    get_itinerary_cache().clear()
+    await Itinerary.objects.all().adelete()
+    timings = []
+    for request_data in mix:
+        cleaned_data = clean_request_data(request_data)
+        if settings.ITINERARY_SIMILARITY['ENABLED']:
+            # Time the lookup and adaptation on its own; the pipeline below
+            # repeats it and caches the result.
+            started = time.perf_counter()
+            await find_similar_itinerary(cleaned_data)
+            timings.append(time.perf_counter() - started)
+        await get_or_generate_itinerary(cleaned_data)
+    return timings, similarity_stats.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--new-fraction', type=float, default=0.2, help="Share of requests with fresh interests.")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    with run_stub_server(with_handler=True) as (base_url, handler):
+        os.environ['GEMINI_API_BASE'] = base_url
+        os.environ.setdefault('GEMINI_API_KEY', 'bench')
+        os.environ.setdefault('GEMINI_HTTP2', 'false')
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taramgo.settings')
+        import django
+        django.setup()
+        from django.conf import settings
+        from django.test.utils import setup_databases, teardown_databases
+
+        settings.ROUTING['ENABLED'] = False
+        settings.GEOCODING['FOLLOWUP'] = False
+        settings.ITINERARY_SIMILARITY['CITY_ALIASES'] = CITY_ALIASES
+        databases = setup_databases(verbosity=0, interactive=False)
+        try:
+            mix = request_mix(args.requests, args.seed, args.new_fraction)
+            print(f"{args.requests} requests, {args.new_fraction:.0%} with fresh interests")
+            for enabled in (False, True):
+                settings.ITINERARY_SIMILARITY['ENABLED'] = enabled
+                handler.served = 0
+                timings, stats = asyncio.run(replay(mix))
+                label = 'exact + similar' if enabled else 'exact only'
+                line = f"{label:<16} Gemini calls {handler.served:4d}  served without Gemini {1 - handler.served / len(mix):6.1%}"
+                if timings:
+                    line += (f"  similar hit ratio {stats['hit_ratio']:.1%}  lookup+adapt p50 "
+                             f"{statistics.median(timings) * 1000:.2f} ms  max {max(timings) * 1000:.2f} ms")
+                print(line)
+        finally:
+            teardown_databases(databases, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# taramgo/benchmarks/bench_startup.py
+"""
+Process startup cost: `manage.py check` and importing the ASGI application
+(what a worker does on boot), each in a fresh interpreter with no
+GEMINI_API_KEY in the environment. Reports the median wall time per command
+and the slowest top-level imports from `python -X importtime`.
+
+    python -m benchmarks.bench_startup --repeat 10 --imports 12
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+COMMANDS = {
+    'interpreter only': ['-c', 'pass'],
+    'manage.py check': ['manage.py', 'check'],
+    'import taramgo.asgi': ['-c', 'import taramgo.asgi'],
+}
+
+
+def _environment():
+    env = dict(os.environ)
+    # Starting up must not need the upstream API configured.
+    env.pop('GEMINI_API_KEY', None)
+    env['DJANGO_SETTINGS_MODULE'] = 'taramgo.settings'
+    return env
+
+
+def _run(args, env, **kwargs):
+    return subprocess.run(
+        [sys.executable, *args], cwd=PROJECT_DIR, env=env, check=True, stdout=subprocess.DEVNULL, **kwargs,
+    )
+
+
+def time_command(args, env, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _run(args, env, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def slowest_imports(args, env, limit, depth=2):
+    """
+    (cumulative seconds, module) for the slowest imports at most depth
+    levels deep (1: top-level imports only).
+    """
+    stderr = _run(['-X', 'importtime', *args], env, stderr=subprocess.PIPE, text=True).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented two spaces per level under the module
+        # that triggered them.
+        level = (len(name) - len(name.lstrip(' ')) - 1) // 2 + 1
+        if cumulative.strip().isdigit() and level <= depth:
+            imports.append((int(cumulative) / 1_000_000, '  ' * (level - 1) + name.strip()))
+    return sorted(imports, key=lambda item: -item[0])[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--imports', type=int, default=12, help="Slowest imports to list per command; 0 for none.")
+    parser.add_argument('--depth', type=int, default=2, help="How deep into nested imports to list.")
+    args = parser.parse_args()
+
+    env = _environment()
+    for label, command in COMMANDS.items():
+        samples = time_command(command, env, args.repeat)
+        print(f"{label:<22} median {statistics.median(samples) * 1000:7.1f} ms  "
+              f"min {min(samples) * 1000:7.1f} ms  ({args.repeat} runs)")
+    if args.imports:
+        for label in ('manage.py check', 'import taramgo.asgi'):
+            print(f"\nslowest imports, {label}:")
+            for seconds, name in slowest_imports(COMMANDS[label], env, args.imports, args.depth):
+                print(f"  {seconds * 1000:7.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+# taramgo/benchmarks/fixtures.py
+"""
+Realistic itinerary fixtures for the Gemini stub and the benchmarks: real
+landmarks per city, alternating Visit and Travel activities with time slots
+that add up, and descriptions about as long as the model writes them.
+
+    python -m benchmarks.fixtures --city Kyoto --days 3 --stops 8
+"""
+
+import argparse
+import datetime
+import json
+import random
+
+# City centre and well-known places (name, latitude, longitude, cost).
+CITIES = {
+    'paris': ((48.8566, 2.3522), (
+        ('Louvre Museum', 48.8606, 2.3376, '22 EUR'), ('Eiffel Tower', 48.8584, 2.2945, '29 EUR'),
+        ("Musée d'Orsay", 48.8600, 2.3266, '16 EUR'), ('Sainte-Chapelle', 48.8554, 2.3450, '13 EUR'),
+        ('Notre-Dame Cathedral', 48.8530, 2.3499, 'Free'), ('Panthéon', 48.8462, 2.3464, '13 EUR'),
+        ('Luxembourg Gardens', 48.8462, 2.3372, 'Free'), ('Sacré-Cœur Basilica', 48.8867, 2.3431, 'Free'),
+        ('Arc de Triomphe', 48.8738, 2.2950, '16 EUR'), ('Centre Pompidou', 48.8607, 2.3522, '15 EUR'),
+        ('Musée Rodin', 48.8553, 2.3159, '14 EUR'), ('Le Marais', 48.8590, 2.3620, 'Free'),
+        ('Palais Garnier', 48.8720, 2.3316, '15 EUR'), ('Canal Saint-Martin', 48.8719, 2.3655, 'Free'),
+    )),
+    'kyoto': ((35.0116, 135.7681), (
+        ('Fushimi Inari Taisha', 34.9671, 135.7727, 'Free'), ('Kiyomizu-dera', 34.9949, 135.7850, '400 JPY'),
+        ('Kinkaku-ji', 35.0394, 135.7292, '500 JPY'), ('Arashiyama Bamboo Grove', 35.0170, 135.6713, 'Free'),
+        ('Nishiki Market', 35.0050, 135.7649, '2000 JPY'), ('Gion', 35.0037, 135.7788, 'Free'),
+        ('Ginkaku-ji', 35.0270, 135.7982, '500 JPY'), ("Philosopher's Path", 35.0220, 135.7944, 'Free'),
+        ('Nijo Castle', 35.0142, 135.7482, '1300 JPY'), ('Ryoan-ji', 35.0345, 135.7182, '600 JPY'),
+        ('Tenryu-ji', 35.0158, 135.6737, '500 JPY'), ('Kyoto Imperial Palace', 35.0254, 135.7621, 'Free'),
+    )),
+    'lisbon': ((38.7223, -9.1393), (
+        ('Belém Tower', 38.6916, -9.2160, '8 EUR'), ('Jerónimos Monastery', 38.6979, -9.2068, '12 EUR'),
+        ('São Jorge Castle', 38.7139, -9.1335, '15 EUR'), ('Alfama', 38.7118, -9.1300, 'Free'),
+        ('Praça do Comércio', 38.7075, -9.1364, 'Free'), ('LX Factory', 38.7037, -9.1785, 'Free'),
+        ('Gulbenkian Museum', 38.7372, -9.1545, '10 EUR'), ('Time Out Market', 38.7069, -9.1459, '20 EUR'),
+        ('Miradouro da Senhora do Monte', 38.7190, -9.1327, 'Free'), ('Oceanário de Lisboa', 38.7635, -9.0937, '25 EUR'),
+        ('Bairro Alto', 38.7136, -9.1446, 'Free'), ('Santa Justa Lift', 38.7121, -9.1394, '5.30 EUR'),
+    )),
+    'new york': ((40.7128, -74.0060), (
+        ('Metropolitan Museum of Art', 40.7794, -73.9632, '30 USD'), ('Central Park', 40.7829, -73.9654, 'Free'),
+        ('Statue of Liberty', 40.6892, -74.0445, '25 USD'), ('Brooklyn Bridge', 40.7061, -73.9969, 'Free'),
+        ('The High Line', 40.7480, -74.0048, 'Free'), ('Museum of Modern Art', 40.7614, -73.9776, '30 USD'),
+        ('Times Square', 40.7580, -73.9855, 'Free'), ('Grand Central Terminal', 40.7527, -73.9772, 'Free'),
+        ('9/11 Memorial', 40.7115, -74.0134, 'Free'), ('Chelsea Market', 40.7424, -74.0060, '25 USD'),
+        ('Top of the Rock', 40.7593, -73.9794, '40 USD'), ('DUMBO', 40.7033, -73.9881, 'Free'),
+    )),
+}
+
+VISIT_NOTES = (
+    "Arrive at opening to beat the queues and the midday heat.",
+    "Book tickets online the day before; the walk-up line can take an hour.",
+    "The audio guide is worth it for the history of the building.",
+    "Quieter corners at the back are the best spot for photos.",
+    "There is a small café on site for a coffee and a pastry.",
+    "Wear comfortable shoes: expect plenty of stairs and uneven paving.",
+)
+TRAVEL_MODES = (('Metro', 'Take the metro, two stops, trains every 4 minutes'),
+                ('Walk', 'Walk through the old streets; the route is mostly flat'),
+                ('Bus', 'Bus towards the centre; pay by card on board'),
+                ('Taxi', 'Short taxi ride; agree the fare or use the meter'))
+
+
+def _clock(minutes):
+    hours, minutes = divmod(minutes, 60)
+    return datetime.time(hours % 24, minutes).strftime('%I:%M %p')
+
+
+def city_fixture(city):
+    """
+    (centre, places) for a city, falling back to Paris for unknown cities.
+    """
+    key = (city or '').split(',')[0].strip().lower()
+    return CITIES.get(key, CITIES['paris'])
+
+
+def realistic_itinerary(city='Paris', days=3, stops_per_day=8, seed=0, start_date=datetime.date(2026, 11, 2)):
+    """
+    A list of day plans in the shape RESPONSE_SCHEMA asks Gemini for.
+    stops_per_day counts Visit activities; a Travel leg joins each pair.
+    """
+    rng = random.Random(seed)
+    _, places = city_fixture(city)
+    itinerary = []
+    for day_index in range(days):
+        visits = [places[(day_index * stops_per_day + index) % len(places)] for index in range(stops_per_day)]
+        activities, minutes = [], 9 * 60
+        for index, (name, lat, lon, cost) in enumerate(visits):
+            if index:
+                previous = visits[index - 1]
+                mode, detail = rng.choice(TRAVEL_MODES)
+                duration = rng.choice((10, 15, 20, 25))
+                activities.append({
+                    'id': f"d{day_index + 1}-a{len(activities) + 1}", 'type': 'Travel',
+                    'time_slot': f"{_clock(minutes)} - {_clock(minutes + duration)}",
+                    'description': f"- {detail}.\n- Around {duration} minutes door to door.",
+                    'transport_mode_details': f"{mode} from {previous[0]} to {name}",
+                    'start_point_location': previous[0], 'end_point_location': name,
+                    'start_point_lat': previous[1], 'start_point_lon': previous[2],
+                    'end_point_lat': lat, 'end_point_lon': lon,
+                    'cost_estimate': 'Free' if mode == 'Walk' else '2-15 local currency',
+                })
+                minutes += duration
+            duration = rng.choice((45, 60, 75, 90))
+            notes = rng.sample(VISIT_NOTES, 3)
+            activities.append({
+                'id': f"d{day_index + 1}-a{len(activities) + 1}", 'type': 'Visit',
+                'time_slot': f"{_clock(minutes)} - {_clock(minutes + duration)}",
+                'description': '\n'.join(f"- {note}" for note in [f"Explore {name} at an easy pace."] + notes),
+                'location_name': name, 'latitude': lat, 'longitude': lon, 'cost_estimate': cost,
+            })
+            minutes += duration
+        itinerary.append({
+            'day': f"Day {day_index + 1}",
+            'date': (start_date + datetime.timedelta(days=day_index)).isoformat(),
+            'activities': activities,
+        })
+    return itinerary
+
+
+def collect_static(directory):
+    """
+    Run collectstatic into directory and make it STATIC_ROOT, so pages link
+    the hashed, precompressed assets as they do in production. Call after
+    django.setup() and before the first request.
+    """
+    from django.conf import settings
+    from django.core.management import call_command
+
+    settings.STATIC_ROOT = directory
+    call_command('collectstatic', interactive=False, verbosity=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--city', default='Paris')
+    parser.add_argument('--days', type=int, default=3)
+    parser.add_argument('--stops', type=int, default=8, help="Visits per day.")
+    args = parser.parse_args()
+    text = json.dumps(realistic_itinerary(args.city, args.days, args.stops), indent=2, ensure_ascii=False)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
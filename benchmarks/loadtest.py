@@ -0,0 +1,250 @@
+# taramgo/benchmarks/loadtest.py
+"""
+Offline load test of generate_itinerary_view: concurrent form POSTs through
+the ASGI application (httpx.ASGITransport, no sockets on the app side)
+against the Gemini and OSRM stubs, which run in a separate process so they
+don't compete for this one's event loop. Reports requests/s, latency
+percentiles, peak memory and per-stage time, and compares them with the
+saved baseline for the same scenario.
+
+    python -m benchmarks.loadtest --requests 300 --concurrency 32
+    python -m benchmarks.loadtest --latency 0.8 --error-rate 0.02 --save-baseline
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.stub_gemini import LATENCY_DISTRIBUTIONS, run_stub_server
+from benchmarks.stub_osrm import run_stub_osrm
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baselines' / 'loadtest.json'
+CITIES = ('Paris', 'Kyoto', 'Lisbon', 'New York')
+INTERESTS = ('history', 'art', 'nature', 'foodie', 'museums', 'photography', 'shopping', 'nightlife')
+CSRF_FIELD = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+EMPTY_ITINERARY = re.compile(r'id="itinerary_data" type="application/json">\s*\[\]')
+# Metrics compared with the baseline, and whether higher is better.
+COMPARED = (('requests_per_s', True), ('p50_ms', False), ('p95_ms', False), ('p99_ms', False), ('peak_rss_mib', False))
+
+
+def _percentile(samples, percent):
+    samples = sorted(samples)
+    return samples[max(0, int(len(samples) * percent / 100 + 0.5) - 1)]
+
+
+def _peak_rss_mib():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and in bytes on macOS.
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def request_mix(requests, repeat_fraction, seed):
+    """
+    Form submissions: a repeat_fraction share repeat an earlier request
+    exactly (cache hits); the rest are new trips.
+    """
+    rng = random.Random(seed)
+    mix = []
+    for _ in range(requests):
+        if mix and rng.random() < repeat_fraction:
+            mix.append(rng.choice(mix))
+            continue
+        start = datetime.date(2026, 11, 2) + datetime.timedelta(days=rng.randint(0, 365))
+        mix.append({
+            'city': rng.choice(CITIES), 'start_date': start.isoformat(), 'start_time': '09:00',
+            'end_date': (start + datetime.timedelta(days=2)).isoformat(), 'end_time': '18:00',
+            'budget': rng.choice(('low', 'mid', 'high')), 'traveler_type': rng.choice(('solo', 'couple', 'family')),
+            'interests': rng.sample(INTERESTS, rng.randint(1, 4)),
+        })
+    return mix
+
+
+def _serve_stubs(connection, options):
+    """
+    Child process: run both stubs until the parent closes the pipe.
+    """
+    with run_stub_server(
+        latency=options['latency'], latency_dist=options['latency_dist'], error_rate=options['error_rate'],
+        stops_per_day=options['stops'], seed=options['seed'], with_handler=True,
+    ) as (gemini_url, handler), run_stub_osrm(latency=options['osrm_latency']) as (osrm_url, _):
+        connection.send((gemini_url, osrm_url))
+        try:
+            connection.recv()
+        except EOFError:
+            pass
+        connection.send({'served': handler.served, 'errors': handler.errors})
+
+
+async def drive(mix, concurrency, warmup):
+    import httpx
+
+    from taramgo.asgi import django_application
+
+    transport = httpx.ASGITransport(app=django_application)
+    async with httpx.AsyncClient(transport=transport, base_url='http://testserver', timeout=None) as client:
+        form_page = await client.get('/')
+        token = CSRF_FIELD.search(form_page.text).group(1)
+
+        async def post(request_data):
+            data = dict(request_data, csrfmiddlewaretoken=token)
+            started = time.perf_counter()
+            response = await client.post('/', data=data)
+            elapsed = time.perf_counter() - started
+            ok = response.status_code == 200 and not EMPTY_ITINERARY.search(response.text)
+            return elapsed, ok, len(response.content)
+
+        for request_data in mix[:warmup]:
+            await post(request_data)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(request_data):
+            async with semaphore:
+                return await post(request_data)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one(request_data) for request_data in mix[warmup:]))
+        wall = time.perf_counter() - started
+    return results, wall
+
+
+def scenario_key(args):
+    return (f"requests={args.requests} concurrency={args.concurrency} latency={args.latency_dist}:{args.latency} "
+            f"errors={args.error_rate} stops={args.stops} repeat={args.repeat_fraction}")
+
+
+def compare(result, baseline, tolerance):
+    """
+    Lines describing each compared metric against the baseline, and whether
+    any of them regressed by more than tolerance.
+    """
+    lines, regressed = [], False
+    for name, higher_is_better in COMPARED:
+        if name not in baseline:
+            continue
+        old, new = baseline[name], result[name]
+        change = (new - old) / old if old else 0.0
+        worse = -change if higher_is_better else change
+        flag = ''
+        if worse > tolerance:
+            flag, regressed = '  REGRESSION', True
+        lines.append(f"  {name:<15} {old:10.1f} -> {new:10.1f}  ({change:+.1%}){flag}")
+    return lines, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--warmup', type=int, default=10, help="Sequential requests before timing starts.")
+    parser.add_argument('--latency', type=float, default=0.5, help="Mean Gemini latency in seconds.")
+    parser.add_argument('--latency-dist', choices=LATENCY_DISTRIBUTIONS, default='lognormal')
+    parser.add_argument('--error-rate', type=float, default=0.01, help="Share of Gemini requests that get a 503.")
+    parser.add_argument('--stops', type=int, default=8, help="Visits per day in the stub's itineraries.")
+    parser.add_argument('--osrm-latency', type=float, default=0.02)
+    parser.add_argument('--repeat-fraction', type=float, default=0.3, help="Share of requests repeating earlier ones.")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="Record this run as the scenario's baseline.")
+    parser.add_argument(
+        '--tolerance', type=float, default=0.25,
+        help="Allowed regression before exiting non-zero; run-to-run noise is around 15%%.",
+    )
+    args = parser.parse_args()
+
+    parent, child = multiprocessing.get_context('spawn').Pipe()
+    stubs = multiprocessing.get_context('spawn').Process(target=_serve_stubs, args=(child, vars(args)), daemon=True)
+    stubs.start()
+    gemini_url, osrm_url = parent.recv()
+
+    os.environ['GEMINI_API_BASE'] = gemini_url
+    os.environ['OSRM_BASE_URL'] = osrm_url
+    os.environ.setdefault('GEMINI_API_KEY', 'bench')
+    # Sessions and CSRF need a key; the pages are never served anywhere.
+    os.environ.setdefault('SECRET_KEY', 'loadtest')
+    os.environ.setdefault('GEMINI_HTTP2', 'false')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taramgo.settings')
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.test.utils import setup_databases, teardown_databases
+
+    from app.metrics import gemini_requests, itinerary_requests, stage_seconds
+
+    settings.ITINERARY_STREAMING = False
+    settings.ITINERARY_JOBS['ENABLED'] = False
+    # A file rather than the shared in-memory test database, whose table locks
+    # fail concurrent writes from the per-request ORM threads outright.
+    workdir = tempfile.TemporaryDirectory()
+    settings.DATABASES['default']['TEST']['NAME'] = os.path.join(workdir.name, 'loadtest.sqlite3')
+    databases = setup_databases(verbosity=0, interactive=False)
+    try:
+        mix = request_mix(args.requests + args.warmup, args.repeat_fraction, args.seed)
+        results, wall = asyncio.run(drive(mix, args.concurrency, args.warmup))
+    finally:
+        teardown_databases(databases, verbosity=0)
+        workdir.cleanup()
+        parent.send('stop')
+        upstream = parent.recv()
+        stubs.join()
+
+    latencies = [elapsed for elapsed, _, _ in results]
+    failures = sum(1 for _, ok, _ in results if not ok)
+    result = {
+        'requests_per_s': len(results) / wall,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p95_ms': _percentile(latencies, 95) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+        'max_ms': max(latencies) * 1000,
+        'failures': failures,
+        'peak_rss_mib': _peak_rss_mib(),
+        'mean_page_kib': sum(size for _, _, size in results) / len(results) / 1024,
+    }
+
+    print(f"scenario: {scenario_key(args)}")
+    print(f"{len(results)} requests in {wall:.1f}s: {result['requests_per_s']:.1f} req/s, "
+          f"p50 {result['p50_ms']:.0f} ms, p95 {result['p95_ms']:.0f} ms, p99 {result['p99_ms']:.0f} ms, "
+          f"max {result['max_ms']:.0f} ms, {failures} failed")
+    print(f"peak RSS {result['peak_rss_mib']:.0f} MiB, mean page {result['mean_page_kib']:.0f} KiB, "
+          f"Gemini requests {upstream['served']} ({upstream['errors']} answered 503)")
+    sources = sorted((source, count) for (source,), count in itinerary_requests.snapshot().items())
+    print("served from: " + ', '.join(f"{source} {count}" for source, count in sources))
+    statuses = sorted((status, count) for (_, _, status), count in gemini_requests.snapshot().items())
+    print("Gemini responses seen by the app: " + ', '.join(f"{status} x{count}" for status, count in statuses))
+    print("mean time per stage:")
+    for (stage,), (count, total) in sorted(stage_seconds.snapshot().items(), key=lambda item: -item[1][1]):
+        print(f"  {stage:<10} {total / count * 1000:9.2f} ms  x{count}")
+
+    baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    key = scenario_key(args)
+    regressed = False
+    if args.save_baseline:
+        baselines[key] = dict(
+            {name: round(value, 1) for name, value in result.items()},
+            python=platform.python_version(), recorded=datetime.date.today().isoformat(),
+        )
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+        print(f"Saved baseline to {args.baseline}.")
+    elif key in baselines:
+        lines, regressed = compare(result, baselines[key], args.tolerance)
+        print(f"against baseline of {baselines[key].get('recorded', '?')}:")
+        print('\n'.join(lines))
+    else:
+        print("No baseline for this scenario; run with --save-baseline to record one.")
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == '__main__':
+    main()
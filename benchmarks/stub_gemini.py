@@ -0,0 +1,272 @@
+# taramgo/benchmarks/stub_gemini.py
+"""
+A local stand-in for the Gemini generateContent endpoint, so benchmarks can
+run without network access or API quota. With --stops, each response is a
+realistic itinerary (benchmarks.fixtures) for the city and length asked for
+in the prompt, instead of the same small sample.
+
+    python -m benchmarks.stub_gemini --port 8765
+    python -m benchmarks.stub_gemini --latency 0.8 --latency-dist lognormal --error-rate 0.02 --stops 8
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.fixtures import realistic_itinerary
+
+LATENCY_DISTRIBUTIONS = ('constant', 'exponential', 'lognormal')
+PROMPT_TRIP = re.compile(r"(\d+)-day trip to ([^.\n]+)")
+
+
+def sample_itinerary(days=3):
+    itinerary = []
+    for day_index in range(days):
+        itinerary.append({
+            'day': f"Day {day_index + 1}",
+            'date': f"2026-11-{day_index + 1:02d}",
+            'activities': [
+                {'id': f"d{day_index}-a1", 'type': 'Visit', 'time_slot': '09:00 AM - 10:00 AM',
+                 'description': '- Explore the galleries\n- Take photos', 'location_name': 'Louvre Museum',
+                 'latitude': 48.8606, 'longitude': 2.3376, 'cost_estimate': '22 EUR'},
+                {'id': f"d{day_index}-a2", 'type': 'Travel', 'time_slot': '10:00 AM - 10:25 AM',
+                 'description': '- Take the metro', 'transport_mode_details': 'Metro line 1',
+                 'start_point_location': 'Louvre Museum', 'end_point_location': 'Eiffel Tower',
+                 'start_point_lat': 48.8606, 'start_point_lon': 2.3376,
+                 'end_point_lat': 48.8584, 'end_point_lon': 2.2945, 'cost_estimate': '2.15 EUR'},
+                {'id': f"d{day_index}-a3", 'type': 'Visit', 'time_slot': '10:25 AM - 11:25 AM',
+                 'description': '- Go up to the second floor', 'location_name': 'Eiffel Tower',
+                 'latitude': 48.8584, 'longitude': 2.2945, 'cost_estimate': '29 EUR'},
+            ],
+        })
+    return itinerary
+
+
+def usage_metadata(text):
+    # Roughly four characters per token, like the real tokenizer on English.
+    return {'promptTokenCount': 600, 'candidatesTokenCount': len(text) // 4, 'totalTokenCount': 600 + len(text) // 4}
+
+
+def generate_content_body(itinerary):
+    text = json.dumps(itinerary)
+    return json.dumps({
+        'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}}],
+        'usageMetadata': usage_metadata(text),
+    }).encode('utf-8')
+
+
+def sample_latency(mean, distribution='constant', rng=random):
+    """
+    Seconds to wait for one response. 'lognormal' has a median of mean/1.25
+    and a long right tail, close to what generateContent shows in practice.
+    """
+    if not mean or distribution == 'constant':
+        return mean
+    if distribution == 'exponential':
+        return rng.expovariate(1 / mean)
+    sigma = 0.67
+    return rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+
+
+def stream_events(itinerary, chunk_size=120):
+    """
+    Split the itinerary text into streamGenerateContent SSE events.
+    """
+    text = json.dumps(itinerary)
+    for start in range(0, len(text), chunk_size):
+        chunk = {
+            'candidates': [{'content': {'role': 'model', 'parts': [{'text': text[start:start + chunk_size]}]}}],
+            'usageMetadata': usage_metadata(text[:start + chunk_size]),
+        }
+        yield f"data: {json.dumps(chunk)}\r\n\r\n".encode('utf-8')
+
+
+class StubGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    latency = 0.0
+    latency_dist = 'constant'
+    stream_delay = 0.0
+    # Share of requests answered with a retryable 503.
+    error_rate = 0.0
+    errors = 0
+    # Visits per day for prompt-shaped fixture responses; None serves `body`.
+    stops_per_day = None
+    fixture_bodies = {}
+    rng = random.Random()
+    itinerary = sample_itinerary()
+    body = generate_content_body(itinerary)
+    # Long-tail emulation: slow_fraction of requests take slow_latency instead.
+    slow_fraction = 0.0
+    slow_latency = 0.0
+    # Quota emulation: more than max_concurrency requests at once get a 429.
+    max_concurrency = 0
+    retry_after = None
+    in_flight = 0
+    served = 0
+    throttled = 0
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        request_body = self.rfile.read(length)
+        handler = type(self)
+        with handler.lock:
+            over_quota = handler.max_concurrency and handler.in_flight >= handler.max_concurrency
+            if over_quota:
+                handler.throttled += 1
+            else:
+                handler.in_flight += 1
+        if over_quota:
+            return self._throttle()
+        try:
+            if self.slow_fraction and self.rng.random() < self.slow_fraction:
+                time.sleep(self.slow_latency)
+            elif self.latency:
+                time.sleep(sample_latency(self.latency, self.latency_dist, self.rng))
+            if self.error_rate and self.rng.random() < self.error_rate:
+                with handler.lock:
+                    handler.errors += 1
+                return self._unavailable()
+            itinerary, body = self._fixture(request_body)
+            if ':streamGenerateContent' in self.path:
+                return self._stream(itinerary)
+            self._respond(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (e.g. a cancelled hedge); nothing to answer.
+            self.close_connection = True
+        finally:
+            with handler.lock:
+                handler.in_flight -= 1
+                handler.served += 1
+
+    def _fixture(self, request_body):
+        """
+        (itinerary, generateContent body) for this request: a realistic trip
+        matching the prompt when stops_per_day is set, else the fixed sample.
+        """
+        if not self.stops_per_day:
+            return self.itinerary, self.body
+        try:
+            prompt = json.loads(request_body)['contents'][0]['parts'][0]['text']
+            match = PROMPT_TRIP.search(prompt)
+        except (ValueError, KeyError, IndexError):
+            match = None
+        days, city = (int(match.group(1)), match.group(2).strip()) if match else (3, 'Paris')
+        key = (city.lower(), days)
+        cached = self.fixture_bodies.get(key)
+        if cached is None:
+            itinerary = realistic_itinerary(city, days, self.stops_per_day)
+            cached = self.fixture_bodies[key] = (itinerary, generate_content_body(itinerary))
+        return cached
+
+    def _unavailable(self):
+        body = json.dumps({'error': {'code': 503, 'status': 'UNAVAILABLE', 'message': 'The model is overloaded.'}})
+        body = body.encode('utf-8')
+        self.send_response(503)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _throttle(self):
+        body = json.dumps({'error': {'code': 429, 'status': 'RESOURCE_EXHAUSTED', 'message': 'Quota exceeded.'}})
+        body = body.encode('utf-8')
+        self.send_response(429)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if self.retry_after is not None:
+            self.send_header('Retry-After', str(self.retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _respond(self, body):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, itinerary):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for event in stream_events(itinerary):
+            if self.stream_delay:
+                time.sleep(self.stream_delay)
+            self.wfile.write(f"{len(event):X}\r\n".encode('ascii') + event + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+
+@contextlib.contextmanager
+def run_stub_server(host='127.0.0.1', port=0, latency=0.0, days=3, max_concurrency=0, retry_after=None,
+                    slow_fraction=0.0, slow_latency=0.0, with_handler=False, latency_dist='constant',
+                    error_rate=0.0, stops_per_day=None, seed=None):
+    """
+    Serve the stub in a background thread and yield its v1beta base URL (and
+    the handler class, whose counters show what the server saw, when
+    with_handler is set).
+    """
+    itinerary = sample_itinerary(days)
+    handler = type('Handler', (StubGeminiHandler,), {
+        'latency': latency,
+        'latency_dist': latency_dist,
+        'itinerary': itinerary,
+        'body': generate_content_body(itinerary),
+        'max_concurrency': max_concurrency,
+        'retry_after': retry_after,
+        'slow_fraction': slow_fraction,
+        'slow_latency': slow_latency,
+        'error_rate': error_rate,
+        'stops_per_day': stops_per_day,
+        'fixture_bodies': {},
+        'rng': random.Random(seed),
+        'lock': threading.Lock(),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{server.server_address[1]}/v1beta"
+    try:
+        yield (base_url, handler) if with_handler else base_url
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="Mean seconds to wait before responding.")
+    parser.add_argument('--latency-dist', choices=LATENCY_DISTRIBUTIONS, default='constant')
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with a 503.")
+    parser.add_argument('--stops', type=int, help="Serve realistic itineraries with this many visits per day.")
+    parser.add_argument('--days', type=int, default=3)
+    parser.add_argument('--max-concurrency', type=int, default=0, help="Answer 429 above this many requests at once.")
+    parser.add_argument('--retry-after', type=int, help="Retry-After seconds to send with 429s.")
+    parser.add_argument('--slow-fraction', type=float, default=0.0, help="Share of requests that are slow.")
+    parser.add_argument('--slow-latency', type=float, default=0.0, help="Seconds a slow request takes.")
+    args = parser.parse_args()
+    with run_stub_server(args.host, args.port, args.latency, args.days, args.max_concurrency,
+                         args.retry_after, args.slow_fraction, args.slow_latency, latency_dist=args.latency_dist,
+                         error_rate=args.error_rate, stops_per_day=args.stops) as base_url:
+        print(f"Stub Gemini API listening on {base_url} (Ctrl+C to stop)")
+        with contextlib.suppress(KeyboardInterrupt):
+            threading.Event().wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+# taramgo/benchmarks/stub_osrm.py
+"""
+A local stand-in for an OSRM /route/v1 service, so routing can be exercised
+without the public demo server.
+
+    python -m benchmarks.stub_osrm --port 5000
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app import polyline
+
+ROUTE_PATH = re.compile(r'^/route/v1/(?P<profile>[\w-]+)/(?P<coordinates>[-\d.,;]+)')
+SPEEDS = {'foot': 1.4, 'bike': 4.5, 'driving': 9.0}
+
+
+def _distance_m(start, end):
+    lat1, lon1, lat2, lon2 = map(math.radians, (*start, *end))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371008.8 * math.asin(math.sqrt(a))
+
+
+def route_body(profile, points):
+    """
+    A plausible route: via a slightly offset midpoint, 30% longer than the
+    straight line, at a fixed speed per profile.
+    """
+    start, end = points[0], points[-1]
+    middle = ((start[0] + end[0]) / 2 + 0.001, (start[1] + end[1]) / 2 - 0.001)
+    distance = _distance_m(start, end) * 1.3
+    return {
+        'code': 'Ok',
+        'routes': [{
+            'geometry': polyline.encode([start, middle, end]),
+            'distance': round(distance, 1),
+            'duration': round(distance / SPEEDS.get(profile, 9.0), 1),
+        }],
+    }
+
+
+class StubOSRMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    latency = 0.0
+    requests = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        type(self).requests += 1
+        match = ROUTE_PATH.match(self.path)
+        if match is None:
+            body, status = {'code': 'InvalidUrl'}, 400
+        else:
+            points = [tuple(reversed([float(v) for v in pair.split(',')]))
+                      for pair in match['coordinates'].split(';')]
+            body, status = route_body(match['profile'], points), 200
+        if self.latency:
+            time.sleep(self.latency)
+        encoded = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+
+@contextlib.contextmanager
+def run_stub_osrm(host='127.0.0.1', port=0, latency=0.0):
+    """
+    Serve the stub in a background thread and yield (base URL, handler class).
+    """
+    handler = type('Handler', (StubOSRMHandler,), {'latency': latency, 'requests': 0})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://{host}:{server.server_address[1]}", handler
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    args = parser.parse_args()
+    with run_stub_osrm(args.host, args.port, args.latency) as (base_url, _):
+        print(f"Stub OSRM listening on {base_url} (Ctrl+C to stop)")
+        with contextlib.suppress(KeyboardInterrupt):
+            threading.Event().wait()
+
+
+if __name__ == '__main__':
+    main()
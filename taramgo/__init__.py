@@ -0,0 +1,10 @@
+from pathlib import Path
+
+
+def load_env():
+    """
+    Load the project's .env, if any; variables already in the environment
+    win. A fixed path, so startup doesn't walk the directory tree for one.
+    """
+    from dotenv import load_dotenv
+    load_dotenv(Path(__file__).resolve().parent.parent / '.env')
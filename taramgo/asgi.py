@@ -11,6 +11,24 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from taramgo import load_env
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taramgo.settings')
+load_env()
+
+django_application = get_asgi_application()
+
+from app.asgi import LifespanMiddleware, on_shutdown, on_startup  # noqa: E402
+from app.gemini import aclose_clients  # noqa: E402
+from app.jobs import start_in_process_runner, stop_in_process_runner  # noqa: E402
+from app.routing import aclose_clients as aclose_routing_clients  # noqa: E402
+
+# Close the pooled Gemini and routing HTTP clients when the server shuts down.
+on_shutdown(aclose_clients)
+on_shutdown(aclose_routing_clients)
+
+# Run queued itinerary jobs in this process (see settings.ITINERARY_JOBS).
+on_startup(start_in_process_runner)
+on_shutdown(stop_in_process_runner)
 
-application = get_asgi_application()
+application = LifespanMiddleware(django_application)
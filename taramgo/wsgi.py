@@ -11,6 +11,9 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from taramgo import load_env
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taramgo.settings')
+load_env()
 
 application = get_wsgi_application()